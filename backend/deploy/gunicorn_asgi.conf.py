@@ -0,0 +1,30 @@
+"""Perfil de servidor ASGI para la apertura de votaciones
+
+    gunicorn -c deploy/gunicorn_asgi.conf.py fescvotaciones.asgi:application
+
+Cada worker de uvicorn atiende miles de conexiones concurrentes en un solo hilo;
+las vistas de votación son asíncronas y solo la transacción del voto usa el hilo de BD.
+
+Para un pool dedicado al voto (sin admin, jazzmin ni reportes) exportar
+VOTACION_PERFIL_WORKER=publico y enviar /admin/ a otro pool con el perfil completo.
+Cada worker calienta tarjetones y plantillas al cargar la aplicación, antes de aceptar tráfico.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('VOTACION_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('VOTACION_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+# Conexiones abiertas por worker antes de dejar de aceptar nuevas
+worker_connections = int(os.environ.get('VOTACION_CONEXIONES', 2000))
+backlog = 4096
+keepalive = 5
+timeout = 30
+graceful_timeout = 20
+
+# Reciclar workers periódicamente para acotar el crecimiento de memoria
+max_requests = 20000
+max_requests_jitter = 2000
+
+raw_env = ['VOTACION_MODO_ASGI=1']
@@ -0,0 +1,20 @@
+"""Perfil de servidor WSGI (referencia para comparar con el perfil ASGI)
+
+    gunicorn -c deploy/gunicorn_wsgi.conf.py fescvotaciones.wsgi:application
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('VOTACION_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('VOTACION_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('VOTACION_HILOS', 4))
+backlog = 2048
+keepalive = 5
+timeout = 30
+graceful_timeout = 20
+
+max_requests = 20000
+max_requests_jitter = 2000
+
+raw_env = ['VOTACION_MODO_ASGI=0']
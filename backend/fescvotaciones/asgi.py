@@ -12,5 +12,23 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fescvotaciones.settings')
+# Bajo ASGI el flujo de votación usa las vistas asíncronas (votaciones.views_async)
+os.environ.setdefault('VOTACION_MODO_ASGI', '1')
 
 application = get_asgi_application()
+
+# Escritura diferida: reproducir el diario de votos pendiente y arrancar el confirmador
+from django.conf import settings  # noqa: E402
+from votaciones.storage import exigir_manifiesto  # noqa: E402
+
+# Con estáticos con hash, sin collectstatic el worker no arranca (en lugar de responder 500)
+exigir_manifiesto()
+
+if settings.VOTACION_ESCRITURA_DIFERIDA:
+    from votaciones.utils.diario_votos import iniciar_confirmador
+    iniciar_confirmador()
+
+# Preparar plantillas, tarjetones y módulos pesados antes de que el worker acepte tráfico
+if settings.VOTACION_CALENTAR_AL_INICIAR:
+    from votaciones.utils.calentamiento import calentar
+    calentar()
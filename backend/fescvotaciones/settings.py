@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,7 +45,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'votaciones.middleware.BusInvalidacionMiddleware',  # Cachés en memoria al día entre workers
+    'votaciones.middleware.CacheArchivosMiddleware',  # Caché larga para estáticos/media con hash
+    'votaciones.middleware.PerfilSesionMiddleware',  # Sesiones por perfil (público vs admin)
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -74,6 +78,23 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'fescvotaciones.wsgi.application'
 
+# Perfil del worker: 'completo' (admin, reportes y votación) o 'publico' (solo el flujo de
+# votación: no carga jazzmin, el admin ni los reportes; el proxy envía /admin/ a otro pool)
+VOTACION_PERFIL_WORKER = os.environ.get('VOTACION_PERFIL_WORKER', 'completo')
+if VOTACION_PERFIL_WORKER == 'publico':
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ('jazzmin', 'django.contrib.admin')]
+    ROOT_URLCONF = 'fescvotaciones.urls_publico'
+
+# Calentar cachés (tarjetones, plantillas, reportes) al cargar la aplicación, antes de aceptar tráfico
+VOTACION_CALENTAR_AL_INICIAR = os.environ.get('VOTACION_CALENTAR_AL_INICIAR', '1') == '1'
+# Segundos que un tarjetón permanece en la caché del proceso (se invalida al editar planchas)
+VOTACION_TARJETON_TTL = 60
+# Vida máxima (segundos) del contexto del dashboard cacheado por versión de resultados
+VOTACION_DASHBOARD_TTL = 30
+
+# Vistas asíncronas para el flujo de votación (asgi.py lo activa por defecto)
+VOTACION_MODO_ASGI = os.environ.get('VOTACION_MODO_ASGI', '') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -82,9 +103,49 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Réplica de solo lectura para dashboards y reportes. Por defecto apunta a la misma base
+    # (réplica de prueba); en producción VOTACION_DB_REPLICA indica la copia replicada
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('VOTACION_DB_REPLICA', BASE_DIR / 'db.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['votaciones.routers.ReplicaRouter']
+# Retraso máximo (segundos) tolerado en la réplica antes de volver a leer de la primaria
+VOTACION_REPLICA_RETRASO_MAXIMO = 10
+# Cada cuántos segundos se mide el retraso de la réplica
+VOTACION_REPLICA_CHEQUEO = 5
+
+# Escritura diferida de votos: el voto validado se anota en un diario local (fsync) y un
+# único hilo confirmador lo aplica a la base de datos en lotes (evita "database is locked")
+VOTACION_ESCRITURA_DIFERIDA = os.environ.get('VOTACION_ESCRITURA_DIFERIDA', '') == '1'
+VOTACION_DIARIO_VOTOS = BASE_DIR / 'diario' / 'votos.jsonl'
+VOTACION_DIARIO_LOTE = 500
+# Segundos que el confirmador espera nuevas entradas antes de volver a revisar el diario
+VOTACION_DIARIO_ESPERA = 0.2
+
+# Libro de boletas encadenado: la hora de cada boleta se trunca a esta franja (segundos)
+VOTACION_LIBRO_FRANJA = 15 * 60
+
+# Fragmentos por contador de resultados (1 = una fila por plancha). Con K > 1 los votos
+# se reparten entre K filas y compactar_contadores --continuo las pliega cada intervalo
+VOTACION_FRAGMENTOS_CONTADOR = int(os.environ.get('VOTACION_FRAGMENTOS_CONTADOR', '1'))
+VOTACION_COMPACTACION_INTERVALO = 30
+
+# Índice del padrón en memoria para la elegibilidad del tarjetón (utils/padron.py):
+# segundos entre revisiones de cambios y margen hacia atrás de cada revisión
+VOTACION_PADRON_INDICE = os.environ.get('VOTACION_PADRON_INDICE', '1') == '1'
+VOTACION_PADRON_REVISION = 1
+VOTACION_PADRON_MARGEN = 5
+# Segundos que el feed de cambios del jurado relee hacia atrás en cada consulta, para los
+# votos que confirman después de que el cursor pasó su updated_at
+VOTACION_JURADO_MARGEN = 5
+# Segundos entre lecturas de la tabla de versiones del bus de invalidación en cada worker
+VOTACION_BUS_INTERVALO = 1
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -136,6 +197,36 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Producción: collectstatic agrega hash a los nombres y genera variantes WebP/AVIF de las
+# imágenes grandes. Con el manifiesto activo, {% static %} falla si collectstatic no corrió:
+# los workers no arrancan sin él (votaciones.storage.exigir_manifiesto) y `manage.py check`
+# lo advierte. En desarrollo (DEBUG) se sirven los archivos tal cual, sin manifiesto.
+VOTACION_ESTATICOS_MANIFIESTO = os.environ.get('VOTACION_ESTATICOS_MANIFIESTO', '0' if DEBUG else '1') == '1'
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'votaciones.storage.ImagenesManifestStaticFilesStorage' if VOTACION_ESTATICOS_MANIFIESTO
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
+# Variantes responsivas de imágenes (tarjetones, fotos de candidatos y estáticos grandes)
+VOTACION_IMAGEN_ANCHOS = (320, 640, 960)
+VOTACION_IMAGEN_FORMATOS = ('avif', 'webp')
+VOTACION_IMAGEN_ESTATICA_MINIMO = 50 * 1024
+# Miniaturas de tamaño fijo (caja máxima en px) generadas en segundo plano por un pool de hilos
+VOTACION_MINIATURAS = {'miniatura': (160, 160), 'tarjeton': (480, 360)}
+VOTACION_MINIATURAS_HILOS = 2
+
+# Servir estáticos y media desde Django también con DEBUG=False (sin servidor web delante)
+VOTACION_SERVIR_ARCHIVOS = os.environ.get('VOTACION_SERVIR_ARCHIVOS', '') == '1'
+# max-age (segundos) para archivos sin huella de contenido en el nombre
+VOTACION_CACHE_ARCHIVOS_SIN_HUELLA = 60 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -194,7 +285,9 @@ JAZZMIN_SETTINGS = {
         "votaciones.Plancha": "fas fa-list-ol",
         "votaciones.Voto": "fas fa-check-square",
         "votaciones.TipoConsejo": "fas fa-tags",
-        "votaciones.EstadisticaVotacion": "fas fa-chart-bar"
+        "votaciones.EstadisticaVotacion": "fas fa-chart-bar",
+        "votaciones.RegistroBoleta": "fas fa-link",
+        "votaciones.EventoAuditoria": "fas fa-user-shield"
     },
     
     # Enlaces personalizados por aplicación
@@ -204,6 +297,11 @@ JAZZMIN_SETTINGS = {
             "url": "admin:dashboard", 
             "icon": "fas fa-chart-bar",
             "permissions": ["votaciones.view_voto"]
+        }, {
+            "name": "Auditoría",
+            "url": "admin:auditoria_resumen",
+            "icon": "fas fa-user-shield",
+            "permissions": ["votaciones.view_eventoauditoria"]
         }]
     },
     
@@ -255,3 +353,136 @@ JAZZMIN_UI_TWEAKS = {
     },
     "actions_sticky_top": True
 }
+
+# Duración (segundos) del token firmado que autoriza al votante entre el ingreso y el voto
+VOTACION_TOKEN_MAX_AGE = 15 * 60
+# Alias de caché con el nombre, tipo de persona y documento del votante de cada token (el
+# token solo lleva el id y el nonce); si falta la entrada se leen de la base
+VOTACION_TOKEN_CACHE = 'sesiones'
+# Claves de envío del tarjetón: alias de caché donde se guardan y segundos que un reenvío
+# espera el resultado del envío original antes de procesarse por su cuenta
+VOTACION_CLAVES_ENVIO_CACHE = 'limites'
+VOTACION_CLAVES_ENVIO_ESPERA = 5
+# Reintentos de las transacciones de voto y de jurado ante bloqueos: intentos máximos y
+# segundos de la espera base y máxima (backoff exponencial con jitter completo)
+VOTACION_REINTENTOS_MAXIMO = 5
+VOTACION_REINTENTOS_BASE = 0.02
+VOTACION_REINTENTOS_TOPE = 0.5
+# Control de admisión (utils/admision.py): tarjetones y votos procesándose a la vez
+# (0 lo desactiva), segundos de vida de un cupo tomado, segundos que un voto espera
+# cupo antes de pasar a la sala, intervalo de sondeo de la sala, vigencia del turno y
+# segundos sin sondeo tras los que un turno se da por abandonado
+VOTACION_ADMISION_CUPOS = int(os.environ.get('VOTACION_ADMISION_CUPOS', '40'))
+VOTACION_ADMISION_CACHE = 'limites'
+VOTACION_ADMISION_RETENCION = 30
+VOTACION_ADMISION_ESPERA_VOTO = 3
+VOTACION_ADMISION_SONDEO = 2
+VOTACION_ADMISION_VIGENCIA_TURNO = 30 * 60
+VOTACION_ADMISION_LATIDO = 10
+# Auditoría de intentos bloqueados (utils/auditoria.py): eventos por bulk_create,
+# milisegundos máximos entre vaciados y tope de eventos en memoria si la base no responde
+VOTACION_AUDITORIA_LOTE = 100
+VOTACION_AUDITORIA_INTERVALO = 500
+VOTACION_AUDITORIA_MAXIMO = 10000
+
+# Cachés con nombre, instrumentadas por votaciones.cache.CacheInstrumentada (aciertos,
+# fallos, desalojos y latencia en el dashboard). Backend: 'locmem' (memoria de cada
+# proceso), 'archivo' (compartida entre los workers del mismo servidor, salvo 'limites')
+# o 'redis' (VOTACION_REDIS_URL; sin el paquete redis instalado se usa la caché en archivos)
+VOTACION_CACHE_BACKEND = os.environ.get('VOTACION_CACHE_BACKEND', 'locmem')
+VOTACION_REDIS_URL = os.environ.get('VOTACION_REDIS_URL', 'redis://127.0.0.1:6379/1')
+VOTACION_CACHE_DIRECTORIO = BASE_DIR / 'cache'
+if VOTACION_CACHE_BACKEND == 'redis' and importlib.util.find_spec('redis') is None:
+    VOTACION_CACHE_BACKEND = 'archivo'
+
+BACKENDS_CACHE = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'archivo': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+def _cache(nombre, timeout, max_entries, atomica=False):
+    backend = VOTACION_CACHE_BACKEND
+    # add() e incr() de FileBasedCache no son atómicos entre procesos: una caché que
+    # reserva cupos o claves se queda en la memoria de cada worker antes que compartirse mal
+    if atomica and backend == 'archivo':
+        backend = 'locmem'
+    ubicacion = {
+        'locmem': f'votaciones-{nombre}',
+        'archivo': str(VOTACION_CACHE_DIRECTORIO / nombre),
+        'redis': VOTACION_REDIS_URL,
+    }[backend]
+    return {
+        'BACKEND': 'votaciones.cache.CacheInstrumentada',
+        'INTERNO': BACKENDS_CACHE[backend],
+        'NOMBRE': nombre,
+        'LOCATION': ubicacion,
+        # En Redis todas comparten la base: el prefijo separa sus claves
+        'KEY_PREFIX': nombre,
+        'TIMEOUT': timeout,
+        'OPTIONS': {} if backend == 'redis' else {'MAX_ENTRIES': max_entries},
+    }
+
+CACHES = {
+    # Contadores de métricas, versión de resultados y usos generales
+    'default': _cache('default', 5 * 60, 5000),
+    # Fragmentos de las páginas públicas del flujo de votación ({% cache ... using="paginas" %})
+    'paginas': _cache('paginas', 60 * 60, 500),
+    # Contextos del dashboard por versión de resultados: rotan con cada voto, aparte para
+    # que su recambio no desaloje los contadores de 'default'
+    'estadisticas': _cache('estadisticas', VOTACION_DASHBOARD_TTL, 200),
+    # Sesiones del perfil cached_db
+    'sesiones': _cache('sesiones', 2 * 60 * 60, 50000),
+    # Cupos de admisión, turnos y claves de envío del tarjetón. Necesita add()/incr()
+    # atómicos: con 'archivo' queda en locmem, así que los cupos y las claves de envío
+    # valen por worker; para compartirlos entre workers use 'redis'
+    'limites': _cache('limites', 30 * 60, 50000, atomica=True),
+}
+
+# Perfil de sesiones para las páginas públicas de votación
+# ('db', 'cached_db' o 'signed_cookies'); el admin siempre usa la base de datos
+PERFILES_SESION = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+VOTACION_PERFIL_SESION = os.environ.get('VOTACION_PERFIL_SESION', 'signed_cookies')
+
+SESSION_ENGINE = PERFILES_SESION['db']
+SESSION_ENGINE_PUBLICO = PERFILES_SESION[VOTACION_PERFIL_SESION]
+SESSION_COOKIE_NAME_PUBLICO = 'votacion_sessionid'
+SESSION_RUTAS_ADMIN = ['/admin/', '/votacionesadmin/']
+SESSION_CACHE_ALIAS = 'sesiones'
+
+# Cada cuántos segundos purga sesiones expiradas el comando purgar_sesiones --continuo
+SESSION_PURGA_INTERVALO = 15 * 60
+
+# Registro de los loggers votaciones.*: cola en memoria y un hilo de fondo que escribe
+# líneas JSON en un archivo rotativo y en la consola (votaciones/utils/registro.py).
+# Con varios workers, incluir {pid} en VOTACION_LOG_ARCHIVO (un archivo por proceso).
+# VOTACION_LOG_NIVELES ajusta loggers puntuales: 'votaciones.horarios=DEBUG,votaciones.bus=INFO'
+VOTACION_LOG_ARCHIVO = os.environ.get('VOTACION_LOG_ARCHIVO', str(BASE_DIR / 'logs' / 'votaciones.log'))
+VOTACION_LOG_NIVEL = os.environ.get('VOTACION_LOG_NIVEL', 'INFO')
+VOTACION_LOG_NIVELES = os.environ.get('VOTACION_LOG_NIVELES', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'votaciones': {
+            'class': 'votaciones.utils.registro.ManejadorEnCola',
+            'archivo': VOTACION_LOG_ARCHIVO,
+            'max_bytes': 10 * 1024 * 1024,
+            'copias': 5,
+        },
+    },
+    'loggers': {
+        'votaciones': {'handlers': ['votaciones'], 'level': VOTACION_LOG_NIVEL, 'propagate': False},
+        # Traza de cada petición del middleware de horarios: solo si se pide DEBUG
+        'votaciones.horarios': {'level': 'INFO'},
+        **{
+            nombre.strip(): {'level': nivel.strip().upper()}
+            for nombre, _, nivel in (par.partition('=') for par in VOTACION_LOG_NIVELES.split(',') if '=' in par)
+        },
+    },
+}
@@ -15,13 +15,14 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
-from votaciones import views
+from django.views.static import serve
+from votaciones import views_staff
 
 urlpatterns = [
-    path('admin/dashboard/', views.dashboard_electoral, name='dashboard_electoral'),
+    path('admin/dashboard/', views_staff.dashboard_electoral, name='dashboard_electoral'),
     path('admin/', admin.site.urls),
     path('votaciones', include('votaciones.urls')),
 ]
@@ -30,3 +31,9 @@ urlpatterns = [
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+elif settings.VOTACION_SERVIR_ARCHIVOS:
+    # Producción sin servidor web: CacheArchivosMiddleware agrega las cabeceras de caché
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve, {'document_root': settings.MEDIA_ROOT}),
+        re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve, {'document_root': settings.STATIC_ROOT}),
+    ]
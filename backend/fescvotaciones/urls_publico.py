@@ -0,0 +1,24 @@
+"""
+URLs de los workers públicos (VOTACION_PERFIL_WORKER=publico)
+
+Solo el flujo de votación: sin admin, jazzmin ni reportes. El proxy envía /admin/ y
+/votacionesadmin/ a los workers con el perfil completo.
+"""
+from django.urls import path, include, re_path
+from django.conf import settings
+from django.conf.urls.static import static
+from django.views.static import serve
+
+urlpatterns = [
+    path('votaciones', include('votaciones.urls')),
+]
+
+# Servir archivos de media en desarrollo
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+elif settings.VOTACION_SERVIR_ARCHIVOS:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve, {'document_root': settings.MEDIA_ROOT}),
+        re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve, {'document_root': settings.STATIC_ROOT}),
+    ]
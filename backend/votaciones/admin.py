@@ -1,21 +1,107 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from django.conf import settings
 from django.contrib import admin
 from django.urls import reverse, path
-from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+from django.utils.functional import cached_property
+from django.core.paginator import Paginator
+from django.db import connection
 from django.http import HttpResponseRedirect, JsonResponse, HttpResponse
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Count, Q
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.contrib import messages
 from django.utils import timezone
 from django.db import transaction
-from .models import ResultadoVotacion, Votante, TipoConsejo, Plancha, Candidato, Voto, EstadisticaVotacion
-from .utils.generar_reporte import generar_reporte_pdf
+from django.utils.dateparse import parse_datetime
+import json
+from .models import ResultadoVotacion, Votante, TipoConsejo, Plancha, Candidato, Voto, EstadisticaVotacion, MarcaJurado, RegistroBoleta, FragmentoResultado, EventoAuditoria
+from .routers import lectura_en_replica
+from .utils.reintentos import ConflictoPersistente, reintentar_transaccion
+from .utils.version_resultados import resultados_cambiaron
+from .views_staff import auditoria_resumen, dashboard_electoral, estadisticas_json, metricas_json
+
+class PaginadorConteoEstimado(Paginator):
+    """Paginador que, sin filtros, usa el conteo estimado del motor en lugar de COUNT(*)
+    
+    En PostgreSQL lee pg_class.reltuples (actualizado por ANALYZE/autovacuum); en otros
+    motores o con filtros activos hace el conteo exacto.
+    """
+    
+    # Por debajo de este tamaño el COUNT(*) exacto es barato y preferible
+    UMBRAL_ESTIMACION = 10000
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if (
+            connection.vendor == 'postgresql'
+            and hasattr(queryset, 'query')
+            and not queryset.query.where
+        ):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table],
+                )
+                fila = cursor.fetchone()
+            if fila and fila[0] >= self.UMBRAL_ESTIMACION:
+                return int(fila[0])
+        return super().count
+
+class IPVotacionFilter(admin.SimpleListFilter):
+    """Filtro por IP con opciones fijas (el filtro por valor listaba todas las IPs del padrón)"""
+    title = 'IP de votación'
+    parameter_name = 'ip'
+    
+    def lookups(self, request, model_admin):
+        return [
+            ('con_ip', 'Con IP (virtual)'),
+            ('sin_ip', 'Sin IP'),
+        ]
+    
+    def queryset(self, request, queryset):
+        if self.value() == 'con_ip':
+            return queryset.filter(ip_votacion__isnull=False)
+        if self.value() == 'sin_ip':
+            return queryset.filter(ip_votacion__isnull=True)
+        return queryset
+
+# Fragmentos HTML precompilados de las columnas calculadas del changelist de votantes
+ESTADO_TIPO_VOTO = {
+    'debe_presencial': mark_safe('<span class="voto-estado alerta">⚠️ Debe votar presencial</span>'),
+    'puede_virtual': mark_safe('<span class="voto-estado virtual">📱 Puede votar virtual</span>'),
+    'conflicto_presencial': mark_safe('<span class="voto-estado conflicto">❌ CONFLICTO: Presencial con IP</span>'),
+    'conflicto_virtual': mark_safe('<span class="voto-estado conflicto">❌ CONFLICTO: Virtual sin IP</span>'),
+    'presencial_valido': mark_safe('<span class="voto-estado ok">✅ Voto presencial válido</span>'),
+    'virtual_valido': mark_safe('<span class="voto-estado ok">✅ Voto virtual válido</span>'),
+    'indefinido': mark_safe('<span class="voto-estado indefinido">➖ Sin definir</span>'),
+}
+
+YA_VOTO_JURADO = {
+    True: mark_safe('<span class="voto-estado ok">✓ Votó</span><br><small class="voto-estado-detalle">Virtual</small>'),
+    False: mark_safe('<span class="voto-estado ok">✓ Votó</span><br><small class="voto-estado-detalle">Físico</small>'),
+}
+
+BOTON_VOTO_FISICO = (
+    '<a class="button btn-voto-fisico" href="{url}?ids=%d">'
+    '<svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24"><path d="M19 7V4a2 2 0 0 0-2-2H7a2 2 0 0 0-2 2v3H2v2h2v11a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V9h2V7h-3zm-10 0V4h6v3h-6zm10 13H5V9h14v11zm-7-9v4h2v-4h3l-4-4-4 4h3z"/></svg>'
+    '<span>Confirmar voto fisico</span></a>'
+)
 
 @admin.register(Votante)
 class VotanteAdmin(admin.ModelAdmin):
     list_display = ['nombre', 'documento', 'tipo_persona', 'tipo_votante', 'ya_voto', 'fecha_voto', 'ip_votacion', 'verificar_tipo_voto', 'acciones_jurado']
-    list_filter = ['tipo_persona', 'tipo_votante', 'ya_voto', 'fecha_voto', 'ip_votacion']
+    list_filter = ['tipo_persona', 'tipo_votante', 'ya_voto', 'fecha_voto', IPVotacionFilter]
     search_fields = ['nombre', 'documento', 'ip_votacion']
+    show_full_result_count = False
+    paginator = PaginadorConteoEstimado
+    
+    # Columnas que realmente usa el changelist (updated_at se incluye para que save() lo actualice)
+    campos_changelist = [
+        'id', 'nombre', 'documento', 'tipo_persona', 'tipo_votante',
+        'ya_voto', 'fecha_voto', 'ip_votacion', 'updated_at',
+    ]
     # Removemos readonly_fields del nivel de clase
     actions = ['marcar_como_votado_fisico', 'desmarcar_voto']
     
@@ -55,25 +141,14 @@ class VotanteAdmin(admin.ModelAdmin):
     def acciones_jurado(self, obj):
         """Botones de acción para el jurado"""
         if obj.ya_voto:
-            return format_html(
-                '<span style="color: green; font-weight: bold;">✓ Votó</span><br>'
-                '<small style="color: #666;">{}</small>',
-                'Virtual' if obj.ip_votacion else 'Físico'
-            )
-        else:
-            return format_html(
-                '<a class="button" href="{}?ids={}" '
-                'style="display: inline-block; background: linear-gradient(90deg, #e31e24 0%, #ff5f6d 100%); '
-                'color: #fff !important; padding: 5px 12px; border: none; border-radius: 5px; font-size: 12px; '
-                'font-weight: 600; box-shadow: 0 2px 8px rgba(227,30,36,0.12); transition: background 0.2s; '
-                'text-decoration: none; cursor: pointer;">'
-                '<span style="vertical-align: middle; margin-right: 5px;">'
-                '<svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" fill="white" viewBox="0 0 24 24" style="display:inline-block;vertical-align:middle;"><path d="M19 7V4a2 2 0 0 0-2-2H7a2 2 0 0 0-2 2v3H2v2h2v11a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V9h2V7h-3zm-10 0V4h6v3h-6zm10 13H5V9h14v11zm-7-9v4h2v-4h3l-4-4-4 4h3z"/></svg>'
-                '</span>'
-                '<span style="color: #fff !important; vertical-align: middle;">Confirmar voto fisico</span></a>',
-                reverse('admin:marcar_voto_fisico'),
-                obj.id
-            )
+            return YA_VOTO_JURADO[bool(obj.ip_votacion)]
+        return mark_safe(self.boton_voto_fisico % obj.id)
+    
+    @cached_property
+    def boton_voto_fisico(self):
+        """Plantilla del botón con la URL ya resuelta; solo falta el id del votante"""
+        return BOTON_VOTO_FISICO.replace('{url}', reverse('admin:marcar_voto_fisico'))
+    
     acciones_jurado.short_description = 'Acciones Jurado'
     acciones_jurado.allow_tags = True
     
@@ -116,6 +191,9 @@ class VotanteAdmin(admin.ModelAdmin):
                 votante.save()
                 count += 1
         
+        if count:
+            resultados_cambiaron()
+        
         self.message_user(
             request,
             f'{count} votante(s) desmarcado(s). Sus votos han sido eliminados.',
@@ -124,7 +202,11 @@ class VotanteAdmin(admin.ModelAdmin):
     desmarcar_voto.short_description = "⚠️ Desmarcar voto (Solo Superusuarios)"
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related()
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        if match is not None and match.url_name == 'votaciones_votante_changelist':
+            queryset = queryset.only(*self.campos_changelist)
+        return queryset
     
     def get_actions(self, request):
         """Filtrar acciones según el tipo de usuario"""
@@ -140,35 +222,19 @@ class VotanteAdmin(admin.ModelAdmin):
         """Muestra el estado del tipo de voto y posibles conflictos"""
         if not obj.ya_voto:
             if obj.tipo_votante == 'presencial':
-                return format_html(
-                    '<span style="color: orange; font-weight: bold;">⚠️ Debe votar presencial</span>'
-                )
-            else:
-                return format_html(
-                    '<span style="color: blue;">📱 Puede votar virtual</span>'
-                )
+                return ESTADO_TIPO_VOTO['debe_presencial']
+            return ESTADO_TIPO_VOTO['puede_virtual']
         
         # Ya votó - verificar consistencia
         if obj.tipo_votante == 'presencial' and obj.ip_votacion:
-            return format_html(
-                '<span style="color: red; font-weight: bold;">❌ CONFLICTO: Presencial con IP</span>'
-            )
+            return ESTADO_TIPO_VOTO['conflicto_presencial']
         elif obj.tipo_votante == 'virtual' and not obj.ip_votacion:
-            return format_html(
-                '<span style="color: red; font-weight: bold;">❌ CONFLICTO: Virtual sin IP</span>'
-            )
+            return ESTADO_TIPO_VOTO['conflicto_virtual']
         elif obj.tipo_votante == 'presencial':
-            return format_html(
-                '<span style="color: green; font-weight: bold;">✅ Voto presencial válido</span>'
-            )
+            return ESTADO_TIPO_VOTO['presencial_valido']
         elif obj.tipo_votante == 'virtual':
-            return format_html(
-                '<span style="color: green; font-weight: bold;">✅ Voto virtual válido</span>'
-            )
-        else:
-            return format_html(
-                '<span style="color: gray;">➖ Sin definir</span>'
-            )
+            return ESTADO_TIPO_VOTO['virtual_valido']
+        return ESTADO_TIPO_VOTO['indefinido']
     
     verificar_tipo_voto.short_description = 'Estado Tipo Voto'
     verificar_tipo_voto.allow_tags = True
@@ -179,9 +245,13 @@ class TipoConsejoAdmin(admin.ModelAdmin):
     list_filter = ['activo']
     search_fields = ['nombre']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_total_planchas=Count('plancha'))
+    
     def total_planchas(self, obj):
-        return obj.plancha_set.count()
+        return obj._total_planchas
     total_planchas.short_description = 'Total Planchas'
+    total_planchas.admin_order_field = '_total_planchas'
 
 class CandidatoInline(admin.TabularInline):
     model = Candidato
@@ -196,9 +266,20 @@ class PlanchaAdmin(admin.ModelAdmin):
     search_fields = ['nombre', 'numero']
     inlines = [CandidatoInline]
     
+    def get_queryset(self, request):
+        # Los votos salen de ResultadoVotacion, que se conserva tras limpiar_datos_temporales,
+        # más los fragmentos aún no compactados (subconsulta: un segundo join duplicaría filas)
+        fragmentos = FragmentoResultado.objects.filter(plancha=OuterRef('pk')).order_by().values('plancha').annotate(
+            total=Sum('cantidad_votos')
+        ).values('total')
+        return super().get_queryset(request).select_related('tipo_consejo').annotate(
+            _total_votos=Coalesce(Sum('resultadovotacion__cantidad_votos'), 0) + Coalesce(Subquery(fragmentos), 0)
+        )
+    
     def total_votos(self, obj):
-        return obj.voto_set.count()
+        return obj._total_votos
     total_votos.short_description = 'Total Votos'
+    total_votos.admin_order_field = '_total_votos'
 
 @admin.register(Candidato)
 class CandidatoAdmin(admin.ModelAdmin):
@@ -219,6 +300,50 @@ class VotoAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         return False  # No permitir editar votos
 
+@admin.register(MarcaJurado)
+class MarcaJuradoAdmin(admin.ModelAdmin):
+    list_display = ['documento', 'resultado', 'estacion', 'marcado_en', 'recibido_en']
+    list_filter = ['resultado', 'estacion']
+    search_fields = ['documento', 'clave']
+    readonly_fields = ['clave', 'estacion', 'documento', 'votante', 'resultado', 'marcado_en', 'recibido_en']
+    
+    def has_add_permission(self, request):
+        return False  # Las marcas solo llegan desde las estaciones de jurado
+
+@admin.register(RegistroBoleta)
+class RegistroBoletaAdmin(admin.ModelAdmin):
+    list_display = ['secuencia', 'tipo_consejo', 'plancha', 'tipo_persona', 'franja', 'huella']
+    list_filter = ['tipo_persona', 'tipo_consejo']
+    list_select_related = ['plancha', 'tipo_consejo']
+    show_full_result_count = False
+    
+    # Libro de solo-agregar: solo lectura (la verificación se hace con verificar_libro_boletas)
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(EventoAuditoria)
+class EventoAuditoriaAdmin(admin.ModelAdmin):
+    list_display = ['creado', 'tipo', 'ip', 'documento', 'ruta', 'detalle']
+    list_filter = ['tipo']
+    # Búsqueda exacta: usa los índices por IP y por documento
+    search_fields = ['=ip', '=documento']
+    date_hierarchy = 'creado'
+    show_full_result_count = False
+    readonly_fields = ['tipo', 'ip', 'documento', 'ruta', 'detalle', 'creado']
+    
+    # Rastro de auditoría: solo lectura
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(EstadisticaVotacion)
 class EstadisticaVotacionAdmin(admin.ModelAdmin):
     list_display = ['total_votantes', 'total_votos_emitidos', 'porcentaje_participacion', 'ultima_actualizacion']
@@ -255,71 +380,17 @@ admin_site.register(Plancha, PlanchaAdmin)
 admin_site.register(Candidato, CandidatoAdmin)
 admin_site.register(Voto, VotoAdmin)
 admin_site.register(EstadisticaVotacion, EstadisticaVotacionAdmin)
+admin_site.register(MarcaJurado, MarcaJuradoAdmin)
+admin_site.register(RegistroBoleta, RegistroBoletaAdmin)
+admin_site.register(EventoAuditoria, EventoAuditoriaAdmin)
 
 # Personalizar el admin site con dashboard
 admin.site.site_header = 'FESC Votaciones - Dashboard'
 admin.site.site_title = 'Dashboard Electoral'
 admin.site.index_title = 'Panel de Control Electoral'
 
-def dashboard_view(request):
-    """Vista del dashboard electoral"""
-    # Actualizar estadísticas
-    estadisticas = EstadisticaVotacion.actualizar_estadisticas()
-    
-    # Obtener datos para gráficos
-    votos_por_tipo = list(Votante.objects.filter(ya_voto=True).values('tipo_persona').annotate(total=Count('id')))
-    votos_por_consejo = list(Voto.objects.values('tipo_consejo__nombre').annotate(total=Count('id')))
-    votos_por_plancha = list(Voto.objects.values('plancha__nombre', 'plancha__numero', 'plancha__tipo_persona').annotate(total=Count('id')).order_by('-total')[:10])
-    
-    # Estadísticas por hora (últimas 24 horas)
-    from django.utils import timezone
-    from datetime import timedelta
-    import json
-    
-    ahora = timezone.now()
-    hace_24h = ahora - timedelta(hours=24)
-    
-    votos_por_hora = []
-    for i in range(24):
-        hora_inicio = hace_24h + timedelta(hours=i)
-        hora_fin = hora_inicio + timedelta(hours=1)
-        votos_hora = Voto.objects.filter(fecha_voto__range=(hora_inicio, hora_fin)).count()
-        votos_por_hora.append({
-            'hora': hora_inicio.strftime('%H:00'),
-            'votos': votos_hora
-        })
-    
-    context = {
-        'title': 'Dashboard Electoral FESC',
-        'estadisticas': estadisticas,
-        'votos_por_tipo': json.dumps(votos_por_tipo),
-        'votos_por_consejo': json.dumps(votos_por_consejo),
-        'votos_por_plancha': votos_por_plancha,
-        'votos_por_hora': json.dumps(votos_por_hora),
-        'opts': {'app_label': 'votaciones'},
-        'has_permission': True,
-    }
-    
-    return render(request, 'admin/dashboard_electoral.html', context)
-
-def estadisticas_json(request):
-    """API para obtener estadísticas actualizadas"""
-    estadisticas = EstadisticaVotacion.actualizar_estadisticas()
-    
-    # Datos adicionales para gráficos en tiempo real
-    votos_por_tipo = list(Votante.objects.filter(ya_voto=True).values('tipo_persona').annotate(total=Count('id')))
-    
-    data = {
-        'total_votantes': estadisticas.total_votantes,
-        'total_votos': estadisticas.total_votos_emitidos,
-        'porcentaje_participacion': float(estadisticas.porcentaje_participacion),
-        'votos_estudiantes': estadisticas.votos_estudiantes,
-        'votos_docentes': estadisticas.votos_docentes,
-        'votos_graduados': estadisticas.votos_graduados,
-        'votos_por_tipo': votos_por_tipo,
-        'ultima_actualizacion': estadisticas.ultima_actualizacion.isoformat(),
-    }
-    return JsonResponse(data)
+# El dashboard y sus estadísticas en JSON son los mismos de views_staff (un solo cálculo cacheado)
+dashboard_view = dashboard_electoral
 
 # Vista especial para manejo de jurado
 def vista_jurado(request):
@@ -357,29 +428,254 @@ def vista_jurado(request):
             except Exception as e:
                 messages.error(request, f'Error: {str(e)}')
     
-    # Obtener estadísticas rápidas
-    total_votantes = Votante.objects.count()
-    ya_votaron = Votante.objects.filter(ya_voto=True).count()
-    votos_fisicos = Votante.objects.filter(ya_voto=True, ip_votacion__isnull=True).count()
-    votos_virtuales = Votante.objects.filter(ya_voto=True, ip_votacion__isnull=False).count()
-    
     # Últimos votantes marcados
-    ultimos_votos = Votante.objects.filter(ya_voto=True).order_by('-fecha_voto')[:10]
+    ultimos_votos = Votante.objects.filter(ya_voto=True).only(
+        'nombre', 'documento', 'tipo_persona', 'ip_votacion', 'fecha_voto'
+    ).order_by('-fecha_voto')[:10]
     
     context = {
         'title': 'Panel del Jurado - Voto Físico',
         'opts': {'app_label': 'votaciones'},
         'has_permission': True,
-        'total_votantes': total_votantes,
-        'ya_votaron': ya_votaron,
-        'votos_fisicos': votos_fisicos,
-        'votos_virtuales': votos_virtuales,
-        'porcentaje_participacion': round((ya_votaron / total_votantes * 100) if total_votantes > 0 else 0, 1),
         'ultimos_votos': ultimos_votos,
+        # El primer cursor también relee el margen: la estación descarta lo que ya lista
+        'cursor_cambios': f'{(timezone.now() - _margen_jurado()).isoformat()}|0',
+        **resumen_jurado(),
     }
     
     return render(request, 'admin/vista_jurado.html', context)
 
+# Máximo de marcas aceptadas por lote desde una estación de jurado
+JURADO_LOTE_MAXIMO = 500
+
+# Máximo de votantes devueltos por consulta al feed de cambios
+JURADO_CAMBIOS_MAXIMO = 500
+
+# Largo máximo del documento en una marca (MarcaJurado.documento)
+DOCUMENTO_MAXIMO = MarcaJurado._meta.get_field('documento').max_length
+
+def _margen_jurado():
+    return timedelta(seconds=getattr(settings, 'VOTACION_JURADO_MARGEN', 5))
+
+def resumen_jurado():
+    """Calcula los contadores del panel del jurado en una sola consulta"""
+    resumen = Votante.objects.aggregate(
+        total_votantes=Count('id'),
+        ya_votaron=Count('id', filter=Q(ya_voto=True)),
+        votos_fisicos=Count('id', filter=Q(ya_voto=True, ip_votacion__isnull=True)),
+        votos_virtuales=Count('id', filter=Q(ya_voto=True, ip_votacion__isnull=False)),
+    )
+    total = resumen['total_votantes']
+    resumen['porcentaje_participacion'] = round((resumen['ya_votaron'] / total * 100) if total > 0 else 0, 1)
+    return resumen
+
+def _hora_de_marca(valor, ahora):
+    """Interpreta la hora enviada por la estación; si es inválida o futura usa la hora del servidor"""
+    try:
+        marcado_en = parse_datetime(valor) if isinstance(valor, str) else None
+    except ValueError:
+        marcado_en = None
+    if marcado_en is None:
+        return ahora
+    if timezone.is_naive(marcado_en):
+        marcado_en = timezone.make_aware(marcado_en)
+    return min(marcado_en, ahora)
+
+def _aplicar_marcas_jurado(marcas, estacion, ahora):
+    """Transacción del lote de marcas; retorna (resultados, cantidad de votantes marcados)"""
+    resultados = []
+    
+    with transaction.atomic():
+        claves = [str(m.get('clave', '')) for m in marcas if isinstance(m, dict)]
+        previas = MarcaJurado.objects.in_bulk(claves, field_name='clave')
+        documentos = [str(m.get('documento', '')).strip() for m in marcas if isinstance(m, dict)]
+        votantes = Votante.objects.select_for_update().in_bulk(documentos, field_name='documento')
+        
+        nuevas_marcas = []
+        votantes_marcados = {}
+        
+        for marca in marcas:
+            if not isinstance(marca, dict):
+                resultados.append({'estado': 'invalido', 'error': 'Marca mal formada'})
+                continue
+            
+            clave = str(marca.get('clave', ''))
+            documento = str(marca.get('documento', '')).strip()
+            if not clave or len(clave) > 64 or not documento:
+                resultados.append({'clave': clave, 'documento': documento, 'estado': 'invalido',
+                                   'error': 'Se requieren clave y documento'})
+                continue
+            # Un documento que no cabe en MarcaJurado abortaría la transacción de todo el lote
+            if len(documento) > DOCUMENTO_MAXIMO:
+                resultados.append({'clave': clave, 'documento': documento[:DOCUMENTO_MAXIMO], 'estado': 'invalido',
+                                   'error': f'Documento de más de {DOCUMENTO_MAXIMO} caracteres'})
+                continue
+            
+            # Reintento de una marca ya aplicada: devolver el resultado original
+            if clave in previas:
+                previa = previas[clave]
+                resultados.append({'clave': clave, 'documento': previa.documento,
+                                   'estado': previa.resultado, 'duplicado': True})
+                continue
+            
+            marcado_en = _hora_de_marca(marca.get('marcado_en'), ahora)
+            votante = votantes.get(documento)
+            if votante is None:
+                estado = 'no_encontrado'
+            elif votante.ya_voto:
+                estado = 'ya_voto'
+            else:
+                estado = 'marcado'
+                votante.ya_voto = True
+                votante.ip_votacion = None  # Voto físico
+                votante.fecha_voto = marcado_en
+                votante.tipo_votante = 'presencial'
+                votante.updated_at = ahora
+                votantes_marcados[votante.pk] = votante
+            
+            registro = MarcaJurado(
+                clave=clave,
+                estacion=estacion,
+                documento=documento,
+                votante=votante,
+                resultado=estado,
+                marcado_en=marcado_en,
+            )
+            nuevas_marcas.append(registro)
+            previas[clave] = registro
+            
+            resultado = {'clave': clave, 'documento': documento, 'estado': estado, 'duplicado': False}
+            if votante is not None:
+                resultado['nombre'] = votante.nombre
+            resultados.append(resultado)
+        
+        if votantes_marcados:
+            Votante.objects.bulk_update(
+                votantes_marcados.values(),
+                ['ya_voto', 'ip_votacion', 'fecha_voto', 'tipo_votante', 'updated_at']
+            )
+            resultados_cambiaron()
+        MarcaJurado.objects.bulk_create(nuevas_marcas)
+    
+    return resultados, len(votantes_marcados)
+
+def jurado_sincronizar_api(request):
+    """API para que las estaciones de jurado envíen lotes de votos físicos
+    
+    Cuerpo JSON: {"estacion": "...", "marcas": [{"clave", "documento", "marcado_en"}, ...]}.
+    Todo el lote se aplica en una transacción y cada marca devuelve su propio resultado.
+    Reenviar una clave ya procesada devuelve el resultado original sin volver a escribir.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    
+    marcas = payload.get('marcas')
+    if not isinstance(marcas, list):
+        return JsonResponse({'error': 'Se esperaba una lista "marcas"'}, status=400)
+    if len(marcas) > JURADO_LOTE_MAXIMO:
+        return JsonResponse({'error': f'Máximo {JURADO_LOTE_MAXIMO} marcas por lote'}, status=400)
+    
+    estacion = str(payload.get('estacion', ''))[:50]
+    ahora = timezone.now()
+    
+    try:
+        resultados, marcados = reintentar_transaccion('jurado', _aplicar_marcas_jurado, marcas, estacion, ahora)
+    except ConflictoPersistente:
+        # La estación reenvía el lote con las mismas claves: las ya aplicadas no se repiten
+        return JsonResponse({'error': 'Base de datos ocupada, reintente el envío'}, status=503)
+    
+    return JsonResponse({
+        'resultados': resultados,
+        'marcados': marcados,
+        'servidor_en': ahora.isoformat(),
+    })
+
+def jurado_cambios_api(request):
+    """Feed de cambios para las estaciones de jurado
+    
+    Devuelve los votantes marcados como votados cuyo registro cambió después del cursor
+    ``desde``, junto con los contadores del panel y el cursor para la siguiente consulta.
+    
+    El cursor es ``<updated_at ISO>|<id>``: los cambios se ordenan por (updated_at, id),
+    así que los votantes con el mismo updated_at que caen a ambos lados del tope de
+    JURADO_CAMBIOS_MAXIMO no se pierden. Un cursor con solo la fecha equivale a id 0.
+    
+    updated_at se asigna dentro de la transacción, antes del commit: un voto puede hacerse
+    visible después de que el cursor ya pasó su hora. Por eso la última página no avanza
+    el cursor más allá de ahora menos VOTACION_JURADO_MARGEN; la consulta siguiente relee
+    esa ventana y la estación descarta los documentos que ya mostró. Las páginas
+    intermedias (``hay_mas``) sí avanzan hasta el último votante entregado.
+    
+    El feed no informa desmarcados (acción desmarcar_voto del admin): el votante sale del
+    filtro ya_voto. La estación los ve en los contadores de ``resumen``, que siempre son
+    los actuales, y en la lista de últimos votos al recargar la página.
+    """
+    fecha, _, ultimo_id = request.GET.get('desde', '').partition('|')
+    try:
+        desde = parse_datetime(fecha)
+        ultimo_id = int(ultimo_id or 0)
+    except ValueError:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
+    if desde is not None and timezone.is_naive(desde):
+        desde = timezone.make_aware(desde)
+    
+    # Hora tomada antes de la consulta: lo que confirme después queda dentro del margen
+    ahora = timezone.now()
+    margen = _margen_jurado()
+    cambios = Votante.objects.filter(ya_voto=True)
+    if desde is not None:
+        cambios = cambios.filter(Q(updated_at__gt=desde) | Q(updated_at=desde, id__gt=ultimo_id))
+    cambios = list(
+        cambios.order_by('updated_at', 'id').values(
+            'id', 'documento', 'nombre', 'tipo_persona', 'ip_votacion', 'fecha_voto', 'updated_at'
+        )[:JURADO_CAMBIOS_MAXIMO]
+    )
+    
+    hay_mas = len(cambios) == JURADO_CAMBIOS_MAXIMO
+    if cambios:
+        posicion = (cambios[-1]['updated_at'], cambios[-1]['id'])
+    elif desde is not None:
+        posicion = (desde, ultimo_id)
+    else:
+        posicion = (ahora, 0)
+    if not hay_mas:
+        # Nunca retroceder detrás del cursor recibido: la ventana ya releída no se repite
+        limite = (ahora - margen, 0)
+        if desde is not None:
+            limite = max(limite, (desde, ultimo_id))
+        posicion = min(posicion, limite)
+    cursor = f'{posicion[0].isoformat()}|{posicion[1]}'
+    
+    return JsonResponse({
+        'cambios': [
+            {
+                'documento': c['documento'],
+                'nombre': c['nombre'],
+                'tipo_persona': c['tipo_persona'],
+                'tipo_voto': 'Virtual' if c['ip_votacion'] else 'Físico',
+                'fecha_voto': c['fecha_voto'].isoformat() if c['fecha_voto'] else None,
+            }
+            for c in cambios
+        ],
+        'hay_mas': hay_mas,
+        'cursor': cursor,
+        'resumen': resumen_jurado(),
+    })
+
+def _marcar_voto_fisico(votante_id):
+    """Marca el voto físico en su propia transacción; retorna False si ya había votado"""
+    with transaction.atomic():
+        votante = get_object_or_404(Votante.objects.select_for_update(), id=votante_id)
+        if votante.ya_voto:
+            return False
+        votante.marcar_como_votado(ip_address=None)
+        return True
+
 def marcar_voto_fisico(request):
     """Vista para marcar voto físico individual"""
     if request.method == 'POST':
@@ -388,12 +684,10 @@ def marcar_voto_fisico(request):
         
         for votante_id in votante_ids:
             try:
-                votante = get_object_or_404(Votante, id=votante_id)
-                if not votante.ya_voto:
-                    votante.marcar_como_votado(ip_address=None)
-                    votante.tipo_votante = 'presencial'
-                    votante.save()
+                if reintentar_transaccion('voto_fisico', _marcar_voto_fisico, votante_id):
                     count += 1
+            except ConflictoPersistente:
+                messages.error(request, f'Votante {votante_id}: base de datos ocupada, intente nuevamente.')
             except Exception as e:
                 messages.error(request, f'Error con votante {votante_id}: {str(e)}')
         
@@ -414,6 +708,7 @@ def marcar_voto_fisico(request):
     
     return render(request, 'admin/confirmar_voto_fisico.html', context)
 
+@lectura_en_replica()
 def buscar_votante_api(request):
     """API para búsqueda rápida de votantes"""
     query = request.GET.get('q', '').strip()
@@ -437,15 +732,26 @@ def buscar_votante_api(request):
     
     return JsonResponse({'results': results})
 
+def reporte_pdf_view(request):
+    """Acta PDF oficial; el módulo del reporte (y reportlab) se importa al primer uso o al calentar"""
+    from .utils.generar_reporte import generar_reporte_pdf
+    return generar_reporte_pdf(request)
+
 # Agregar URLs personalizadas
 def get_admin_urls():
     from django.urls import path
     urls = [
         path('dashboard/', admin.site.admin_view(dashboard_view), name='dashboard'),
-        path('estadisticas-json/', admin.site.admin_view(estadisticas_json), name='estadisticas_json'),
+        # cacheable: sin never_cache, para que el navegador revalide con el ETag
+        path('estadisticas-json/', admin.site.admin_view(estadisticas_json, cacheable=True), name='estadisticas_json'),
+        path('metricas-json/', admin.site.admin_view(metricas_json), name='metricas_json'),
         path('marcar-voto-fisico/', admin.site.admin_view(marcar_voto_fisico), name='marcar_voto_fisico'),
         path('buscar-votante/', admin.site.admin_view(buscar_votante_api), name='buscar_votante_api'),
-        path('reporte-pdf/', admin.site.admin_view(generar_reporte_pdf), name='reporte_pdf'),
+        path('jurado/', admin.site.admin_view(vista_jurado), name='vista_jurado'),
+        path('jurado/sincronizar/', admin.site.admin_view(jurado_sincronizar_api), name='jurado_sincronizar'),
+        path('jurado/cambios/', admin.site.admin_view(jurado_cambios_api), name='jurado_cambios'),
+        path('reporte-pdf/', admin.site.admin_view(reporte_pdf_view), name='reporte_pdf'),
+        path('auditoria/', admin.site.admin_view(auditoria_resumen), name='auditoria_resumen'),
     ]
     return urls
 
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class VotacionesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'votaciones'
+
+    def ready(self):
+        # Registra los receptores post_save (variantes de imágenes)
+        from . import signals
+        # Chequeo del manifiesto de estáticos (manage.py check)
+        from . import checks
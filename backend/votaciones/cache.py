@@ -0,0 +1,199 @@
+"""Backend de caché instrumentado: aciertos, fallos, desalojos y latencia por alias
+
+CacheInstrumentada envuelve al backend real indicado en la clave INTERNO de la
+configuración (LocMem, archivos o Redis) y cuenta cada operación bajo el alias NOMBRE.
+Los contadores viven en memoria del proceso: el dashboard muestra los del worker que
+atiende la página.
+
+Los desalojos son las entradas que el backend borra para hacer lugar (el _cull de LocMem
+y de la caché en archivos al llegar a MAX_ENTRIES). Redis desaloja en el servidor según
+su maxmemory-policy, así que para ese backend no se cuentan.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+
+_AUSENTE = object()
+
+_contadores = {}
+_candado = threading.Lock()
+
+class _Contadores:
+    __slots__ = ('backend', 'aciertos', 'fallos', 'escrituras', 'desalojos', 'operaciones', 'latencia', 'latencia_maxima')
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.aciertos = self.fallos = self.escrituras = self.desalojos = self.operaciones = 0
+        self.latencia = self.latencia_maxima = 0.0
+
+def _registrar(nombre, backend):
+    with _candado:
+        return _contadores.setdefault(nombre, _Contadores(backend))
+
+class LocMemConDesalojos(LocMemCache):
+    """LocMemCache que informa cuántas entradas borra _cull"""
+    al_desalojar = None
+
+    def _cull(self):
+        antes = len(self._cache)
+        super()._cull()
+        if self.al_desalojar is not None:
+            self.al_desalojar(antes - len(self._cache))
+
+class ArchivoConDesalojos(FileBasedCache):
+    """FileBasedCache que informa cuántos archivos borra _cull"""
+    al_desalojar = None
+    _desalojando = False
+
+    def _cull(self):
+        self._desalojando = True
+        try:
+            super()._cull()
+        finally:
+            self._desalojando = False
+
+    def _delete(self, fname):
+        borrado = super()._delete(fname)
+        if borrado and self._desalojando and self.al_desalojar is not None:
+            self.al_desalojar(1)
+        return borrado
+
+_CON_DESALOJOS = {LocMemCache: LocMemConDesalojos, FileBasedCache: ArchivoConDesalojos}
+
+class CacheInstrumentada(BaseCache):
+    """Delegación completa al backend INTERNO, midiendo cada llamada"""
+
+    def __init__(self, location, params):
+        params = dict(params)
+        backend = params.pop('INTERNO', 'django.core.cache.backends.locmem.LocMemCache')
+        nombre = params.pop('NOMBRE', location or backend)
+        super().__init__(params)
+        clase = import_string(backend)
+        self._interna = _CON_DESALOJOS.get(clase, clase)(location, params)
+        self._contadores = _registrar(nombre, backend.rsplit('.', 1)[-1])
+        if hasattr(self._interna, 'al_desalojar'):
+            self._interna.al_desalojar = self._desalojo
+
+    def _desalojo(self, cantidad):
+        with _candado:
+            self._contadores.desalojos += cantidad
+
+    def _medir(self, inicio, aciertos=0, fallos=0, escrituras=0):
+        duracion = time.perf_counter() - inicio
+        contadores = self._contadores
+        with _candado:
+            contadores.aciertos += aciertos
+            contadores.fallos += fallos
+            contadores.escrituras += escrituras
+            contadores.operaciones += 1
+            contadores.latencia += duracion
+            if duracion > contadores.latencia_maxima:
+                contadores.latencia_maxima = duracion
+
+    # --- Lecturas ---
+
+    def get(self, key, default=None, version=None):
+        inicio = time.perf_counter()
+        valor = self._interna.get(key, _AUSENTE, version=version)
+        acierto = valor is not _AUSENTE
+        self._medir(inicio, aciertos=int(acierto), fallos=int(not acierto))
+        return valor if acierto else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        inicio = time.perf_counter()
+        valores = self._interna.get_many(keys, version=version)
+        self._medir(inicio, aciertos=len(valores), fallos=len(keys) - len(valores))
+        return valores
+
+    def has_key(self, key, version=None):
+        inicio = time.perf_counter()
+        existe = self._interna.has_key(key, version=version)
+        self._medir(inicio, aciertos=int(existe), fallos=int(not existe))
+        return existe
+
+    # --- Escrituras ---
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        inicio = time.perf_counter()
+        self._interna.set(key, value, timeout=timeout, version=version)
+        self._medir(inicio, escrituras=1)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        inicio = time.perf_counter()
+        agregado = self._interna.add(key, value, timeout=timeout, version=version)
+        self._medir(inicio, escrituras=int(agregado))
+        return agregado
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        inicio = time.perf_counter()
+        fallidas = self._interna.set_many(data, timeout=timeout, version=version)
+        self._medir(inicio, escrituras=len(data) - len(fallidas))
+        return fallidas
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        inicio = time.perf_counter()
+        existe = self._interna.touch(key, timeout=timeout, version=version)
+        self._medir(inicio)
+        return existe
+
+    def incr(self, key, delta=1, version=None):
+        # Una clave inexistente lanza ValueError: cuenta como fallo
+        inicio = time.perf_counter()
+        try:
+            valor = self._interna.incr(key, delta, version=version)
+        except ValueError:
+            self._medir(inicio, fallos=1)
+            raise
+        self._medir(inicio, aciertos=1, escrituras=1)
+        return valor
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def delete(self, key, version=None):
+        inicio = time.perf_counter()
+        borrado = self._interna.delete(key, version=version)
+        self._medir(inicio)
+        return borrado
+
+    def delete_many(self, keys, version=None):
+        inicio = time.perf_counter()
+        self._interna.delete_many(keys, version=version)
+        self._medir(inicio)
+
+    def clear(self):
+        self._interna.clear()
+
+    def close(self, **kwargs):
+        self._interna.close(**kwargs)
+
+def estadisticas():
+    """{alias: contadores} de cada caché instrumentada de settings.CACHES, en este proceso"""
+    for alias, configuracion in settings.CACHES.items():
+        if configuracion['BACKEND'] == f'{__name__}.CacheInstrumentada':
+            caches[alias]  # Registra los contadores aunque la caché aún no se haya usado
+    with _candado:
+        filas = {nombre: dict((campo, getattr(contadores, campo)) for campo in _Contadores.__slots__)
+                 for nombre, contadores in _contadores.items()}
+    resultado = {}
+    for nombre, fila in filas.items():
+        lecturas = fila['aciertos'] + fila['fallos']
+        resultado[nombre] = {
+            'backend': fila['backend'],
+            'aciertos': fila['aciertos'],
+            'fallos': fila['fallos'],
+            'tasa_aciertos': round(100 * fila['aciertos'] / lecturas, 1) if lecturas else None,
+            'escrituras': fila['escrituras'],
+            'desalojos': fila['desalojos'] if fila['backend'] != 'RedisCache' else None,
+            'operaciones': fila['operaciones'],
+            'latencia_media_ms': round(1000 * fila['latencia'] / fila['operaciones'], 3) if fila['operaciones'] else None,
+            'latencia_maxima_ms': round(1000 * fila['latencia_maxima'], 3),
+        }
+    return resultado
@@ -0,0 +1,14 @@
+from django.core.checks import Warning, register
+
+@register('estaticos')
+def manifiesto_estaticos(app_configs, **kwargs):
+    """Advierte si el manifiesto de estáticos está activo pero collectstatic no lo generó"""
+    from .storage import manifiesto_faltante
+    ruta = manifiesto_faltante()
+    if ruta is None:
+        return []
+    return [Warning(
+        f'Falta el manifiesto de estáticos ({ruta}); los workers no arrancarán sin él.',
+        hint='Ejecute "python manage.py collectstatic" o desactive VOTACION_ESTATICOS_MANIFIESTO.',
+        id='votaciones.W001',
+    )]
@@ -24,24 +24,41 @@ class ValidacionIngresoForm(forms.Form):
         
         try:
             votante = Votante.objects.get(documento=documento)
-            
-            if votante.ya_voto:
-                raise forms.ValidationError(
-                    f'El votante {votante.nombre} ya ha ejercido su derecho al voto el '
-                    f'{votante.fecha_voto.strftime("%d/%m/%Y a las %H:%M")}.'
-                )
-            
-            # NUEVA VALIDACIÓN: Verificar tipo de votante y agregar información
-            if votante.debe_votar_presencial():
-                raise forms.ValidationError(
-                    f'El votante {votante.nombre} está configurado para VOTACIÓN PRESENCIAL. '
-                    f'Debe dirigirse a las urnas físicas para votar. No puede usar el sistema virtual.'
-                )
-            
-            return votante
-            
         except Votante.DoesNotExist:
+            raise forms.ValidationError(self.MENSAJE_NO_REGISTRADO)
+        
+        return self.verificar_votante(votante)
+    
+    async def avalidar_votante(self):
+        """Versión asíncrona de validar_votante (ORM async, para el despliegue ASGI)"""
+        documento = self.cleaned_data['documento']
+        
+        try:
+            votante = await Votante.objects.aget(documento=documento)
+        except Votante.DoesNotExist:
+            raise forms.ValidationError(self.MENSAJE_NO_REGISTRADO)
+        
+        return self.verificar_votante(votante)
+    
+    MENSAJE_NO_REGISTRADO = (
+        'El número de documento ingresado no se encuentra registrado en el sistema electoral. '
+        'Verifique el número e intente nuevamente.'
+    )
+    
+    def verificar_votante(self, votante):
+        """Reglas de elegibilidad comunes a la validación síncrona y asíncrona"""
+        if votante.ya_voto:
             raise forms.ValidationError(
-                'El número de documento ingresado no se encuentra registrado en el sistema electoral. '
-                'Verifique el número e intente nuevamente.'
+                f'El votante {votante.nombre} ya ha ejercido su derecho al voto el '
+                f'{votante.fecha_voto.strftime("%d/%m/%Y a las %H:%M")}.'
             )
+        
+        # NUEVA VALIDACIÓN: Verificar tipo de votante y agregar información
+        if votante.debe_votar_presencial():
+            raise forms.ValidationError(
+                f'El votante {votante.nombre} está configurado para VOTACIÓN PRESENCIAL. '
+                f'Debe dirigirse a las urnas físicas para votar. No puede usar el sistema virtual.',
+                code='presencial',
+            )
+        
+        return votante
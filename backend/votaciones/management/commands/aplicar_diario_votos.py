@@ -0,0 +1,34 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils import diario_votos
+
+
+class Command(BaseCommand):
+    help = 'Aplica a la base de datos los votos pendientes del diario de escritura diferida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estado', action='store_true', help='Solo muestra cuántos bytes quedan por aplicar')
+        parser.add_argument(
+            '--compactar',
+            action='store_true',
+            help='Tras aplicar, vacía el diario y reinicia el punto de control (solo con los servidores detenidos)',
+        )
+
+    def handle(self, *args, **options):
+        if options['estado']:
+            self.stdout.write(f'Diario: {diario_votos.ruta_diario()}  pendiente: {diario_votos.pendientes()} bytes')
+            return
+
+        confirmador = diario_votos.Confirmador()
+        if not confirmador.adquirir():
+            raise CommandError('Otro proceso es el confirmador del diario (¿servidor en ejecución?)')
+
+        aplicadas, omitidas = diario_votos.drenar()
+        self.stdout.write(self.style.SUCCESS(f'{aplicadas} votos aplicados, {omitidas} omitidos'))
+
+        if options['compactar'] and diario_votos.pendientes() == 0 and os.path.exists(diario_votos.ruta_diario()):
+            os.truncate(diario_votos.ruta_diario(), 0)
+            diario_votos.guardar_punto_control(0)
+            self.stdout.write('Diario compactado')
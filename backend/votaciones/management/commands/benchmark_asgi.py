@@ -0,0 +1,117 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Votante
+from ...utils.benchmark import resumir_tiempos
+from ...utils.token_voto import COOKIE_TOKEN_VOTO, emitir_token_voto
+
+
+class Command(BaseCommand):
+    help = (
+        'Generador de carga HTTP: compara latencia y concurrencia de los despliegues WSGI y ASGI '
+        '(ambos servidores deben estar levantados con los perfiles de deploy/)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi', default='http://127.0.0.1:8000', help='URL base del servidor WSGI')
+        parser.add_argument('--asgi', default='http://127.0.0.1:8001', help='URL base del servidor ASGI')
+        parser.add_argument('--concurrencia', nargs='+', type=int, default=[50, 200, 1000])
+        parser.add_argument('--peticiones', type=int, default=5, help='Peticiones secuenciales por conexión')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument(
+            '--documento',
+            help='Documento de un votante habilitado: agrega el tarjetón (con token firmado) a las rutas medidas',
+        )
+
+    def handle(self, *args, **options):
+        rutas = [('index', '/votaciones', {})]
+        if options['documento']:
+            try:
+                votante = Votante.objects.get(documento=options['documento'])
+            except Votante.DoesNotExist:
+                raise CommandError(f'No existe el votante {options["documento"]}')
+            ruta_tarjeton = {'estudiante': '/votacionesestudiantes/', 'docente': '/votacionesdocentes/',
+                             'graduado': '/votacionesgraduados/'}[votante.tipo_persona]
+            rutas.append(('tarjetón', ruta_tarjeton, {COOKIE_TOKEN_VOTO: emitir_token_voto(votante)}))
+
+        for despliegue in ('wsgi', 'asgi'):
+            for concurrencia in options['concurrencia']:
+                for nombre, ruta, cookies in rutas:
+                    resultado = asyncio.run(self.medir(
+                        options[despliegue], ruta, cookies, concurrencia, options['peticiones'], options['timeout'],
+                    ))
+                    resumen = resumir_tiempos(resultado['tiempos'])
+                    self.stdout.write(
+                        f'{despliegue.upper():<4} c={concurrencia:<5} {nombre:<9} '
+                        f'ok: {resumen["n"]:>6}  errores: {resultado["errores"]:>5}  '
+                        f'req/s: {resultado["rps"]:>8.1f}  p50: {resumen["p50_ms"]:>9} ms  '
+                        f'p95: {resumen["p95_ms"]:>9} ms  max: {resumen["max_ms"]:>9} ms'
+                    )
+
+    async def medir(self, base, ruta, cookies, concurrencia, peticiones, timeout):
+        url = urlsplit(base)
+        host, puerto = url.hostname, url.port or 80
+        cabecera_cookies = '; '.join(f'{clave}={valor}' for clave, valor in cookies.items())
+        peticion = (
+            f'GET {ruta} HTTP/1.1\r\nHost: {url.netloc}\r\nConnection: keep-alive\r\n'
+            + (f'Cookie: {cabecera_cookies}\r\n' if cabecera_cookies else '')
+            + '\r\n'
+        ).encode()
+
+        tiempos = []
+        errores = 0
+
+        async def cliente():
+            nonlocal errores
+            try:
+                lector, escritor = await asyncio.wait_for(asyncio.open_connection(host, puerto), timeout)
+            except (OSError, asyncio.TimeoutError):
+                errores += peticiones
+                return
+            try:
+                for _ in range(peticiones):
+                    inicio = time.perf_counter()
+                    escritor.write(peticion)
+                    await escritor.drain()
+                    estado = await asyncio.wait_for(self.leer_respuesta(lector), timeout)
+                    if estado >= 500:
+                        errores += 1
+                    else:
+                        tiempos.append(time.perf_counter() - inicio)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                errores += 1
+            finally:
+                escritor.close()
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente() for _ in range(concurrencia)))
+        duracion = time.perf_counter() - inicio
+        return {'tiempos': tiempos, 'errores': errores, 'rps': len(tiempos) / duracion if duracion else 0}
+
+    async def leer_respuesta(self, lector):
+        """Lee una respuesta HTTP/1.1 completa (Content-Length o chunked) y retorna el código de estado"""
+        estado = int((await lector.readline()).split()[1])
+        longitud = 0
+        chunked = False
+        while True:
+            linea = (await lector.readline()).strip()
+            if not linea:
+                break
+            nombre, _, valor = linea.decode('latin-1').partition(':')
+            if nombre.lower() == 'content-length':
+                longitud = int(valor)
+            elif nombre.lower() == 'transfer-encoding' and 'chunked' in valor.lower():
+                chunked = True
+
+        if chunked:
+            while True:
+                tamano = int((await lector.readline()).strip().split(b';')[0], 16)
+                await lector.readexactly(tamano + 2)
+                if tamano == 0:
+                    break
+        elif longitud:
+            await lector.readexactly(longitud)
+        return estado
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.utils import timezone
+
+from ...models import Votante
+from ...utils.benchmark import base_de_datos_temporal, ContadorSQL, crear_padron, resumir_tiempos, cronometrar
+
+# Vistas del changelist medidas para cada tamaño del padrón
+CONSULTAS = [
+    ('sin filtros', ''),
+    ('ya votó', '?ya_voto__exact=1'),
+    ('estudiantes', '?tipo_persona__exact=estudiante'),
+    ('con IP', '?ip=con_ip'),
+    ('presencial', '?tipo_votante__exact=presencial'),
+    ('fecha voto', '?fecha_voto__gte=2000-01-01+00%3A00%3A00%2B00%3A00'),
+    ('búsqueda', '?q=1000000042'),
+    ('página 50', '?p=50'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de render del changelist de votantes según el tamaño del padrón'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', nargs='+', type=int, default=[1000, 10000, 50000])
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with base_de_datos_temporal() as conexion:
+            admin = get_user_model().objects.create_superuser('benchmark', 'benchmark@fesc.edu.co', 'benchmark')
+            cliente = Client()
+            cliente.force_login(admin)
+
+            creados = 0
+            for tamano in sorted(options['tamanos']):
+                votantes = crear_padron(tamano - creados, inicio=creados + 1)
+                creados = tamano
+
+                # Un tercio del padrón ya votó, la mitad de ellos virtualmente
+                ids_votaron = [votante.id for votante in votantes[::3]]
+                Votante.objects.filter(id__in=ids_votaron[::2]).update(
+                    ya_voto=True, ip_votacion='10.0.0.1', fecha_voto=timezone.now()
+                )
+                Votante.objects.filter(id__in=ids_votaron[1::2]).update(
+                    ya_voto=True, tipo_votante='presencial', fecha_voto=timezone.now()
+                )
+
+                for nombre, parametros in CONSULTAS:
+                    url = '/admin/votaciones/votante/' + parametros
+                    cliente.get(url)  # calentamiento
+
+                    contador = ContadorSQL()
+                    tiempos = []
+                    with conexion.execute_wrapper(contador):
+                        for _ in range(options['repeticiones']):
+                            respuesta, duracion = cronometrar(cliente.get, url)
+                            tiempos.append(duracion)
+
+                    resumen = resumir_tiempos(tiempos)
+                    self.stdout.write(
+                        f'padrón {tamano:>7}  {nombre:<12} HTTP {respuesta.status_code}  '
+                        f'consultas/render: {contador.total // options["repeticiones"]:>3}  '
+                        f'media: {resumen["media_ms"]:>9} ms  p95: {resumen["p95_ms"]:>9} ms  '
+                        f'{len(respuesta.content) // 1024} KiB'
+                    )
@@ -0,0 +1,88 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, OperationalError, transaction
+from django.test import override_settings
+
+from ...utils.benchmark import base_de_datos_temporal, crear_tarjeton, resumir_tiempos
+from ...utils.contadores import compactar, con_fragmentos, incrementar
+
+
+class Command(BaseCommand):
+    help = 'Mide la contención de votos simultáneos por una misma plancha con 1 y con K fragmentos por contador'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fragmentos', nargs='+', type=int, default=[1, 8], help='Valores de K a comparar')
+        parser.add_argument('--hilos', type=int, default=16, help='Votos simultáneos')
+        parser.add_argument('--votos', type=int, default=200, help='Votos por hilo')
+        parser.add_argument(
+            '--retencion',
+            type=float,
+            default=2.0,
+            help='Milisegundos que la transacción sigue abierta tras el incremento (resto del registro del voto)',
+        )
+
+    def handle(self, *args, **options):
+        with base_de_datos_temporal() as conexion:
+            if conexion.vendor == 'sqlite':
+                self.stdout.write(self.style.WARNING(
+                    'SQLite bloquea la base completa en cada escritura: los fragmentos solo reducen la '
+                    'contención en motores con bloqueo por fila (PostgreSQL)'
+                ))
+            tarjeton = crear_tarjeton('estudiante', consejos=1, planchas=1)
+            (consejo, (plancha,)), = tarjeton.items()
+
+            esperado = 0
+            for fragmentos in options['fragmentos']:
+                with override_settings(VOTACION_FRAGMENTOS_CONTADOR=fragmentos):
+                    tiempos, errores, duracion = self.concurrencia(plancha, consejo, options)
+                esperado += len(tiempos)
+                resumen = resumir_tiempos(tiempos)
+                self.stdout.write(
+                    f'[K={fragmentos:>3}] {len(tiempos):>6} votos en {duracion:.2f} s '
+                    f'({len(tiempos) / duracion:>8.0f} votos/s)  media: {resumen["media_ms"]} ms  '
+                    f'p95: {resumen["p95_ms"]} ms  max: {resumen["max_ms"]} ms  errores: {errores}'
+                )
+
+            contadores, votos = compactar()
+            total = con_fragmentos(plancha.resultadovotacion_set.all()).get().votos_totales
+            estado = self.style.SUCCESS('correcto') if total == esperado else self.style.ERROR(f'esperado {esperado}')
+            self.stdout.write(f'Compactación: {votos} votos de {contadores} contadores; total {total} ({estado})')
+
+    def concurrencia(self, plancha, consejo, options):
+        """Lanza los hilos votando por la misma plancha; retorna (duraciones, errores, segundos)"""
+        tiempos = []
+        errores = []
+        candado = threading.Lock()
+        barrera = threading.Barrier(options['hilos'])
+        retencion = options['retencion'] / 1000
+
+        def votar():
+            propios = []
+            fallidos = 0
+            barrera.wait()
+            try:
+                for _ in range(options['votos']):
+                    inicio = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            incrementar(plancha.id, consejo.id, 'estudiante')
+                            time.sleep(retencion)
+                    except OperationalError:
+                        fallidos += 1
+                        continue
+                    propios.append(time.perf_counter() - inicio)
+            finally:
+                connection.close()
+            with candado:
+                tiempos.extend(propios)
+                errores.append(fallidos)
+
+        hilos = [threading.Thread(target=votar) for _ in range(options['hilos'])]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return tiempos, sum(errores), time.perf_counter() - inicio
@@ -0,0 +1,83 @@
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+
+from ...models import Votante
+from ...utils import padron
+from ...utils.benchmark import base_de_datos_temporal, crear_padron, cronometrar
+
+
+class Command(BaseCommand):
+    help = 'Mide memoria, construcción y latencia de consulta del índice del padrón frente a la base'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votantes', type=int, default=100000)
+        parser.add_argument('--consultas', type=int, default=10000)
+        parser.add_argument('--cambios', type=int, default=200, help='Votos aplicados antes de medir la revisión')
+
+    def handle(self, *args, **options):
+        with base_de_datos_temporal():
+            votantes = crear_padron(options['votantes'])
+            # Un tercio ya votó y una décima parte es presencial
+            Votante.objects.filter(id__in=[votante.id for votante in votantes[::3]]).update(ya_voto=True)
+            Votante.objects.filter(id__in=[votante.id for votante in votantes[::10]]).update(tipo_votante='presencial')
+            # Padrón cargado antes de la jornada: la revisión periódica solo ve los cambios nuevos
+            Votante.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+            tracemalloc.start()
+            indice, duracion = cronometrar(padron.construir)
+            memoria, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(
+                f'Construcción (con tracemalloc): {len(indice)} votantes en {duracion * 1000:.0f} ms  '
+                f'arreglos: {indice.bytes_usados() / 1024:.0f} KiB ({indice.bytes_usados() / len(indice):.1f} B/votante)  '
+                f'memoria retenida: {memoria / 1024:.0f} KiB'
+            )
+
+            documentos = [votante.documento for votante in random.choices(votantes, k=options['consultas'])]
+            # Un 10 % de documentos inexistentes, como los errores de digitación del ingreso
+            documentos += [str(int(documento) + 10 ** 9) for documento in documentos[::10]]
+            self.medir('índice', documentos, padron.consultar)
+            with override_settings(VOTACION_PADRON_INDICE=False):
+                self.medir('base de datos', documentos[:2000], padron.consultar)
+
+            esperado = {fila[0]: padron.Entrada(*fila[1:]) for fila in Votante.objects.values_list(*padron.CAMPOS)}
+            errores = sum(1 for documento in documentos if padron.consultar(documento) != esperado.get(documento))
+            estado = self.style.SUCCESS('coincide') if not errores else self.style.ERROR(f'{errores} diferencias')
+            self.stdout.write(f'Comparación con la base: {estado}')
+
+            self.medir_revision(votantes, options['cambios'])
+
+    def medir(self, nombre, documentos, consultar):
+        tiempos = []
+        for documento in documentos:
+            inicio = time.perf_counter()
+            consultar(documento)
+            tiempos.append(time.perf_counter() - inicio)
+        # En microsegundos: resumir_tiempos redondea a milésimas de ms
+        tiempos.sort()
+        self.stdout.write(
+            f'Consulta ({nombre:<13}) {len(tiempos):>6}: media {statistics.fmean(tiempos) * 1e6:>8.1f} µs  '
+            f'p95 {tiempos[int(len(tiempos) * 0.95)] * 1e6:>8.1f} µs  max {tiempos[-1] * 1e6:>8.1f} µs'
+        )
+
+    def medir_revision(self, votantes, cambios):
+        """Costo de la revisión periódica sin cambios y tras `cambios` votos nuevos"""
+        _, sin_cambios = cronometrar(padron._refrescar, forzar=True)
+
+        pendientes = votantes[1::3][:cambios]
+        Votante.objects.filter(id__in=[votante.id for votante in pendientes]).update(
+            ya_voto=True, updated_at=timezone.now()
+        )
+        _, con_cambios = cronometrar(padron._refrescar, forzar=True)
+        aplicados = sum(1 for votante in pendientes if padron.consultar(votante.documento).ya_voto)
+        self.stdout.write(
+            f'Revisión: sin cambios {sin_cambios * 1000:.1f} ms  '
+            f'con {len(pendientes)} votos nuevos {con_cambios * 1000:.1f} ms ({aplicados} aplicados en el lugar)'
+        )
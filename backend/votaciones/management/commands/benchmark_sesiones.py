@@ -0,0 +1,84 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from ...utils.benchmark import (
+    base_de_datos_temporal, ContadorSQL, crear_padron, crear_tarjeton, resumir_tiempos, cronometrar,
+)
+
+TABLA_SESIONES = 'django_session'
+
+
+class Command(BaseCommand):
+    help = 'Compara las escrituras sobre django_session y la latencia del flujo de voto por perfil de sesión'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votantes', type=int, default=200, help='Votantes simulados por perfil')
+        parser.add_argument(
+            '--perfiles',
+            nargs='+',
+            default=list(settings.PERFILES_SESION),
+            choices=list(settings.PERFILES_SESION),
+            help='Perfiles de sesión a comparar',
+        )
+
+    def handle(self, *args, **options):
+        cantidad = options['votantes']
+
+        with base_de_datos_temporal() as conexion:
+            tarjeton = crear_tarjeton('estudiante')
+
+            for indice, perfil in enumerate(options['perfiles']):
+                motor = settings.PERFILES_SESION[perfil]
+                votantes = crear_padron(cantidad, inicio=1 + indice * cantidad)
+
+                # 1) Patrón de sesión previo al token firmado: 4 claves, 2 lecturas y flush por votante
+                contador = ContadorSQL()
+                tiempos = []
+                with conexion.execute_wrapper(contador):
+                    for votante in votantes:
+                        _, duracion = cronometrar(self.ciclo_sesion, import_module(motor).SessionStore, votante)
+                        tiempos.append(duracion)
+                self.reportar(perfil, 'ciclo de sesión por votante', contador, tiempos, cantidad)
+
+                # 2) Flujo HTTP completo: ingreso, tarjetón y voto
+                contador = ContadorSQL()
+                tiempos = []
+                with override_settings(SESSION_ENGINE_PUBLICO=motor), conexion.execute_wrapper(contador):
+                    for numero, votante in enumerate(votantes):
+                        ip = f'10.{indice}.{numero // 256}.{numero % 256}'
+                        _, duracion = cronometrar(self.flujo_voto, Client(REMOTE_ADDR=ip), votante, tarjeton)
+                        tiempos.append(duracion)
+                self.reportar(perfil, 'flujo de voto HTTP', contador, tiempos, cantidad)
+
+    def ciclo_sesion(self, SessionStore, votante):
+        sesion = SessionStore()
+        sesion['votante_id'] = votante.id
+        sesion['votante_nombre'] = votante.nombre
+        sesion['votante_tipo'] = votante.tipo_persona
+        sesion['votante_documento'] = votante.documento
+        sesion.save()
+        for _ in range(2):
+            SessionStore(sesion.session_key).get('votante_id')
+        sesion.flush()
+
+    def flujo_voto(self, cliente, votante, tarjeton):
+        cliente.post('/votaciones', {'documento': votante.documento})
+        cliente.get('/votacionesestudiantes/')
+        cliente.post(
+            '/votacionesprocesar-voto/',
+            {f'voto_{consejo.id}': planchas[0].id for consejo, planchas in tarjeton.items()},
+        )
+
+    def reportar(self, perfil, escenario, contador, tiempos, cantidad):
+        resumen = resumir_tiempos(tiempos)
+        escrituras_sesion = contador.escrituras[TABLA_SESIONES]
+        escrituras_votos = sum(n for tabla, n in contador.escrituras.items() if tabla != TABLA_SESIONES)
+        self.stdout.write(
+            f'[{perfil:>14}] {escenario:<28} '
+            f'escrituras django_session: {escrituras_sesion:>6} ({escrituras_sesion / cantidad:.2f}/votante)  '
+            f'otras escrituras: {escrituras_votos:>6}  sentencias: {contador.total:>6}  '
+            f'media: {resumen["media_ms"]} ms  p95: {resumen["p95_ms"]} ms'
+        )
@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...utils.contadores import compactar
+
+
+class Command(BaseCommand):
+    help = 'Pliega los fragmentos de los contadores de votos en ResultadoVotacion (opcionalmente en bucle)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Repite la compactación cada VOTACION_COMPACTACION_INTERVALO segundos hasta interrumpir el proceso',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=settings.VOTACION_COMPACTACION_INTERVALO,
+            help='Segundos entre compactaciones en modo continuo',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            inicio = time.perf_counter()
+            contadores, votos = compactar()
+            duracion = (time.perf_counter() - inicio) * 1000
+            self.stdout.write(f'{votos} votos de {contadores} contadores compactados en {duracion:.1f} ms')
+
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,94 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Carga la aplicación como lo haría un worker (sin calentar, para medir solo importaciones).
+# -X importtime no registra importlib.import_module, que Django usa para settings e
+# INSTALLED_APPS: se importan antes con __import__ para que aparezcan con su propio tiempo.
+PROGRAMA = (
+    "import os; __import__(os.environ['DJANGO_SETTINGS_MODULE']); "
+    "from django.conf import settings; [__import__(app) for app in settings.INSTALLED_APPS]; "
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+# Líneas de -X importtime: "import time: self [us] | cumulative | imported package"
+LINEA_IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de importación por módulo al arrancar un worker en cada perfil (público y completo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--perfiles', nargs='+', default=['publico', 'completo'], choices=['publico', 'completo'])
+        parser.add_argument('--top', type=int, default=20, help='Módulos a listar por perfil')
+        parser.add_argument(
+            '--agrupar',
+            action='store_true',
+            help='Sumar por paquete de primer nivel (django, jazzmin, reportlab, ...) en lugar de por módulo',
+        )
+        parser.add_argument('--calentamiento', action='store_true', help='Medir también las tareas de calentamiento')
+
+    def handle(self, *args, **options):
+        for perfil in options['perfiles']:
+            modulos, total = self.medir_importaciones(perfil)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'Perfil {perfil}: {len(modulos)} módulos importados en {total / 1000:.0f} ms'
+            ))
+
+            if options['agrupar']:
+                paquetes = defaultdict(int)
+                for nombre, propio, _ in modulos:
+                    paquetes[nombre.split('.')[0]] += propio
+                filas = sorted(paquetes.items(), key=lambda fila: fila[1], reverse=True)[:options['top']]
+                for paquete, propio in filas:
+                    self.stdout.write(f'  {propio / 1000:>9.1f} ms  {paquete}')
+            else:
+                # Ordenar por tiempo acumulado (incluye los módulos que cada uno importa)
+                filas = sorted(modulos, key=lambda fila: fila[2], reverse=True)[:options['top']]
+                self.stdout.write(f'  {"acumulado":>12}  {"propio":>10}  módulo')
+                for nombre, propio, acumulado in filas:
+                    self.stdout.write(f'  {acumulado / 1000:>9.1f} ms  {propio / 1000:>7.1f} ms  {nombre}')
+
+            presentes = {nombre.split('.')[0] for nombre, _, _ in modulos}
+            pesados = [paquete for paquete in ('jazzmin', 'reportlab', 'PIL') if paquete in presentes]
+            self.stdout.write(f'  paquetes pesados cargados: {", ".join(pesados) or "ninguno"}')
+
+        if options['calentamiento']:
+            from ...utils.calentamiento import calentar
+
+            self.stdout.write(self.style.MIGRATE_HEADING('Calentamiento (perfil de este proceso)'))
+            for nombre, duracion, error in calentar():
+                estado = self.style.ERROR(f'  error: {error}') if error else ''
+                self.stdout.write(f'  {duracion:>9.1f} ms  {nombre}{estado}')
+
+    def medir_importaciones(self, perfil):
+        """Arranca un intérprete con -X importtime en el perfil dado; retorna ([(módulo, propio, acumulado)], total µs)"""
+        entorno = dict(os.environ, VOTACION_PERFIL_WORKER=perfil, VOTACION_CALENTAR_AL_INICIAR='0')
+        entorno.setdefault('DJANGO_SETTINGS_MODULE', 'fescvotaciones.settings')
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROGRAMA],
+            cwd=settings.BASE_DIR,
+            env=entorno,
+            capture_output=True,
+            text=True,
+        )
+        if proceso.returncode != 0:
+            raise CommandError(f'El arranque del perfil {perfil} falló:\n{proceso.stderr[-2000:]}')
+
+        modulos = []
+        total = 0
+        for linea in proceso.stderr.splitlines():
+            coincidencia = LINEA_IMPORTTIME.match(linea)
+            if not coincidencia:
+                continue
+            propio, acumulado, sangria, nombre = coincidencia.groups()
+            modulos.append((nombre, int(propio), int(acumulado)))
+            if len(sangria) == 1:  # módulo de primer nivel: su acumulado ya incluye a los anidados
+                total += int(acumulado)
+        return modulos, total
@@ -0,0 +1,37 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Elimina las sesiones expiradas del admin y del perfil público (opcionalmente en bucle)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Repite la purga cada SESSION_PURGA_INTERVALO segundos hasta interrumpir el proceso',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=settings.SESSION_PURGA_INTERVALO,
+            help='Segundos entre purgas en modo continuo',
+        )
+
+    def handle(self, *args, **options):
+        motores = {settings.SESSION_ENGINE, settings.SESSION_ENGINE_PUBLICO}
+
+        while True:
+            inicio = time.perf_counter()
+            for motor in sorted(motores):
+                # signed_cookies no guarda nada en el servidor: su clear_expired no hace nada
+                import_module(motor).SessionStore.clear_expired()
+            duracion = (time.perf_counter() - inicio) * 1000
+            self.stdout.write(f'Sesiones expiradas purgadas ({", ".join(sorted(motores))}) en {duracion:.1f} ms')
+
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from ...models import Plancha, Candidato
+from ...utils.miniaturas import procesar_imagen
+
+IMAGENES = [
+    (Plancha, 'imagen_tarjeton', 'imagen_variantes'),
+    (Candidato, 'foto', 'foto_variantes'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Genera las variantes y miniaturas faltantes; omite las imágenes cuyo contenido no cambió'
+
+    def handle(self, *args, **options):
+        for modelo, campo_imagen, campo_variantes in IMAGENES:
+            pks = modelo.objects.exclude(**{campo_imagen: ''}).exclude(
+                **{f'{campo_imagen}__isnull': True}
+            ).values_list('pk', flat=True)
+
+            actualizadas = 0
+            for pk in pks:
+                antes = modelo.objects.values_list(campo_variantes, flat=True).get(pk=pk)
+                if procesar_imagen(modelo, pk, campo_imagen, campo_variantes) != antes:
+                    actualizadas += 1
+
+            self.stdout.write(f'{modelo._meta.verbose_name_plural}: {len(pks)} revisadas, {actualizadas} regeneradas')
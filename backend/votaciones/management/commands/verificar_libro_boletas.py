@@ -0,0 +1,100 @@
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import CabezaLibroBoletas
+from ...utils import libro_boletas
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta el libro de boletas encadenado y lo verifica en una pasada sobre el archivo mapeado '
+        'en memoria: recalcula la cadena SHA-256 y compara los conteos con ResultadoVotacion'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archivo', help='Verificar una exportación existente en lugar de exportar de nuevo')
+        parser.add_argument('--exportar', help='Ruta donde guardar la exportación (por defecto un temporal)')
+        parser.add_argument('--sin-resultados', action='store_true', help='No comparar con ResultadoVotacion')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        temporal = False
+        if ruta is None:
+            ruta = options['exportar']
+            if ruta is None:
+                descriptor, ruta = tempfile.mkstemp(suffix='.libro')
+                os.close(descriptor)
+                temporal = True
+            inicio = time.perf_counter()
+            # Las franjas terminadas entran al libro antes de exportar
+            libro_boletas.cerrar_franjas()
+            # Exportación, cabeza y contadores de la misma instantánea: un voto confirmado
+            # mientras se exporta no aparece como inconsistencia
+            with libro_boletas.lectura_consistente():
+                cantidad = libro_boletas.exportar(ruta)
+                cabeza, contadores, pendientes = self.leer_estado(options)
+            self.stdout.write(f'Exportados {cantidad} registros a {ruta} en {time.perf_counter() - inicio:.2f} s')
+        elif not os.path.exists(ruta):
+            raise CommandError(f'No existe {ruta}')
+        else:
+            with libro_boletas.lectura_consistente():
+                cabeza, contadores, pendientes = self.leer_estado(options)
+
+        try:
+            inicio = time.perf_counter()
+            resultado = libro_boletas.verificar_archivo(ruta)
+            duracion = time.perf_counter() - inicio
+        finally:
+            if temporal:
+                os.remove(ruta)
+
+        velocidad = resultado['registros'] / duracion if duracion else 0
+        self.stdout.write(
+            f'Verificados {resultado["registros"]} registros en {duracion:.2f} s '
+            f'({velocidad:,.0f} registros/s); huella final {resultado["huella_final"][:16]}…'
+        )
+
+        errores = list(resultado['errores'])
+        if cabeza is not None and options['archivo'] is None:
+            if cabeza.secuencia != resultado['registros'] or cabeza.huella != resultado['huella_final']:
+                errores.append(
+                    f'La cabeza del libro ({cabeza.secuencia}, {cabeza.huella[:16]}…) no coincide con la exportación'
+                )
+
+        secuencia_actual = cabeza.secuencia if cabeza is not None else 0
+        if contadores is not None and options['archivo'] is not None and secuencia_actual != resultado['registros']:
+            # Los contadores de hoy no corresponden a una exportación anterior
+            self.stdout.write(self.style.WARNING(
+                f'El libro va en la secuencia {secuencia_actual} y el archivo llega a {resultado["registros"]}: '
+                'no se comparan los conteos con ResultadoVotacion'
+            ))
+            contadores = None
+
+        if contadores is not None:
+            # Las boletas de la franja en curso aún no están en el libro
+            for plancha_id, consejo_id, tipo_persona, en_libro, en_contador in libro_boletas.comparar_resultados(
+                resultado['conteos'] + pendientes, contadores
+            ):
+                errores.append(
+                    f'Plancha {plancha_id} / consejo {consejo_id} / {tipo_persona}: '
+                    f'{en_libro} boletas en el libro, {en_contador} en ResultadoVotacion'
+                )
+
+        for error in errores:
+            self.stdout.write(self.style.ERROR(error))
+        if errores:
+            raise CommandError(f'Verificación fallida: {len(errores)} inconsistencias')
+        self.stdout.write(self.style.SUCCESS('Libro de boletas íntegro y consistente con ResultadoVotacion'))
+
+    def leer_estado(self, options):
+        """Cabeza del libro, contadores de ResultadoVotacion y conteos de las boletas pendientes
+
+        Los contadores son None con --sin-resultados.
+        """
+        cabeza = CabezaLibroBoletas.objects.filter(pk=1).first()
+        if options['sin_resultados']:
+            return cabeza, None, None
+        return cabeza, libro_boletas.leer_contadores(), libro_boletas.conteos_pendientes()
@@ -1,8 +1,15 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.shortcuts import render
 from django.contrib import messages
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.conf import settings
 from django.utils import timezone
 from datetime import time
+from importlib import import_module
 import logging
+import re
+
+from .utils import auditoria, bus_invalidacion
 
 class HorarioElectoralMiddleware:
     """Middleware que controla el acceso al sistema durante horarios específicos"""
@@ -10,23 +17,22 @@ class HorarioElectoralMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
         self.logger = logging.getLogger('votaciones.horarios')
-        print("🕐 Middleware de Horarios Electoral inicializado")
+        self.logger.debug("Middleware de horarios electorales inicializado")
     
     def __call__(self, request):
-        # Debug: mostrar información de la petición
-        print(f"🔍 Middleware procesando: {request.path}")
-        
+        self.logger.debug("Procesando %s", request.path)
+
         # Verificar si es una ruta del sistema electoral
         if self.es_ruta_electoral(request.path):
-            print(f"📋 Ruta electoral detectada: {request.path}")
+            self.logger.debug("Ruta electoral detectada: %s", request.path)
             
             if not self.esta_en_horario_electoral():
-                print("⏰ FUERA DE HORARIO - Mostrando página de restricción")
+                self.logger.debug("Fuera de horario: se muestra la página de restricción")
                 return self.respuesta_fuera_de_horario(request)
             else:
-                print("✅ DENTRO DE HORARIO - Permitiendo acceso")
+                self.logger.debug("Dentro de horario: acceso permitido")
         else:
-            print(f"🔓 Ruta no electoral: {request.path}")
+            self.logger.debug("Ruta no electoral: %s", request.path)
         
         response = self.get_response(request)
         return response
@@ -52,21 +58,21 @@ class HorarioElectoralMiddleware:
             '/media',
         ]
         
-        print(f"🔍 Verificando ruta: '{path}' (normalizada: '{path_normalized}')")
+        self.logger.debug("Verificando ruta %r (normalizada: %r)", path, path_normalized)
         
         # Si es una ruta excluida, no aplicar restricción
         for excluida in rutas_excluidas:
             if path.startswith(excluida):
-                print(f"   ❌ Ruta excluida: {excluida}")
+                self.logger.debug("Ruta excluida: %s", excluida)
                 return False
         
         # Verificar si es una ruta electoral (usando la ruta normalizada)
         for ruta in rutas_electorales:
             if path_normalized == ruta or path.startswith(ruta + '/'):
-                print(f"   ✅ Ruta electoral encontrada: {ruta}")
+                self.logger.debug("Ruta electoral encontrada: %s", ruta)
                 return True
         
-        print(f"   ➖ No es ruta electoral")
+        self.logger.debug("No es ruta electoral")
         return False
     
     def esta_en_horario_electoral(self):
@@ -75,10 +81,7 @@ class HorarioElectoralMiddleware:
         dia_semana = now.weekday()  # 0=Lunes, 6=Domingo
         hora_actual = now.time()
         
-        # Debug: mostrar información de tiempo
-        print(f"📅 Fecha actual: {now}")
-        print(f"📅 Día de la semana: {dia_semana} (0=Lunes, 6=Domingo)")
-        print(f"🕐 Hora actual: {hora_actual}")
+        self.logger.debug("Fecha actual: %s, día de la semana: %s (0=Lunes, 6=Domingo)", now, dia_semana)
         
         # PARA TESTING: Comentar las siguientes líneas para permitir acceso 24/7
         # return True
@@ -97,27 +100,27 @@ class HorarioElectoralMiddleware:
         
         # Lunes a Viernes (0-4)
         if 0 <= dia_semana <= 4:
-            print("📅 Es día de semana (Lunes-Viernes)")
+            self.logger.debug("Día de semana (lunes a viernes)")
             for i, (inicio, fin) in enumerate(horarios_lunes_viernes):
-                print(f"   Verificando horario {i+1}: {inicio} - {fin}")
+                self.logger.debug("Verificando horario %s: %s - %s", i + 1, inicio, fin)
                 if inicio <= hora_actual <= fin:
-                    print(f"   ✅ Está dentro del horario {i+1}")
+                    self.logger.debug("Dentro del horario %s", i + 1)
                     return True
         
         # Sábado (5)
         elif dia_semana == 5:
-            print("📅 Es sábado")
+            self.logger.debug("Sábado")
             for i, (inicio, fin) in enumerate(horarios_sabado):
-                print(f"   Verificando horario {i+1}: {inicio} - {fin}")
+                self.logger.debug("Verificando horario %s: %s - %s", i + 1, inicio, fin)
                 if inicio <= hora_actual <= fin:
-                    print(f"   ✅ Está dentro del horario {i+1}")
+                    self.logger.debug("Dentro del horario %s", i + 1)
                     return True
         
         # Domingo (6) - No hay votación
         else:
-            print("📅 Es domingo - Sin votación")
+            self.logger.debug("Domingo: sin votación")
         
-        print("❌ FUERA DE HORARIO")
+        self.logger.debug("Fuera de horario")
         return False
     
     def obtener_proximo_horario(self):
@@ -179,14 +182,13 @@ class HorarioElectoralMiddleware:
         now = timezone.localtime()
         proximo_horario = self.obtener_proximo_horario()
         
-        print("🚫 Generando respuesta de fuera de horario")
-        
         # Log del intento de acceso fuera de horario
+        ip = self.get_client_ip(request)
         self.logger.warning(
-            f'Acceso fuera de horario electoral. IP: {self.get_client_ip(request)}, '
-            f'Fecha/Hora: {now.strftime("%d/%m/%Y %H:%M:%S")}, '
-            f'Ruta: {request.path}'
+            'Acceso fuera de horario electoral. IP: %s, Ruta: %s', ip, request.path,
+            extra={'evento': 'fuera_de_horario', 'ip': ip, 'ruta': request.path},
         )
+        auditoria.registrar('fuera_de_horario', ip, ruta=request.path)
         
         # Nombres de días en español
         dias_espanol = {
@@ -231,7 +233,7 @@ class HorarioElectoralMiddleware:
         try:
             return render(request, 'votaciones/fuera_de_horario.html', context)
         except Exception as e:
-            print(f"❌ Error renderizando template: {e}")
+            self.logger.exception("Error renderizando la página de fuera de horario")
             # Fallback: respuesta HTML simple
             from django.http import HttpResponse
             html = f"""
@@ -276,3 +278,113 @@ class HorarioElectoralMiddleware:
         else:
             ip = request.META.get('REMOTE_ADDR')
         return ip
+
+
+class PerfilSesionMiddleware(SessionMiddleware):
+    """Usa el motor de sesión del perfil de votación en las páginas públicas y la BD en el admin
+    
+    Las sesiones públicas viajan en una cookie propia (SESSION_COOKIE_NAME_PUBLICO) para que
+    nunca pisen la sesión autenticada del administrador.
+    """
+    
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.SessionStorePublico = import_module(settings.SESSION_ENGINE_PUBLICO).SessionStore
+        self.rutas_admin = tuple(settings.SESSION_RUTAS_ADMIN)
+        self.cookie_publica = settings.SESSION_COOKIE_NAME_PUBLICO
+    
+    def es_ruta_admin(self, path):
+        return path.startswith(self.rutas_admin)
+    
+    def process_request(self, request):
+        if self.es_ruta_admin(request.path):
+            request.sesion_publica = False
+            return super().process_request(request)
+        
+        request.sesion_publica = True
+        request.session = self.SessionStorePublico(request.COOKIES.get(self.cookie_publica))
+    
+    def process_response(self, request, response):
+        if not getattr(request, 'sesion_publica', False):
+            return super().process_response(request, response)
+        
+        # Reutilizar la lógica de Django presentando la cookie pública con el nombre estándar
+        cookies_originales = request.COOKIES
+        request.COOKIES = {}
+        if self.cookie_publica in cookies_originales:
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = cookies_originales[self.cookie_publica]
+        try:
+            response = super().process_response(request, response)
+        finally:
+            request.COOKIES = cookies_originales
+        
+        morsel = response.cookies.pop(settings.SESSION_COOKIE_NAME, None)
+        if morsel is not None:
+            response.cookies[self.cookie_publica] = morsel.value
+            for atributo, valor in morsel.items():
+                response.cookies[self.cookie_publica][atributo] = valor
+        return response
+
+
+class CacheArchivosMiddleware:
+    """Cabeceras de caché para estáticos y media servidos por Django
+    
+    Los archivos con huella de contenido en el nombre (manifiesto de collectstatic o
+    variantes de imágenes) nunca cambian, así que se marcan como inmutables por un año.
+    """
+    
+    PATRON_HUELLA = re.compile(r'\.[0-9a-f]{12}\.')
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefijos = tuple('/' + url.lstrip('/') for url in (settings.STATIC_URL, settings.MEDIA_URL))
+        self.max_age_sin_huella = settings.VOTACION_CACHE_ARCHIVOS_SIN_HUELLA
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.agregar_cabeceras(request, self.get_response(request))
+    
+    async def __acall__(self, request):
+        return self.agregar_cabeceras(request, await self.get_response(request))
+    
+    def agregar_cabeceras(self, request, response):
+        if response.status_code == 200 and request.path.startswith(self.prefijos):
+            if self.PATRON_HUELLA.search(request.path):
+                response['Cache-Control'] = 'public, max-age=31536000, immutable'
+            else:
+                response['Cache-Control'] = f'public, max-age={self.max_age_sin_huella}'
+        
+        return response
+
+
+class BusInvalidacionMiddleware:
+    """Revisa el bus de invalidación antes de cada petición (utils/bus_invalidacion.py)
+    
+    Casi siempre es solo una comparación de tiempo: la consulta a VersionCache ocurre
+    como máximo una vez por VOTACION_BUS_INTERVALO segundos en cada worker.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        bus_invalidacion.revisar()
+        return self.get_response(request)
+    
+    async def __acall__(self, request):
+        if bus_invalidacion.revision_pendiente():
+            await sync_to_async(bus_invalidacion.revisar)()
+        return await self.get_response(request)
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.utils import timezone
 
@@ -47,7 +49,18 @@ class Votante(models.Model):
         verbose_name = "Votante"
         verbose_name_plural = "Votantes"
         ordering = ['nombre']
-        indexes = [models.Index(fields=['documento']),]
+        indexes = [
+            models.Index(fields=['documento']),
+            # Soporta el feed de cambios de las estaciones de jurado
+            models.Index(fields=['updated_at']),
+            # Orden por defecto y filtro por tipo de persona del changelist del admin. Los
+            # filtros por ya_voto, tipo_votante y fecha_voto no llevan índice: el voto
+            # actualiza esas columnas y el changelist no se mide más lento sin ellos
+            models.Index(fields=['nombre']),
+            models.Index(fields=['tipo_persona', 'nombre']),
+            # Filtro con/sin IP del changelist y control de IP duplicada al votar
+            models.Index(fields=['ip_votacion', 'ya_voto']),
+        ]
         unique_together = ['documento', 'tipo_persona']
     
     def __str__(self):
@@ -66,6 +79,26 @@ class Votante(models.Model):
             self.tipo_votante = 'virtual'
         
         self.save()
+        
+        from .utils.version_resultados import resultados_cambiaron
+        resultados_cambiaron()
+    
+    @classmethod
+    def reclamar_voto(cls, votante_id, ip_address):
+        """Marca al votante como votado solo si aún no lo estaba (UPDATE condicional)
+        
+        Retorna True si esta llamada lo marcó. Dentro de una transacción, el bloqueo de
+        fila que toma el UPDATE hace esperar a un envío simultáneo, que luego no encuentra
+        la fila con ya_voto=False y retorna False.
+        """
+        ahora = timezone.now()
+        return cls.objects.filter(id=votante_id, ya_voto=False).update(
+            ya_voto=True,
+            ip_votacion=ip_address,
+            fecha_voto=ahora,
+            tipo_votante='presencial' if ip_address is None else 'virtual',
+            updated_at=ahora,
+        ) == 1
     
     @classmethod
     def verificar_ip_duplicada(cls, ip_address):
@@ -121,6 +154,36 @@ class Votante(models.Model):
         else:
             return "Físico/Presencial"
 
+class MarcaJurado(models.Model):
+    """Marca de voto físico enviada por una estación de jurado (idempotente por clave)"""
+    RESULTADO_CHOICES = [
+        ('marcado', 'Marcado como votado'),
+        ('ya_voto', 'Ya había votado'),
+        ('no_encontrado', 'Documento no registrado'),
+    ]
+    
+    clave = models.CharField(max_length=64, unique=True, verbose_name="Clave de idempotencia")
+    estacion = models.CharField(max_length=50, blank=True, verbose_name="Estación de jurado")
+    documento = models.CharField(max_length=20, verbose_name="Número de documento")
+    votante = models.ForeignKey(
+        Votante,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Votante"
+    )
+    resultado = models.CharField(max_length=15, choices=RESULTADO_CHOICES, verbose_name="Resultado")
+    marcado_en = models.DateTimeField(verbose_name="Hora de marcado en la estación")
+    recibido_en = models.DateTimeField(auto_now_add=True, verbose_name="Hora de recepción")
+    
+    class Meta:
+        verbose_name = "Marca de Jurado"
+        verbose_name_plural = "Marcas de Jurado"
+        ordering = ['-recibido_en']
+    
+    def __str__(self):
+        return f"{self.documento} - {self.get_resultado_display()} ({self.estacion or 'sin estación'})"
+
 class TipoConsejo(models.Model):
     """Tipos de consejos disponibles para votar"""
     nombre = models.CharField(max_length=100, verbose_name="Nombre del consejo")
@@ -151,6 +214,12 @@ class Plancha(models.Model):
         null=True,
         verbose_name="Imagen del tarjetón"
     )
+    imagen_variantes = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Variantes responsivas de la imagen"
+    )
     activa = models.BooleanField(default=True, verbose_name="Plancha activa")
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -174,6 +243,7 @@ class Candidato(models.Model):
     nombre = models.CharField(max_length=200, verbose_name="Nombre completo")
     cargo = models.CharField(max_length=20, choices=CARGO_CHOICES, verbose_name="Cargo en la plancha")
     foto = models.ImageField(upload_to='candidatos/', blank=True, null=True, verbose_name="Foto del candidato")
+    foto_variantes = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Variantes responsivas de la foto")
     
     class Meta:
         verbose_name = "Candidato"
@@ -226,40 +296,47 @@ class ResultadoVotacion(models.Model):
     
     @classmethod
     def registrar_voto(cls, plancha, tipo_consejo, tipo_persona):
-        """Registra un voto incrementando el contador"""
-        resultado, created = cls.objects.get_or_create(
-            plancha=plancha,
-            tipo_consejo=tipo_consejo,
-            tipo_persona=tipo_persona,
-            defaults={'cantidad_votos': 0}
-        )
-        resultado.cantidad_votos += 1
-        resultado.save()
-        return resultado
+        """Registra un voto incrementando el contador (atómico; fragmentado si VOTACION_FRAGMENTOS_CONTADOR > 1)"""
+        from .utils.contadores import incrementar
+        incrementar(plancha.id, tipo_consejo.id, tipo_persona)
+        
+        from .utils.version_resultados import resultados_cambiaron
+        resultados_cambiaron()
     
     @classmethod
     def obtener_resultados_por_consejo(cls, tipo_consejo, tipo_persona):
-        """Obtiene resultados ordenados por cantidad de votos para un consejo específico"""
-        return cls.objects.filter(
+        """Obtiene resultados ordenados por cantidad de votos para un consejo específico
+        
+        cantidad_votos de cada resultado incluye los fragmentos aún no compactados.
+        """
+        from .utils.contadores import con_fragmentos
+        resultados = con_fragmentos(cls.objects.filter(
             tipo_consejo=tipo_consejo,
             tipo_persona=tipo_persona
-        ).select_related('plancha').order_by('-cantidad_votos', 'plancha__numero')
+        ).select_related('plancha')).order_by('-votos_totales', 'plancha__numero')
+        for resultado in resultados:
+            resultado.cantidad_votos = resultado.votos_totales
+        return resultados
     
     @classmethod
     def contabilizar_votos_pendientes(cls):
         """Contabiliza votos temporales que no han sido procesados"""
-        votos_pendientes = Voto.objects.filter(contabilizado=False)
-        count = 0
+        from .routers import en_primaria
         
-        for voto in votos_pendientes:
-            cls.registrar_voto(
-                plancha=voto.plancha,
-                tipo_consejo=voto.tipo_consejo,
-                tipo_persona=voto.votante.tipo_persona
-            )
-            voto.contabilizado = True
-            voto.save()
-            count += 1
+        # Leer-para-escribir: aunque se llame desde una vista de réplica, leer de la primaria
+        with en_primaria():
+            votos_pendientes = Voto.objects.filter(contabilizado=False)
+            count = 0
+            
+            for voto in votos_pendientes:
+                cls.registrar_voto(
+                    plancha=voto.plancha,
+                    tipo_consejo=voto.tipo_consejo,
+                    tipo_persona=voto.votante.tipo_persona
+                )
+                voto.contabilizado = True
+                voto.save()
+                count += 1
         
         return count
     
@@ -271,6 +348,101 @@ class ResultadoVotacion(models.Model):
         Voto.objects.all().delete()
         return count
 
+class FragmentoResultado(models.Model):
+    """Fragmento de un contador de ResultadoVotacion: los votos se reparten entre K filas
+    
+    Con VOTACION_FRAGMENTOS_CONTADOR > 1 cada voto incrementa un fragmento al azar en vez
+    de la fila del resultado, de modo que los votos simultáneos por la misma plancha no
+    esperan el mismo bloqueo. compactar_contadores los suma de vuelta en ResultadoVotacion.
+    """
+    plancha = models.ForeignKey(Plancha, on_delete=models.CASCADE, verbose_name="Plancha")
+    tipo_consejo = models.ForeignKey(TipoConsejo, on_delete=models.CASCADE, verbose_name="Tipo de consejo")
+    tipo_persona = models.CharField(
+        max_length=15,
+        choices=Votante.TIPO_PERSONA_CHOICES,
+        verbose_name="Tipo de votante"
+    )
+    fragmento = models.PositiveSmallIntegerField(verbose_name="Fragmento")
+    cantidad_votos = models.IntegerField(default=0, verbose_name="Votos sin compactar")
+    
+    class Meta:
+        verbose_name = "Fragmento de Resultado"
+        verbose_name_plural = "Fragmentos de Resultados"
+        unique_together = ['plancha', 'tipo_consejo', 'tipo_persona', 'fragmento']
+    
+    def __str__(self):
+        return f"{self.plancha} [{self.fragmento}] +{self.cantidad_votos}"
+
+class BoletaPendiente(models.Model):
+    """Boleta de una franja aún abierta, esperando a encadenarse en el libro
+    
+    Se escribe en la transacción del voto (los conteos del libro y de ResultadoVotacion
+    siguen cuadrando). La clave es un UUID al azar y no hay hora más fina que la franja,
+    así que la fila no revela el orden de llegada; al cerrar la franja sus boletas se
+    encadenan barajadas y se borran de aquí (utils/libro_boletas.py).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    plancha = models.ForeignKey(Plancha, on_delete=models.PROTECT, verbose_name="Plancha")
+    tipo_consejo = models.ForeignKey(TipoConsejo, on_delete=models.PROTECT, verbose_name="Tipo de consejo")
+    tipo_persona = models.CharField(
+        max_length=15,
+        choices=Votante.TIPO_PERSONA_CHOICES,
+        verbose_name="Tipo de votante"
+    )
+    franja = models.DateTimeField(verbose_name="Franja horaria")
+    
+    class Meta:
+        verbose_name = "Boleta Pendiente"
+        verbose_name_plural = "Boletas Pendientes"
+        indexes = [
+            models.Index(fields=['franja']),
+        ]
+
+class RegistroBoleta(models.Model):
+    """Libro de boletas anónimo de solo-agregar: cada entrada encadena el SHA-256 de la anterior
+    
+    Las boletas de una franja se encadenan juntas y en orden aleatorio al cerrarse la
+    franja: la secuencia no sigue el orden de los votos, y cruzarla con Votante.fecha_voto
+    no empareja boletas con votantes más allá de la franja.
+    """
+    secuencia = models.PositiveBigIntegerField(unique=True, verbose_name="Secuencia")
+    plancha = models.ForeignKey(Plancha, on_delete=models.PROTECT, verbose_name="Plancha")
+    tipo_consejo = models.ForeignKey(TipoConsejo, on_delete=models.PROTECT, verbose_name="Tipo de consejo")
+    tipo_persona = models.CharField(
+        max_length=15,
+        choices=Votante.TIPO_PERSONA_CHOICES,
+        verbose_name="Tipo de votante"
+    )
+    # Hora truncada a VOTACION_LIBRO_FRANJA; dentro de la franja el orden es aleatorio
+    franja = models.DateTimeField(verbose_name="Franja horaria")
+    huella = models.CharField(max_length=64, verbose_name="Huella encadenada (SHA-256)")
+    
+    class Meta:
+        verbose_name = "Registro del Libro de Boletas"
+        verbose_name_plural = "Libro de Boletas"
+        ordering = ['secuencia']
+    
+    def __str__(self):
+        return f"#{self.secuencia} {self.huella[:12]}"
+
+class CabezaLibroBoletas(models.Model):
+    """Fila única con la última secuencia y huella del libro; bloquearla serializa la cadena"""
+    secuencia = models.PositiveBigIntegerField(default=0)
+    huella = models.CharField(max_length=64, default='0' * 64)
+    
+    class Meta:
+        verbose_name = "Cabeza del Libro de Boletas"
+        verbose_name_plural = "Cabeza del Libro de Boletas"
+    
+    def __str__(self):
+        return f"Libro de boletas: {self.secuencia} registros"
+    
+    @classmethod
+    def bloquear(cls):
+        """Obtiene la cabeza con select_for_update (debe llamarse dentro de una transacción)"""
+        cls.objects.get_or_create(pk=1)
+        return cls.objects.select_for_update().get(pk=1)
+
 class EstadisticaVotacion(models.Model):
     """Estadísticas precalculadas para el dashboard"""
     total_votantes = models.PositiveIntegerField(default=0)
@@ -314,3 +486,59 @@ class EstadisticaVotacion(models.Model):
             
         estadistica.save()
         return estadistica
+
+class VersionCache(models.Model):
+    """Versión por tema de las cachés en memoria de cada worker (bus de invalidación)
+    
+    Un cambio en planchas, consejos o el padrón incrementa la versión de su tema en la
+    misma transacción; cada worker lee esta tabla (unas pocas filas) a intervalos y
+    descarta sus cachés locales del tema que cambió. Ver utils/bus_invalidacion.py.
+    """
+    nombre = models.CharField(max_length=50, unique=True, verbose_name="Tema")
+    version = models.PositiveBigIntegerField(default=0, verbose_name="Versión")
+    actualizado = models.DateTimeField(auto_now=True, verbose_name="Última publicación")
+    
+    class Meta:
+        verbose_name = "Versión de Caché"
+        verbose_name_plural = "Versiones de Caché"
+    
+    def __str__(self):
+        return f"{self.nombre} v{self.version}"
+
+class EventoAuditoria(models.Model):
+    """Evento de seguridad del flujo de votación (intento bloqueado)
+    
+    Las vistas no escriben esta tabla: los eventos se acumulan en memoria del proceso y
+    se insertan en lotes con bulk_create (ver utils/auditoria.py). `creado` es la hora
+    del intento, no la de la inserción. Los 'voto_diferido_rechazado' los escribe el
+    confirmador del diario de votos, en la transacción del lote.
+    """
+    TIPO_CHOICES = [
+        ('presencial_virtual', 'Votante presencial intentando votar virtualmente'),
+        ('ip_duplicada', 'Voto desde una IP que ya votó'),
+        ('fuera_de_horario', 'Acceso fuera del horario electoral'),
+        ('voto_diferido_rechazado', 'Voto del diario rechazado al aplicarlo'),
+    ]
+    
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES, verbose_name="Tipo de evento")
+    ip = models.GenericIPAddressField(null=True, blank=True, verbose_name="IP")
+    documento = models.CharField(max_length=20, blank=True, verbose_name="Número de documento")
+    ruta = models.CharField(max_length=200, blank=True, verbose_name="Ruta")
+    detalle = models.CharField(max_length=255, blank=True, verbose_name="Detalle")
+    creado = models.DateTimeField(verbose_name="Fecha del evento")
+    
+    class Meta:
+        verbose_name = "Evento de Auditoría"
+        verbose_name_plural = "Eventos de Auditoría"
+        ordering = ['-creado']
+        indexes = [
+            # Listado por fecha y agregados por ventana de tiempo
+            models.Index(fields=['creado']),
+            # Agregados por tipo, IP y documento dentro de la ventana
+            models.Index(fields=['tipo', 'creado']),
+            models.Index(fields=['ip', 'creado']),
+            models.Index(fields=['documento', 'creado']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.ip or self.documento or 'sin origen'} ({self.creado:%d/%m/%Y %H:%M:%S})"
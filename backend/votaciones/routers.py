@@ -0,0 +1,103 @@
+"""Enrutamiento de lecturas a la réplica para dashboards y reportes
+
+Las vistas de solo lectura del staff se marcan con lectura_en_replica; dentro de ese
+contexto las lecturas van al alias 'replica' mientras su retraso esté dentro de
+VOTACION_REPLICA_RETRASO_MAXIMO. Todas las escrituras (votos, jurado, estadísticas)
+y cualquier lectura dentro de una transacción van siempre a la primaria.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections, DatabaseError
+
+logger = logging.getLogger('votaciones.replica')
+
+ALIAS_PRIMARIA = 'default'
+ALIAS_REPLICA = 'replica'
+
+_usar_replica = ContextVar('usar_replica', default=False)
+
+_estado_replica = {'medido_en': 0.0, 'disponible': False}
+_candado_estado = threading.Lock()
+
+@contextmanager
+def lectura_en_replica():
+    """Contexto (o decorador) que envía las lecturas a la réplica"""
+    token = _usar_replica.set(True)
+    try:
+        yield
+    finally:
+        _usar_replica.reset(token)
+
+@contextmanager
+def en_primaria():
+    """Fuerza la primaria dentro de un bloque (p. ej. leer-para-escribir en una vista de réplica)"""
+    token = _usar_replica.set(False)
+    try:
+        yield
+    finally:
+        _usar_replica.reset(token)
+
+def medir_retraso_replica():
+    """Segundos de retraso de la réplica respecto a la primaria (0 si no se puede medir por motor)"""
+    conexion = connections[ALIAS_REPLICA]
+    if conexion.vendor != 'postgresql':
+        # SQLite (réplica de prueba o copia sincronizada externamente): no expone el retraso
+        return 0.0
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN NOT pg_is_in_recovery() "
+            "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0])
+
+def replica_disponible():
+    """Indica si la réplica está configurada y dentro del límite de frescura (medido cada pocos segundos)"""
+    if ALIAS_REPLICA not in settings.DATABASES:
+        return False
+
+    ahora = time.monotonic()
+    intervalo = getattr(settings, 'VOTACION_REPLICA_CHEQUEO', 5)
+    if ahora - _estado_replica['medido_en'] < intervalo:
+        return _estado_replica['disponible']
+
+    with _candado_estado:
+        if ahora - _estado_replica['medido_en'] >= intervalo:
+            maximo = getattr(settings, 'VOTACION_REPLICA_RETRASO_MAXIMO', 10)
+            try:
+                retraso = medir_retraso_replica()
+                disponible = retraso <= maximo
+                if not disponible:
+                    logger.warning('Réplica con %.1f s de retraso (máximo %s s): se lee de la primaria', retraso, maximo)
+            except DatabaseError:
+                logger.exception('Réplica no disponible: se lee de la primaria')
+                disponible = False
+            _estado_replica.update(medido_en=ahora, disponible=disponible)
+    return _estado_replica['disponible']
+
+class ReplicaRouter:
+    """Router de base de datos: escrituras a la primaria, lecturas marcadas a la réplica"""
+
+    def db_for_read(self, model, **hints):
+        # Sesiones, usuarios y permisos se leen siempre de la primaria (recién escritos en el login)
+        if not _usar_replica.get() or model._meta.app_label != 'votaciones':
+            return None
+        # Dentro de una transacción se lee lo que se va a escribir: siempre la primaria
+        if connections[ALIAS_PRIMARIA].in_atomic_block:
+            return ALIAS_PRIMARIA
+        return ALIAS_REPLICA if replica_disponible() else ALIAS_PRIMARIA
+
+    def db_for_write(self, model, **hints):
+        return ALIAS_PRIMARIA
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Ambos alias contienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == ALIAS_PRIMARIA
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Plancha, Candidato, TipoConsejo, Votante
+from .utils.miniaturas import encolar_imagen
+from .utils.bus_invalidacion import publicar_receptor
+
+def actualizar_variantes(instancia, campo_imagen, campo_variantes):
+    """Programa la generación de variantes fuera del request si la imagen cambió"""
+    imagen = getattr(instancia, campo_imagen)
+    descriptor = getattr(instancia, campo_variantes) or {}
+
+    if not imagen:
+        # Imagen eliminada: limpiar el descriptor sin volver a disparar post_save
+        if descriptor:
+            type(instancia).objects.filter(pk=instancia.pk).update(**{campo_variantes: {}})
+            setattr(instancia, campo_variantes, {})
+        return
+
+    # El worker compara la huella del contenido; aquí solo se evita encolar si nada cambió
+    if descriptor.get('origen') != imagen.name:
+        encolar_imagen(type(instancia), instancia.pk, campo_imagen, campo_variantes)
+
+@receiver(post_save, sender=Plancha)
+def variantes_imagen_tarjeton(sender, instance, raw=False, **kwargs):
+    if not raw:
+        actualizar_variantes(instance, 'imagen_tarjeton', 'imagen_variantes')
+
+@receiver(post_save, sender=Candidato)
+def variantes_foto_candidato(sender, instance, raw=False, **kwargs):
+    if not raw:
+        actualizar_variantes(instance, 'foto', 'foto_variantes')
+
+# Cualquier cambio en el contenido del tarjetón descarta los tarjetones de todos los workers
+publicar_tarjetones = publicar_receptor('tarjetones')
+for modelo in (Plancha, Candidato, TipoConsejo):
+    post_save.connect(publicar_tarjetones, sender=modelo, dispatch_uid=f'tarjetones_guardar_{modelo.__name__}')
+    post_delete.connect(publicar_tarjetones, sender=modelo, dispatch_uid=f'tarjetones_borrar_{modelo.__name__}')
+
+# Los borrados no dejan rastro en updated_at: los índices del padrón se reconstruyen
+publicar_padron = publicar_receptor('padron')
+post_delete.connect(publicar_padron, sender=Votante, dispatch_uid='padron_borrar_votante')
@@ -0,0 +1,21 @@
+// Auto-refresh cada 60 segundos
+setTimeout(function() {
+    window.location.reload();
+}, 60000);
+
+// Actualizar hora cada segundo
+function actualizarHora() {
+    const now = new Date();
+    const horaActual = now.toLocaleTimeString('es-ES', {
+        hour: '2-digit',
+        minute: '2-digit',
+        second: '2-digit'
+    });
+
+    const elementos = document.querySelectorAll('.time-value');
+    if (elementos.length > 1) {
+        elementos[1].textContent = horaActual;
+    }
+}
+
+setInterval(actualizarHora, 1000);
@@ -0,0 +1,23 @@
+// Consulta el turno cada cierto tiempo y entra al tarjetón cuando es admitido
+(function() {
+    const sala = document.getElementById('sala-espera');
+    const sondeo = parseInt(sala.dataset.sondeo, 10);
+
+    function consultar() {
+        fetch(sala.dataset.turnoUrl, {cache: 'no-store', credentials: 'same-origin'})
+            .then(function(respuesta) { return respuesta.json(); })
+            .then(function(estado) {
+                if (estado.admitido) {
+                    window.location.replace(sala.dataset.siguiente);
+                    return;
+                }
+                document.getElementById('posicion').textContent = estado.posicion;
+                setTimeout(consultar, sondeo);
+            })
+            .catch(function() {
+                setTimeout(consultar, sondeo * 2);
+            });
+    }
+
+    setTimeout(consultar, sondeo);
+})();
@@ -0,0 +1,221 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Auto-ocultar mensajes después de tiempos específicos según el tipo
+    const alerts = document.querySelectorAll('.alert');
+
+    alerts.forEach(function(alert, index) {
+        // Agregar animación de entrada
+        alert.classList.add('show');
+
+        // Determinar tiempo de auto-ocultado según el tipo
+        let hideDelay = 5000; // Default: 5 segundos
+
+        if (alert.classList.contains('alert-success')) {
+            hideDelay = 4000; // 4 segundos para éxito
+        } else if (alert.classList.contains('alert-error') || alert.classList.contains('alert-danger')) {
+            hideDelay = 8000; // 8 segundos para errores (más tiempo)
+        } else if (alert.classList.contains('alert-warning')) {
+            hideDelay = 6000; // 6 segundos para advertencias
+        } else if (alert.classList.contains('alert-info')) {
+            hideDelay = 5000; // 5 segundos para información
+        }
+
+        // Auto-ocultar con el tiempo correspondiente
+        setTimeout(function() {
+            hideAlert(alert);
+        }, hideDelay);
+    });
+
+    // Funcionalidad del botón cerrar
+    const closeButtons = document.querySelectorAll('.btn-close');
+    closeButtons.forEach(function(button) {
+        button.addEventListener('click', function() {
+            const messageId = this.getAttribute('data-message-id');
+            const alert = document.querySelector(`[data-message-id="${messageId}"]`);
+            if (alert) {
+                hideAlert(alert);
+            }
+        });
+    });
+
+    // Función para ocultar alerta con animación
+    function hideAlert(alert) {
+        if (!alert.classList.contains('fade-out')) {
+            alert.classList.add('fade-out');
+
+            // Remover del DOM después de la animación
+            setTimeout(function() {
+                if (alert.parentNode) {
+                    alert.parentNode.removeChild(alert);
+
+                    // Si no quedan más mensajes, ocultar el contenedor
+                    const container = document.getElementById('messages-container');
+                    if (container && container.children.length === 0) {
+                        container.style.display = 'none';
+                    }
+                }
+            }, 300); // Tiempo de la animación CSS
+        }
+    }
+
+    // Limpiar mensajes al enviar el formulario
+    const form = document.getElementById('admission-form');
+    if (form) {
+        form.addEventListener('submit', function() {
+            // Mostrar indicador de carga
+            const submitBtn = form.querySelector('.submit-btn');
+            if (submitBtn) {
+                submitBtn.innerHTML = `
+                    <i class="fas fa-spinner fa-spin"></i>
+                    Verificando...
+                `;
+                submitBtn.disabled = true;
+            }
+
+            // Ocultar mensajes existentes inmediatamente
+            const existingAlerts = document.querySelectorAll('.alert:not(.fade-out)');
+            existingAlerts.forEach(function(alert) {
+                hideAlert(alert);
+            });
+        });
+    }
+
+    // Limpiar mensajes con múltiples clics (funcionalidad avanzada)
+    let clickCount = 0;
+    let clickTimer = null;
+
+    document.addEventListener('click', function(e) {
+        // Solo si no es un botón de cerrar o el formulario
+        if (!e.target.classList.contains('btn-close') && 
+            !e.target.closest('form') && 
+            !e.target.closest('.alert')) {
+
+            clickCount++;
+
+            // Resetear contador después de 2 segundos
+            if (clickTimer) {
+                clearTimeout(clickTimer);
+            }
+
+            clickTimer = setTimeout(function() {
+                clickCount = 0;
+            }, 2000);
+
+            // Después de 3 clics rápidos, limpiar mensajes
+            if (clickCount >= 3) {
+                const remainingAlerts = document.querySelectorAll('.alert:not(.fade-out)');
+                remainingAlerts.forEach(function(alert) {
+                    hideAlert(alert);
+                });
+                clickCount = 0;
+
+                // Mostrar feedback visual
+                const body = document.body;
+                body.style.transition = 'background-color 0.2s ease';
+                body.style.backgroundColor = '#f8f9fa';
+                setTimeout(function() {
+                    body.style.backgroundColor = '';
+                }, 200);
+            }
+        }
+    });
+});
+
+// Función global mejorada para limpiar mensajes
+window.clearMessages = function(type = null) {
+    let selector = '.alert:not(.fade-out)';
+
+    // Si se especifica un tipo, solo limpiar ese tipo
+    if (type) {
+        selector = `.alert-${type}:not(.fade-out)`;
+    }
+
+    const alerts = document.querySelectorAll(selector);
+    alerts.forEach(function(alert) {
+        alert.classList.add('fade-out');
+        setTimeout(function() {
+            if (alert.parentNode) {
+                alert.parentNode.removeChild(alert);
+            }
+        }, 300);
+    });
+};
+
+// Función para mostrar mensajes programáticamente
+window.showMessage = function(message, type = 'info', duration = null) {
+    const container = document.getElementById('messages-container') || 
+                   document.querySelector('.form-card');
+
+    if (!container) return;
+
+    // Crear nuevo mensaje
+    const alertDiv = document.createElement('div');
+    const messageId = Date.now();
+
+    // Iconos por tipo
+    const icons = {
+        'success': 'check-circle',
+        'error': 'exclamation-triangle',
+        'danger': 'exclamation-triangle',
+        'warning': 'exclamation-circle',
+        'info': 'info-circle',
+        'primary': 'info-circle',
+        'secondary': 'info-circle'
+    };
+
+    alertDiv.className = `alert alert-${type} alert-dismissible fade show`;
+    alertDiv.setAttribute('role', 'alert');
+    alertDiv.setAttribute('data-message-id', messageId);
+
+    alertDiv.innerHTML = `
+        <i class="fas fa-${icons[type] || 'info-circle'} me-2"></i>
+        ${message}
+        <button type="button" class="btn-close" data-message-id="${messageId}" aria-label="Cerrar"></button>
+    `;
+
+    container.insertBefore(alertDiv, container.firstChild);
+
+    // Agregar event listener al botón cerrar
+    const closeBtn = alertDiv.querySelector('.btn-close');
+    closeBtn.addEventListener('click', function() {
+        hideAlert(alertDiv);
+    });
+
+    // Auto-ocultar según duración o tipo
+    const hideDelay = duration || (type === 'error' || type === 'danger' ? 8000 : 
+                                 type === 'warning' ? 6000 : 
+                                 type === 'success' ? 4000 : 5000);
+
+    setTimeout(function() {
+        hideAlert(alertDiv);
+    }, hideDelay);
+
+    function hideAlert(alert) {
+        if (!alert.classList.contains('fade-out')) {
+            alert.classList.add('fade-out');
+            setTimeout(function() {
+                if (alert.parentNode) {
+                    alert.parentNode.removeChild(alert);
+                }
+            }, 300);
+        }
+    }
+};
+
+// Limpiar mensajes cuando la página se oculta
+document.addEventListener('visibilitychange', function() {
+    if (document.hidden) {
+        setTimeout(function() {
+            if (!document.hidden) return;
+
+            const alerts = document.querySelectorAll('.alert:not(.fade-out)');
+            alerts.forEach(function(alert) {
+                alert.classList.add('fade-out');
+                setTimeout(function() {
+                    if (alert.parentNode) {
+                        alert.parentNode.removeChild(alert);
+                    }
+                }, 300);
+            });
+        }, 3000);
+    }
+});
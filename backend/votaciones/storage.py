@@ -0,0 +1,73 @@
+import logging
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.core.files.base import ContentFile
+
+from .utils.imagenes import ANCHOS_VARIANTES, EXTENSIONES_PROCESABLES, formatos_disponibles, nombre_variante, redimensionar
+
+class ImagenesManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Storage de collectstatic que además genera variantes WebP/AVIF de las imágenes grandes
+
+    Las variantes se agregan antes del post-proceso del manifiesto, de modo que también
+    reciben nombre con hash y pueden servirse con caché inmutable.
+    """
+
+    # Solo se generan variantes para imágenes más pesadas que este umbral (bytes)
+    tamano_minimo = getattr(settings, 'VOTACION_IMAGEN_ESTATICA_MINIMO', 50 * 1024)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = dict(paths)
+            paths.update(self.generar_variantes_estaticas(paths))
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def url_converter(self, name, hashed_files, template=None):
+        """Deja intactas las referencias CSS a archivos inexistentes en lugar de abortar collectstatic"""
+        convertir = super().url_converter(name, hashed_files, template)
+
+        def convertir_tolerante(coincidencia):
+            try:
+                return convertir(coincidencia)
+            except (ValueError, SuspiciousFileOperation) as error:
+                logging.getLogger('votaciones.estaticos').warning(f'Referencia sin resolver en {name}: {error}')
+                return coincidencia['matched']
+
+        return convertir_tolerante
+
+    def generar_variantes_estaticas(self, paths):
+        nuevas = {}
+        formatos = formatos_disponibles()
+        for ruta in list(paths):
+            if not ruta.lower().endswith(EXTENSIONES_PROCESABLES) or self.size(ruta) < self.tamano_minimo:
+                continue
+            with self.open(ruta) as archivo:
+                contenido = archivo.read()
+            for formato in formatos:
+                for ancho in ANCHOS_VARIANTES:
+                    destino = nombre_variante(ruta, ancho, formato)
+                    datos, _ = redimensionar(contenido, ancho, formato)
+                    if self.exists(destino):
+                        self.delete(destino)
+                    self._save(destino, ContentFile(datos))
+                    nuevas[destino] = (self, destino)
+        return nuevas
+
+def manifiesto_faltante():
+    """Ruta del manifiesto si el storage de estáticos lo usa y collectstatic no lo generó; si no, None"""
+    from django.contrib.staticfiles.storage import staticfiles_storage
+    if not isinstance(staticfiles_storage, ManifestStaticFilesStorage):
+        return None
+    if staticfiles_storage.manifest_storage.exists(staticfiles_storage.manifest_name):
+        return None
+    return staticfiles_storage.manifest_storage.path(staticfiles_storage.manifest_name)
+
+def exigir_manifiesto():
+    """Impide que un worker arranque sin el manifiesto: cada {% static %} respondería 500"""
+    ruta = manifiesto_faltante()
+    if ruta is not None:
+        raise ImproperlyConfigured(
+            f'Falta el manifiesto de estáticos ({ruta}): ejecute "python manage.py collectstatic" '
+            'antes de iniciar los workers o desactive VOTACION_ESTATICOS_MANIFIESTO.'
+        )
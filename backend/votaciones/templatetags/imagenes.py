@@ -0,0 +1,48 @@
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from ..utils.imagenes import FORMATOS_VARIANTES, TIPO_MIME, nombre_variante, srcset_por_formato
+
+register = template.Library()
+
+@register.simple_tag
+def url_miniatura(imagen, variantes, tamano='miniatura'):
+    """URL de la miniatura de tamaño fijo; mientras el worker no la genere retorna el original"""
+    if not imagen:
+        return ''
+    nombre = (variantes or {}).get('miniaturas', {}).get(tamano)
+    return imagen.storage.url(nombre) if nombre else imagen.url
+
+@register.simple_tag
+def imagen_responsiva(imagen, variantes, alt='', sizes='(max-width: 768px) 100vw, 480px', tamano='tarjeton'):
+    """<picture> con srcset AVIF/WebP y la miniatura como <img> de respaldo; cae al original si no hay"""
+    if not imagen:
+        return ''
+
+    srcsets = srcset_por_formato(imagen.storage, variantes)
+    fuentes = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        ((TIPO_MIME[formato], srcsets[formato], sizes) for formato in FORMATOS_VARIANTES if formato in srcsets),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" loading="lazy" decoding="async"></picture>',
+        fuentes,
+        url_miniatura(imagen, variantes, tamano),
+        alt,
+    )
+
+@register.simple_tag
+def static_variante(ruta, ancho, formato):
+    """URL (con hash del manifiesto) de una variante generada en collectstatic
+
+    Sin manifiesto (desarrollo) o si la variante no existe, retorna la imagen original.
+    """
+    variante = nombre_variante(ruta, ancho, formato)
+    try:
+        staticfiles_storage.stored_name(variante)
+    except (AttributeError, ValueError):
+        return static(ruta)
+    return static(variante)
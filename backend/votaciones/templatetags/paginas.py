@@ -0,0 +1,10 @@
+from django import template
+
+from ..utils.paginas_publicas import version_publica as _version_publica
+
+register = template.Library()
+
+@register.simple_tag
+def version_publica():
+    """Huella del despliegue, para usar como vary_on de {% cache %} en fragmentos con URLs de estáticos"""
+    return _version_publica()
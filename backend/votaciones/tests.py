@@ -1,3 +1,641 @@
-from django.test import TestCase
+import json
+import logging
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from .models import Votante, TipoConsejo, Plancha, Voto, ResultadoVotacion, VersionCache, EventoAuditoria
+from . import cache as cache_instrumentada, views
+from .utils import admision, auditoria, bus_invalidacion, diario_votos, padron, registro, reintentos, tarjetones
+
+
+# Las plantillas con {% static %} no deben depender de haber corrido collectstatic
+SIN_MANIFIESTO = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def limpiar_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+class VotoMixin:
+    """Un consejo con una plancha, un votante y el recorrido ingreso → tarjetón → voto"""
+
+    def setUp(self):
+        self.consejo = TipoConsejo.objects.create(nombre='Consejo Superior')
+        self.plancha = Plancha.objects.create(
+            numero=1, nombre='Plancha 1', tipo_consejo=self.consejo, tipo_persona='estudiante'
+        )
+        self.votante = Votante.objects.create(
+            nombre='Votante de prueba', documento='1000000001', tipo_persona='estudiante'
+        )
+
+    def ingresar(self, ip):
+        """Cliente con el token de voto emitido tras validar el documento"""
+        cliente = self.client_class(REMOTE_ADDR=ip)
+        cliente.post('/votaciones', {'documento': self.votante.documento})
+        return cliente
+
+    def votar(self, cliente, clave_envio=''):
+        return cliente.post(
+            '/votacionesprocesar-voto/',
+            {f'voto_{self.consejo.id}': self.plancha.id, 'clave_envio': clave_envio},
+        )
+
+    def assertUnSoloVoto(self):
+        self.votante.refresh_from_db()
+        self.assertTrue(self.votante.ya_voto)
+        self.assertEqual(Voto.objects.filter(votante=self.votante).count(), 1)
+        self.assertEqual(
+            ResultadoVotacion.obtener_resultados_por_consejo(self.consejo, 'estudiante')[0].cantidad_votos, 1
+        )
+
+
+@override_settings(VOTACION_ESCRITURA_DIFERIDA=False)
+class DobleEnvioVotoTests(VotoMixin, TestCase):
+    """Dos envíos del mismo votante (dos pestañas, doble clic) no pueden confirmar ambos"""
+
+    def test_reclamar_voto_solo_una_vez(self):
+        self.assertTrue(Votante.reclamar_voto(self.votante.id, '10.0.0.1'))
+        self.assertFalse(Votante.reclamar_voto(self.votante.id, '10.0.0.1'))
+
+    def test_doble_envio_con_el_mismo_token(self):
+        cliente = self.ingresar('10.0.0.1')
+        # El segundo envío reusa el token del primero, como una pestaña abierta antes de votar
+        token = dict(cliente.cookies)
+        self.assertRedirects(self.votar(cliente), '/votacionesgracias/', fetch_redirect_response=False)
+        cliente.cookies.update(token)
+        self.assertRedirects(self.votar(cliente), '/votaciones', fetch_redirect_response=False)
+        self.assertUnSoloVoto()
+
+    @override_settings(VOTACION_PADRON_REVISION=60, VOTACION_BUS_INTERVALO=60)
+    def test_tarjeton_sin_leer_el_votante(self):
+        cliente = self.ingresar('10.0.0.1')
+        cliente.get('/votacionesestudiantes/')  # Índice y tarjetón en memoria
+        with self.assertNumQueries(0):
+            respuesta = cliente.get('/votacionesestudiantes/')
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_reenvio_con_clave_de_envio_no_consulta_la_base(self):
+        cliente = self.ingresar('10.0.0.1')
+        clave = cliente.get('/votacionesestudiantes/').context['clave_envio']
+        self.assertRedirects(self.votar(cliente, clave), '/votacionesgracias/', fetch_redirect_response=False)
+
+        # El token ya se retiró; el reenvío del mismo formulario obtiene la respuesta original
+        with self.assertNumQueries(0):
+            respuesta = self.votar(cliente, clave)
+        self.assertRedirects(respuesta, '/votacionesgracias/', fetch_redirect_response=False)
+        self.assertUnSoloVoto()
+
+    def test_envios_simultaneos_con_lectura_previa(self):
+        # Ambos envíos leen al votante antes de que cualquiera confirme (ya_voto=False en los dos):
+        # solo el UPDATE condicional de la transacción decide cuál registra el voto
+        lectura_previa = Votante.objects.get(pk=self.votante.pk)
+        primero = self.ingresar('10.0.0.1')
+        segundo = self.ingresar('10.0.0.2')
+        with mock.patch.object(views, 'get_object_or_404', return_value=lectura_previa):
+            respuestas = [self.votar(primero), self.votar(segundo)]
+
+        self.assertEqual([r.url for r in respuestas], ['/votacionesgracias/', '/votaciones'])
+        self.assertUnSoloVoto()
+
+
+@override_settings(VOTACION_ESCRITURA_DIFERIDA=False)
+class ReintentoVotoTests(VotoMixin, TransactionTestCase):
+    """Un bloqueo transitorio repite la transacción del voto (fuera de la transacción de TestCase)"""
+
+    def test_reintento_ante_base_bloqueada(self):
+        cliente = self.ingresar('10.0.0.1')
+        bloqueos = [OperationalError('database is locked')] * 2
+        confirmar = views.confirmar_voto
+
+        def confirmar_con_bloqueos(*args):
+            if bloqueos:
+                raise bloqueos.pop()
+            return confirmar(*args)
+
+        antes = reintentos.resumen()['voto']
+        with mock.patch.object(views, 'confirmar_voto', confirmar_con_bloqueos), \
+                mock.patch.object(reintentos.time, 'sleep'):
+            self.assertRedirects(self.votar(cliente), '/votacionesgracias/', fetch_redirect_response=False)
+        despues = reintentos.resumen()['voto']
+        self.assertEqual(despues['reintentos'] - antes['reintentos'], 2)
+        self.assertEqual(despues['recuperadas'] - antes['recuperadas'], 1)
+        self.assertUnSoloVoto()
+
+
+@override_settings(VOTACION_ESCRITURA_DIFERIDA=False, VOTACION_ADMISION_CUPOS=1, STORAGES=SIN_MANIFIESTO)
+class SalaEsperaTests(VotoMixin, TestCase):
+    """Sin cupo el tarjetón envía a la sala de espera, que admite al votante cuando se libera"""
+
+    def setUp(self):
+        super().setUp()
+        limpiar_caches()
+        self.addCleanup(limpiar_caches)
+
+    def test_fila_y_admision(self):
+        cliente = self.ingresar('10.0.0.1')
+        ocupado = admision.tomar_cupo()
+
+        respuesta = cliente.get('/votacionesestudiantes/')
+        self.assertTrue(respuesta.url.startswith('/votacionessala-espera/'))
+        self.assertEqual(cliente.get('/votacionesturno/').json(), {'admitido': False, 'posicion': 1})
+        self.assertEqual(cliente.get(respuesta.url).status_code, 200)
+
+        admision.liberar_cupo(ocupado)
+        self.assertEqual(cliente.get('/votacionesturno/').json()['admitido'], True)
+        respuesta = cliente.get('/votacionesestudiantes/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.cookies[admision.COOKIE_TURNO].value, '')
+        # El cupo del render ya se devolvió
+        self.assertEqual(admision.cupos_libres(), 1)
+
+    def test_recien_llegado_respeta_la_fila(self):
+        ocupado = admision.tomar_cupo()
+        self.ingresar('10.0.0.1').get('/votacionesestudiantes/')
+        admision.liberar_cupo(ocupado)
+        # Hay cupo, pero el turno emitido antes tiene prioridad
+        otro = Votante.objects.create(nombre='Otro', documento='1000000002', tipo_persona='estudiante')
+        cliente = self.client_class(REMOTE_ADDR='10.0.0.2')
+        cliente.post('/votaciones', {'documento': otro.documento})
+        self.assertTrue(cliente.get('/votacionesestudiantes/').url.startswith('/votacionessala-espera/'))
+
+    def test_voto_sin_cupo_no_se_registra(self):
+        cliente = self.ingresar('10.0.0.1')
+        admision.tomar_cupo()
+        with override_settings(VOTACION_ADMISION_ESPERA_VOTO=0):
+            respuesta = self.votar(cliente)
+        self.assertTrue(respuesta.url.startswith('/votacionessala-espera/'))
+        self.votante.refresh_from_db()
+        self.assertFalse(self.votante.ya_voto)
+
+    @override_settings(VOTACION_ADMISION_CUPOS=3)
+    def test_turnos_abandonados_no_detienen_la_fila(self):
+        ocupados = [admision.tomar_cupo() for _ in range(3)]
+        turnos = [admision.emitir_turno() for _ in range(10)]
+        for cupo in ocupados:
+            admision.liberar_cupo(cupo)
+        for turno in turnos[:3]:
+            self.assertTrue(admision.consultar_turno(turno)['admitido'])
+        # Los turnos 4 a 6 cierran la pestaña: su latido vence
+        caches[settings.VOTACION_ADMISION_CACHE].delete_many(
+            [f'votaciones:admision:latido:{turno}' for turno in turnos[3:6]]
+        )
+
+        for turno in turnos[6:]:
+            self.assertTrue(admision.consultar_turno(turno)['admitido'], turno)
+        self.assertFalse(admision.hay_fila())
+
+
+class IndicePadronTests(SimpleTestCase):
+    """Índice empaquetado del padrón: búsqueda, documentos no numéricos y correcciones en el lugar"""
+
+    def setUp(self):
+        self.indice = padron.IndicePadron([
+            ('1000000002', 2, 'docente', 'presencial', False),
+            ('1000000001', 1, 'estudiante', 'virtual', True),
+            ('00123', 3, 'graduado', None, False),
+            ('AB-77', 4, 'estudiante', 'hibrido', False),
+        ])
+
+    def test_consultar(self):
+        self.assertEqual(self.indice.consultar('1000000001'), padron.Entrada(1, 'estudiante', 'virtual', True))
+        self.assertTrue(self.indice.consultar('1000000002').debe_votar_presencial())
+        # Los ceros a la izquierda distinguen documentos
+        self.assertEqual(self.indice.consultar('00123').votante_id, 3)
+        self.assertIsNone(self.indice.consultar('123'))
+        self.assertEqual(self.indice.consultar('AB-77').tipo_votante, 'hibrido')
+        self.assertIsNone(self.indice.consultar('1000000003'))
+
+    def test_actualizar(self):
+        self.assertTrue(self.indice.actualizar('1000000002', 2, 'docente', 'virtual', True))
+        self.assertEqual(self.indice.consultar('1000000002'), padron.Entrada(2, 'docente', 'virtual', True))
+        self.assertTrue(self.indice.actualizar('1000000001', 1, 'estudiante', 'virtual', False))
+        self.assertFalse(self.indice.consultar('1000000001').ya_voto)
+        # Documento nuevo o cambio de tipo de persona: hay que reconstruir
+        self.assertFalse(self.indice.actualizar('1000000009', 9, 'estudiante', None, False))
+        self.assertFalse(self.indice.actualizar('1000000002', 2, 'estudiante', 'virtual', True))
+
+
+class BusInvalidacionTests(TestCase):
+    """Un cambio publicado por otro worker limpia las cachés en memoria de este"""
+
+    def test_cambio_en_otro_worker(self):
+        consejo = TipoConsejo.objects.create(nombre='Consejo Académico')
+        bus_invalidacion.revisar(forzar=True)
+        self.assertEqual(tarjetones.opciones_voto('docente'), (frozenset({consejo.id}), frozenset()))
+
+        # Otro worker crea una plancha: aquí no hay señal, solo la versión en la tabla
+        with mock.patch.object(bus_invalidacion, '_limpiar'):
+            plancha = Plancha.objects.create(numero=1, nombre='Plancha 1', tipo_consejo=consejo, tipo_persona='docente')
+        self.assertEqual(tarjetones.opciones_voto('docente')[1], frozenset())
+
+        bus_invalidacion.revisar(forzar=True)
+        self.assertEqual(tarjetones.opciones_voto('docente')[1], frozenset({plancha.id}))
+        self.assertEqual(bus_invalidacion.version('tarjetones'), VersionCache.objects.get(nombre='tarjetones').version)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'votaciones.cache.CacheInstrumentada',
+    'INTERNO': 'django.core.cache.backends.locmem.LocMemCache',
+    'NOMBRE': 'prueba',
+    'LOCATION': 'votaciones-prueba',
+    'OPTIONS': {'MAX_ENTRIES': 3, 'CULL_FREQUENCY': 3},
+}})
+class CacheInstrumentadaTests(SimpleTestCase):
+    """La envoltura delega al backend real y cuenta aciertos, fallos y desalojos"""
+
+    def contadores(self):
+        return cache_instrumentada.estadisticas()['prueba']
+
+    def test_contadores(self):
+        prueba = caches['default']
+        prueba.clear()
+        antes = self.contadores()
+
+        prueba.set('a', 1)
+        self.assertEqual(prueba.get('a'), 1)
+        self.assertIsNone(prueba.get('b'))
+        self.assertEqual(prueba.get_many(['a', 'b']), {'a': 1})
+        with self.assertRaises(ValueError):
+            prueba.incr('b')
+        # Con tres entradas la cuarta escritura desaloja una
+        prueba.set_many({'b': 2, 'c': 3})
+        prueba.set('d', 4)
+
+        despues = self.contadores()
+        self.assertEqual(despues['aciertos'] - antes['aciertos'], 2)
+        self.assertEqual(despues['fallos'] - antes['fallos'], 3)
+        self.assertEqual(despues['escrituras'] - antes['escrituras'], 4)
+        self.assertEqual(despues['desalojos'] - antes['desalojos'], 1)
+        self.assertEqual(despues['backend'], 'LocMemCache')
+        self.assertIsNotNone(despues['latencia_media_ms'])
+
+
+class RegistroEnColaTests(SimpleTestCase):
+    """El registro se encola y el hilo de fondo escribe una línea JSON con los campos extra"""
+
+    def test_linea_json(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        manejador = registro.ManejadorEnCola(archivo=f'{directorio.name}/votaciones-{{pid}}.log', consola=False)
+        logger = logging.getLogger('votaciones.pruebas.registro')
+        logger.addHandler(manejador)
+        self.addCleanup(logger.removeHandler, manejador)
+
+        logger.warning('Voto duplicado desde %s', '10.0.0.9', extra={'ip': '10.0.0.9', 'documento': '123'})
+        manejador.close()
+
+        archivo, = Path(directorio.name).glob('votaciones-*.log')
+        linea = json.loads(archivo.read_text(encoding='utf-8'))
+        self.assertEqual(linea['mensaje'], 'Voto duplicado desde 10.0.0.9')
+        self.assertEqual(linea['nivel'], 'WARNING')
+        self.assertEqual(linea['logger'], 'votaciones.pruebas.registro')
+        self.assertEqual((linea['ip'], linea['documento']), ('10.0.0.9', '123'))
+
+
+class DiarioVotosTests(VotoMixin, TestCase):
+    """Todo rechazo se decide antes del recibo; el que ocurra al aplicar queda en auditoría"""
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        diario = override_settings(VOTACION_DIARIO_VOTOS=Path(directorio.name) / 'votos.jsonl')
+        diario.enable()
+        self.addCleanup(diario.disable)
+        confirmador = mock.patch.object(diario_votos, 'iniciar_confirmador')
+        confirmador.start()
+        self.addCleanup(confirmador.stop)
+        diario_votos._encolados.clear()
+        diario_votos._ips_encoladas.clear()
+        diario_votos._leido_hasta = 0
+        self.otro = Votante.objects.create(nombre='Otro votante', documento='1000000002', tipo_persona='estudiante')
+
+    def anotar_desde_otro_proceso(self, votante, ip):
+        """Escribe la entrada en el diario sin pasar por los conjuntos de este proceso"""
+        entrada = {'id': 'otro', 'votante': votante.id, 'ip': ip, 'votos': [[self.consejo.id, self.plancha.id]],
+                   't': '2026-10-19T08:00:00+00:00'}
+        with open(diario_votos.ruta_diario(), 'a') as archivo:
+            archivo.write(json.dumps(entrada) + '\n')
+
+    def test_ip_anotada_por_otro_proceso(self):
+        diario_votos.anotar_voto(self.otro, '10.0.0.9', [(self.consejo.id, self.plancha.id)])
+        diario_votos._encolados.clear()
+        diario_votos._ips_encoladas.clear()
+        diario_votos._leido_hasta = 0
+        self.anotar_desde_otro_proceso(self.otro, '10.0.0.10')
+
+        with self.assertRaises(diario_votos.VotoRechazado):
+            diario_votos.anotar_voto(self.votante, '10.0.0.10', [(self.consejo.id, self.plancha.id)])
+        with self.assertRaises(diario_votos.VotoRechazado) as rechazo:
+            diario_votos.anotar_voto(self.otro, '10.0.0.11', [(self.consejo.id, self.plancha.id)])
+        self.assertTrue(rechazo.exception.ya_voto)
+
+    def test_plancha_de_otro_tipo_sin_recibo(self):
+        docente = Plancha.objects.create(numero=2, nombre='Plancha docente', tipo_consejo=self.consejo,
+                                         tipo_persona='docente')
+        with self.assertRaises(diario_votos.VotoRechazado):
+            diario_votos.anotar_voto(self.votante, '10.0.0.12', [(self.consejo.id, docente.id)])
+        self.assertEqual(diario_votos.pendientes(), 0)
+
+    def test_rechazo_al_aplicar_queda_en_auditoria(self):
+        diario_votos.anotar_voto(self.votante, '10.0.0.13', [(self.consejo.id, self.plancha.id)])
+        diario_votos.anotar_voto(self.otro, '10.0.0.14', [(self.consejo.id, self.plancha.id)])
+        # Un jurado lo marca mientras su voto espera en el diario
+        Votante.reclamar_voto(self.votante.id, None)
+
+        self.assertEqual(diario_votos.drenar(), (1, 1))
+        evento = EventoAuditoria.objects.get()
+        self.assertEqual((evento.tipo, evento.documento), ('voto_diferido_rechazado', self.votante.documento))
+
+        # Reproducir el diario completo no duplica votos ni eventos
+        diario_votos.guardar_punto_control(0)
+        self.assertEqual(diario_votos.drenar(), (0, 2))
+        self.assertEqual(EventoAuditoria.objects.count(), 1)
+        self.assertEqual(Voto.objects.filter(votante=self.otro).count(), 1)
+
+
+@override_settings(VOTACION_AUDITORIA_INTERVALO=60 * 1000, STORAGES=SIN_MANIFIESTO)
+class AuditoriaTests(VotoMixin, TestCase):
+    """El intento bloqueado queda pendiente en memoria y se guarda en un solo lote"""
+
+    def setUp(self):
+        super().setUp()
+        auditoria.vaciar()
+        Votante.objects.filter(pk=self.votante.pk).update(tipo_votante='presencial')
+
+    def test_intento_presencial_en_lote(self):
+        for ip in ('10.0.0.7', '10.0.0.8'):
+            self.ingresar(ip)
+        # La petición no escribe la tabla
+        self.assertFalse(EventoAuditoria.objects.exists())
+        self.assertEqual(auditoria.pendientes(), 2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(auditoria.vaciar(), 2)
+        evento = EventoAuditoria.objects.get(ip='10.0.0.7')
+        self.assertEqual((evento.tipo, evento.documento), ('presencial_virtual', self.votante.documento))
+
+        from django.contrib.auth.models import User
+        self.client.force_login(User.objects.create_superuser('auditor', 'auditor@fesc.edu.co', 'clave'))
+        respuesta = self.client.get('/admin/auditoria/', {'tipo': 'presencial_virtual'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['por_documento'][0]['total'], 2)
+        self.assertEqual(respuesta.context['por_tipo'][0]['ips'], 2)
+
+
+@override_settings(STORAGES=SIN_MANIFIESTO)
+class DashboardStaffTests(TestCase):
+    """El dashboard electoral solo se muestra al staff, en todas sus rutas"""
+
+    def test_anonimo_va_al_login(self):
+        for ruta in ('/admin/dashboard/', '/votacionesadmin/dashboard/'):
+            respuesta = self.client.get(ruta)
+            self.assertEqual(respuesta.status_code, 302, ruta)
+            self.assertIn('/login/', respuesta.url)
+
+    def test_caches_solo_para_el_staff(self):
+        self.assertNotContains(self.client.get('/admin/dashboard/', follow=True), 'Cachés (este worker)')
+        self.assertEqual(self.client.get('/admin/metricas-json/').status_code, 302)
+
+        from django.contrib.auth.models import User
+        self.client.force_login(User.objects.create_superuser('staff', 'staff@fesc.edu.co', 'clave'))
+        respuesta = self.client.get('/admin/dashboard/')
+        self.assertContains(respuesta, 'Cachés (este worker)')
+        self.assertIn('estadisticas', respuesta.context['estadisticas_cache'])
+        self.assertIn('caches', self.client.get('/admin/metricas-json/').json())
+
+
+class JuradoCambiosTests(TestCase):
+    """El cursor (updated_at, id) no salta votantes con el mismo updated_at ni commits tardíos"""
+
+    def test_empates_en_el_tope(self):
+        from django.contrib.auth.models import User
+        from datetime import timedelta
+        from django.utils import timezone
+        self.client.force_login(User.objects.create_superuser('jurado', 'jurado@fesc.edu.co', 'clave'))
+        hora = timezone.now()
+        for numero in range(5):
+            Votante.objects.create(nombre=f'Votante {numero}', documento=f'200000000{numero}', tipo_persona='estudiante')
+        Votante.objects.update(ya_voto=True, fecha_voto=hora, updated_at=hora)
+
+        documentos = []
+        cursor = (hora - timedelta(seconds=1)).isoformat()
+        with mock.patch('votaciones.admin.JURADO_CAMBIOS_MAXIMO', 2):
+            while True:
+                datos = self.client.get('/admin/jurado/cambios/', {'desde': cursor}).json()
+                documentos += [cambio['documento'] for cambio in datos['cambios']]
+                cursor = datos['cursor']
+                if not datos['hay_mas']:
+                    break
+        self.assertEqual(sorted(documentos), [f'200000000{numero}' for numero in range(5)])
+
+    def test_commit_tardio_dentro_del_margen(self):
+        from django.contrib.auth.models import User
+        from datetime import timedelta
+        from django.utils import timezone
+        self.client.force_login(User.objects.create_superuser('jurado', 'jurado@fesc.edu.co', 'clave'))
+        ahora = timezone.now()
+        Votante.objects.create(nombre='Temprano', documento='2000000010', tipo_persona='estudiante',
+                               ya_voto=True, fecha_voto=ahora)
+        Votante.objects.filter(documento='2000000010').update(updated_at=ahora)
+
+        datos = self.client.get('/admin/jurado/cambios/', {'desde': (ahora - timedelta(minutes=1)).isoformat()}).json()
+        self.assertEqual([cambio['documento'] for cambio in datos['cambios']], ['2000000010'])
+
+        # Transacción que tomó su updated_at antes que la anterior pero confirmó después
+        tardio = Votante.objects.create(nombre='Tardío', documento='2000000011', tipo_persona='estudiante',
+                                        ya_voto=True, fecha_voto=ahora)
+        Votante.objects.filter(pk=tardio.pk).update(updated_at=ahora - timedelta(seconds=1))
+
+        datos = self.client.get('/admin/jurado/cambios/', {'desde': datos['cursor']}).json()
+        self.assertIn('2000000011', [cambio['documento'] for cambio in datos['cambios']])
+
+
+class JuradoSincronizarTests(TestCase):
+    """Las marcas inválidas se rechazan una por una sin tumbar el lote"""
+
+    def test_documento_demasiado_largo(self):
+        from django.contrib.auth.models import User
+        self.client.force_login(User.objects.create_superuser('jurado', 'jurado@fesc.edu.co', 'clave'))
+        votante = Votante.objects.create(nombre='Votante físico', documento='2000000020', tipo_persona='estudiante')
+        marcas = {'estacion': 'mesa 1', 'marcas': [
+            {'clave': 'c1', 'documento': '9' * 21},
+            {'clave': 'c2', 'documento': votante.documento},
+        ]}
+        respuesta = self.client.post('/admin/jurado/sincronizar/', json.dumps(marcas), content_type='application/json')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([r['estado'] for r in respuesta.json()['resultados']], ['invalido', 'marcado'])
+        votante.refresh_from_db()
+        self.assertTrue(votante.ya_voto)
+
+
+class LibroBoletasTests(VotoMixin, TestCase):
+    """Exportar, leer la cabeza y comparar contadores sobre la misma instantánea"""
+
+    def setUp(self):
+        super().setUp()
+        from datetime import timedelta
+        from django.db import transaction
+        from django.utils import timezone
+        from .utils.contadores import incrementar
+        from .utils.libro_boletas import anotar_boletas
+        # Votos de hace una hora: su franja ya cerró y se encadena al exportar
+        with transaction.atomic():
+            for _ in range(3):
+                anotar_boletas([(self.plancha.id, self.consejo.id, 'estudiante')], timezone.now() - timedelta(hours=1))
+                incrementar(self.plancha.id, self.consejo.id, 'estudiante')
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = Path(directorio.name) / 'votos.libro'
+
+    def test_verificacion_completa(self):
+        from django.core.management import call_command
+        from io import StringIO
+        salida = StringIO()
+        call_command('verificar_libro_boletas', exportar=str(self.ruta), stdout=salida)
+        self.assertIn('Exportados 3 registros', salida.getvalue())
+        self.assertIn('íntegro y consistente', salida.getvalue())
+
+    def test_franja_abierta_espera_sin_orden(self):
+        from django.core.management import call_command
+        from io import StringIO
+        from .models import BoletaPendiente, RegistroBoleta
+        from .utils.contadores import incrementar
+        from .utils.libro_boletas import anotar_boletas
+        # La primera boleta de la franja actual encadena las de la franja cerrada
+        anotar_boletas([(self.plancha.id, self.consejo.id, 'estudiante')])
+        incrementar(self.plancha.id, self.consejo.id, 'estudiante')
+        self.assertEqual(RegistroBoleta.objects.count(), 3)
+        self.assertEqual(BoletaPendiente.objects.count(), 1)
+
+        # La boleta pendiente cuenta en la comparación con ResultadoVotacion
+        salida = StringIO()
+        call_command('verificar_libro_boletas', exportar=str(self.ruta), stdout=salida)
+        self.assertIn('íntegro y consistente', salida.getvalue())
+        self.assertEqual(BoletaPendiente.objects.count(), 1)
+
+    def test_codigo_de_tipo_alterado(self):
+        from .utils import libro_boletas
+        libro_boletas.cerrar_franjas()
+        libro_boletas.exportar(self.ruta)
+        datos = bytearray(self.ruta.read_bytes())
+        # Byte del tipo de persona del segundo registro: secuencia (8) + plancha (4) + consejo (4)
+        datos[libro_boletas.CABECERA.size + libro_boletas.REGISTRO.size + 16] = 99
+        self.ruta.write_bytes(bytes(datos))
+
+        resultado = libro_boletas.verificar_archivo(self.ruta)
+        self.assertIn('Secuencia 2: código de tipo de persona desconocido (99)', resultado['errores'])
+        self.assertIn('Secuencia 2: la huella no coincide con la cadena', resultado['errores'])
+        self.assertEqual(sum(resultado['conteos'].values()), 2)
+
+
+class ReplicaRouterTests(VotoMixin, TransactionTestCase):
+    """Con el alias 'replica' como conexión propia: a qué alias va cada consulta
+
+    En SQLite medir_retraso_replica siempre retorna 0; el retraso se simula parcheándola.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from .routers import _estado_replica
+        super().setUp()
+        limpiar_caches()
+        _estado_replica.update(medido_en=0.0, disponible=False)
+        self.addCleanup(_estado_replica.update, medido_en=0.0, disponible=False)
+        self.staff = User.objects.create_superuser('staff', 'staff@fesc.edu.co', 'clave')
+
+    def consultas(self, funcion, *args, **kwargs):
+        """Ejecuta la función; retorna las consultas SQL a tablas de votaciones por alias"""
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connections['default']) as primaria, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            funcion(*args, **kwargs)
+        return {
+            alias: [consulta['sql'] for consulta in capturadas if 'votaciones_' in consulta['sql']]
+            for alias, capturadas in (('default', primaria), ('replica', replica))
+        }
+
+    def test_dashboard_y_reporte_leen_de_la_replica(self):
+        self.client.force_login(self.staff)
+        for ruta in ('/admin/dashboard/', '/admin/reporte-pdf/'):
+            sql = self.consultas(self.client.get, ruta)
+            # Resultados y padrón desde la réplica; en la primaria solo quedan el bus de
+            # invalidación y el leer-para-escribir de los votos pendientes y las estadísticas
+            for tabla in ('votaciones_resultadovotacion', 'votaciones_votante'):
+                self.assertTrue(any(tabla in consulta for consulta in sql['replica']), (ruta, tabla))
+                self.assertFalse(any(f'FROM "{tabla}"' in consulta for consulta in sql['default']), (ruta, tabla))
+
+    @override_settings(VOTACION_ESCRITURA_DIFERIDA=False)
+    def test_voto_y_jurado_escriben_en_la_primaria(self):
+        sql = self.consultas(self.votar, self.ingresar('10.0.0.20'))
+        self.assertTrue(any(consulta.startswith('INSERT') for consulta in sql['default']))
+        self.assertEqual(sql['replica'], [])
+
+        otro = Votante.objects.create(nombre='Votante físico', documento='1000000003', tipo_persona='estudiante')
+        self.client.force_login(self.staff)
+        marcas = {'marcas': [{'clave': 'c1', 'documento': otro.documento}], 'estacion': 'mesa 1'}
+        sql = self.consultas(
+            self.client.post, '/admin/jurado/sincronizar/', json.dumps(marcas), content_type='application/json'
+        )
+        self.assertTrue(any(consulta.startswith('UPDATE') for consulta in sql['default']))
+        self.assertEqual(sql['replica'], [])
+        otro.refresh_from_db()
+        self.assertTrue(otro.ya_voto)
+
+    def test_en_primaria_dentro_de_la_replica(self):
+        from .routers import en_primaria, lectura_en_replica
+
+        def leer():
+            with lectura_en_replica():
+                list(Votante.objects.all())
+                with en_primaria():
+                    list(Plancha.objects.all())
+
+        sql = self.consultas(leer)
+        self.assertTrue(all('votaciones_votante' in consulta for consulta in sql['replica']))
+        self.assertTrue(sql['default'])
+        self.assertTrue(all('votaciones_plancha' in consulta for consulta in sql['default']))
+
+    def test_retraso_excesivo_lee_de_la_primaria(self):
+        from .routers import lectura_en_replica, medir_retraso_replica
+        self.assertEqual(medir_retraso_replica(), 0.0)
+
+        def leer():
+            with lectura_en_replica():
+                list(Votante.objects.all())
+
+        with override_settings(VOTACION_REPLICA_RETRASO_MAXIMO=10), \
+                mock.patch('votaciones.routers.medir_retraso_replica', return_value=30.0):
+            sql = self.consultas(leer)
+        self.assertEqual(sql['replica'], [])
+        self.assertTrue(sql['default'])
+
+
+@override_settings(STORAGES=SIN_MANIFIESTO)
+class TokenVotoTests(VotoMixin, TestCase):
+    """La cookie firmada no lleva datos personales; el tarjetón los obtiene en el servidor"""
+
+    def test_token_sin_datos_personales(self):
+        from django.core import signing
+        from .utils.token_voto import COOKIE_TOKEN_VOTO, SALT_TOKEN_VOTO
+        cliente = self.client_class(REMOTE_ADDR='10.0.0.30')
+        respuesta = cliente.post('/votaciones', {'documento': self.votante.documento})
+        token = cliente.cookies[COOKIE_TOKEN_VOTO].value
+        self.assertEqual(set(signing.loads(token, salt=SALT_TOKEN_VOTO)), {'v', 'r'})
+
+        self.assertContains(cliente.get(respuesta.url), self.votante.nombre)
+        # Token emitido por otro worker (sin la entrada en su caché): se lee la fila del votante
+        limpiar_caches()
+        self.assertContains(cliente.get(respuesta.url), self.votante.nombre)
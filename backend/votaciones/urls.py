@@ -1,17 +1,30 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, views_async
 
 app_name = 'votaciones'
 
+# En el despliegue ASGI el flujo de votación usa las vistas asíncronas
+vistas_voto = views_async if settings.VOTACION_MODO_ASGI else views
+
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('estudiantes/', views.tarjeton_estudiantes, name='tarjeton_estudiantes'),
-    path('docentes/', views.tarjeton_docentes, name='tarjeton_docentes'),
-    path('graduados/', views.tarjeton_graduados, name='tarjeton_graduados'),
-    path('procesar-voto/', views.procesar_voto, name='procesar_voto'),
-    path('gracias/', views.gracias, name='gracias'),
-    # URLs del admin
-    path('admin/dashboard/', views.dashboard_electoral, name='dashboard_electoral'),
-    path('admin/reporte-pdf/', views.generar_reporte_pdf, name='reporte_pdf'),
-    path('admin/estadisticas-json/', views.estadisticas_json, name='estadisticas_json'),
-]
\ No newline at end of file
+    path('', vistas_voto.index, name='index'),
+    path('estudiantes/', vistas_voto.tarjeton_estudiantes, name='tarjeton_estudiantes'),
+    path('docentes/', vistas_voto.tarjeton_docentes, name='tarjeton_docentes'),
+    path('graduados/', vistas_voto.tarjeton_graduados, name='tarjeton_graduados'),
+    path('procesar-voto/', vistas_voto.procesar_voto, name='procesar_voto'),
+    path('gracias/', vistas_voto.gracias, name='gracias'),
+    # Sala de espera de la apertura (solo caché; sin variante async)
+    path('sala-espera/', views.sala_espera, name='sala_espera'),
+    path('turno/', views.turno, name='turno'),
+]
+
+# URLs del admin (los workers públicos no las cargan)
+if settings.VOTACION_PERFIL_WORKER != 'publico':
+    from . import views_staff
+
+    urlpatterns += [
+        path('admin/dashboard/', views_staff.dashboard_electoral, name='dashboard_electoral'),
+        path('admin/reporte-pdf/', views_staff.generar_reporte_pdf, name='reporte_pdf'),
+        path('admin/estadisticas-json/', views_staff.estadisticas_json, name='estadisticas_json'),
+    ]
\ No newline at end of file
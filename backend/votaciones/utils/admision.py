@@ -0,0 +1,261 @@
+"""Control de admisión y sala de espera virtual para la apertura de las urnas
+
+Los renders del tarjetón y las confirmaciones de voto ocupan uno de
+VOTACION_ADMISION_CUPOS cupos. Cada cupo es una clave de la caché tomada con add()
+y con vencimiento (VOTACION_ADMISION_RETENCION): si un worker muere con el cupo
+tomado, el cupo se libera solo. La caché debe tener add() e incr() atómicos (locmem o
+redis): con VOTACION_CACHE_BACKEND='archivo' la caché 'limites' queda en la memoria de
+cada worker y los cupos se cuentan por worker.
+
+Cuando no hay cupo, o ya hay gente esperando, el tarjetón entrega un turno numerado
+(cookie firmada) y envía al votante a la sala de espera, que consulta el endpoint
+`turno` sin tocar la base de datos. Los turnos se llaman en orden: el turno t entra
+cuando hay más cupos libres que turnos vivos delante de él. Cada sondeo renueva el
+latido del turno (VOTACION_ADMISION_LATIDO); un turno sin latido (pestaña cerrada) no
+cuenta, y los abandonados al frente de la fila se dan por llamados en el sondeo de
+cualquier otro turno, así que la fila no se detiene aunque se vayan varios seguidos.
+Llamar no reserva cupo: si el llamado no consigue cupo al llegar, vuelve a la sala con
+el mismo turno.
+
+La confirmación del voto no hace fila: quien ya tiene el tarjetón espera su cupo unos
+segundos (VOTACION_ADMISION_ESPERA_VOTO) y solo si se agota la espera pasa a la sala.
+"""
+import asyncio
+import random
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib import messages
+from django.core import signing
+from django.core.cache import caches
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
+
+from . import metricas
+
+COOKIE_TURNO = 'voto_turno'
+SALT_TURNO = 'votaciones.admision.turno'
+
+_PREFIJO = 'votaciones:admision:'
+_EMITIDOS = _PREFIJO + 'emitidos'
+_LLAMADOS = _PREFIJO + 'llamados'
+_CANDADO_LLAMADOS = _PREFIJO + 'llamados:candado'
+
+# Turnos que se revisan por sondeo detrás del último llamado: acota el get_many
+_VENTANA = 200
+
+def _cache():
+    return caches[getattr(settings, 'VOTACION_ADMISION_CACHE', 'default')]
+
+def cupos():
+    """Cupos simultáneos; 0 desactiva el control de admisión"""
+    return getattr(settings, 'VOTACION_ADMISION_CUPOS', 0)
+
+def _claves_cupos():
+    return [f'{_PREFIJO}cupo:{numero}' for numero in range(cupos())]
+
+def _contador(clave):
+    return _cache().get(clave) or 0
+
+# --- Cupos ---
+
+def tomar_cupo():
+    """Toma un cupo libre; retorna su clave o None si están todos ocupados"""
+    claves = _claves_cupos()
+    retencion = getattr(settings, 'VOTACION_ADMISION_RETENCION', 30)
+    # Empezar en un cupo al azar reparte los intentos entre las claves
+    inicio = random.randrange(len(claves))
+    for clave in claves[inicio:] + claves[:inicio]:
+        if _cache().add(clave, 1, timeout=retencion):
+            return clave
+    return None
+
+def liberar_cupo(clave):
+    _cache().delete(clave)
+
+def cupos_libres():
+    return cupos() - len(_cache().get_many(_claves_cupos()))
+
+def esperar_cupo(segundos):
+    """Reintenta tomar un cupo durante `segundos`; retorna su clave o None"""
+    limite = time.monotonic() + segundos
+    while True:
+        cupo = tomar_cupo()
+        if cupo is not None or time.monotonic() >= limite:
+            return cupo
+        time.sleep(0.05)
+
+async def aesperar_cupo(segundos):
+    """Variante async de esperar_cupo: la espera no bloquea el event loop"""
+    limite = time.monotonic() + segundos
+    while True:
+        cupo = tomar_cupo()
+        if cupo is not None or time.monotonic() >= limite:
+            return cupo
+        await asyncio.sleep(0.05)
+
+# --- Turnos ---
+
+def hay_fila():
+    emitidos = _contador(_EMITIDOS)
+    return emitidos > _contador(_LLAMADOS) and emitidos > _saltar_abandonados()
+
+def _latido(turno):
+    _cache().set(f'{_PREFIJO}latido:{turno}', 1, timeout=getattr(settings, 'VOTACION_ADMISION_LATIDO', 10))
+
+def _vivos(desde, hasta):
+    """Turnos de desde..hasta (inclusive) que sondearon dentro de VOTACION_ADMISION_LATIDO"""
+    claves = {f'{_PREFIJO}latido:{numero}': numero for numero in range(desde, hasta + 1)}
+    return sorted(claves[clave] for clave in _cache().get_many(list(claves)))
+
+def emitir_turno():
+    cache = _cache()
+    cache.add(_EMITIDOS, 0, timeout=None)
+    metricas.incrementar('admision.turnos')
+    turno = cache.incr(_EMITIDOS)
+    _latido(turno)
+    return turno
+
+def turno_de(request):
+    """Número de turno de la cookie firmada, o None"""
+    valor = request.COOKIES.get(COOKIE_TURNO)
+    if not valor:
+        return None
+    try:
+        return signing.loads(valor, salt=SALT_TURNO, max_age=getattr(settings, 'VOTACION_ADMISION_VIGENCIA_TURNO', 30 * 60))
+    except signing.BadSignature:
+        return None
+
+def _llamar_hasta(turno):
+    """Avanza el contador de llamados hasta `turno` (nunca lo retrocede)"""
+    cache = _cache()
+    # Candado corto: dos sondeos simultáneos no deben sumar dos veces el mismo avance
+    if not cache.add(_CANDADO_LLAMADOS, 1, timeout=1):
+        return
+    try:
+        if turno > _contador(_LLAMADOS):
+            cache.set(_LLAMADOS, turno, timeout=None)
+    finally:
+        cache.delete(_CANDADO_LLAMADOS)
+
+def _saltar_abandonados():
+    """Da por llamados los turnos sin latido al frente de la fila; retorna los llamados"""
+    llamados = _contador(_LLAMADOS)
+    hasta = min(_contador(_EMITIDOS), llamados + _VENTANA)
+    if hasta <= llamados:
+        return llamados
+    vivos = _vivos(llamados + 1, hasta)
+    ultimo_abandonado = (vivos[0] if vivos else hasta + 1) - 1
+    if ultimo_abandonado > llamados:
+        _llamar_hasta(ultimo_abandonado)
+        return ultimo_abandonado
+    return llamados
+
+def consultar_turno(turno):
+    """Estado del turno para la sala de espera: {'admitido', 'posicion'}"""
+    _latido(turno)
+    llamados = _saltar_abandonados()
+    if turno <= llamados:
+        delante = 0
+    elif turno - llamados > _VENTANA:
+        return {'admitido': False, 'posicion': turno - llamados}
+    else:
+        delante = len(_vivos(llamados + 1, turno - 1))
+    if cupos_libres() > delante:
+        _llamar_hasta(turno)
+        return {'admitido': True, 'posicion': 0}
+    return {'admitido': False, 'posicion': delante + 1}
+
+def destino(request, siguiente):
+    """URL interna a la que vuelve el votante al ser admitido (el índice si no es segura)"""
+    if siguiente and url_has_allowed_host_and_scheme(siguiente, allowed_hosts={request.get_host()}):
+        return siguiente
+    return reverse('votaciones:index')
+
+def a_la_sala(request, siguiente, turno=None):
+    """Redirige a la sala de espera con el turno actual o con uno nuevo"""
+    respuesta = redirect(f"{reverse('votaciones:sala_espera')}?{urlencode({'siguiente': destino(request, siguiente)})}")
+    if turno is None:
+        turno = emitir_turno()
+        respuesta.set_cookie(
+            COOKIE_TURNO,
+            signing.dumps(turno, salt=SALT_TURNO),
+            max_age=getattr(settings, 'VOTACION_ADMISION_VIGENCIA_TURNO', 30 * 60),
+            httponly=True,
+            secure=request.is_secure(),
+            samesite='Lax',
+        )
+    return respuesta
+
+def retirar_turno(respuesta):
+    respuesta.delete_cookie(COOKIE_TURNO, samesite='Lax')
+    return respuesta
+
+def _admitir(request):
+    """Decide la entrada al tarjetón: retorna (cupo, None) o (None, respuesta hacia la sala)"""
+    turno = turno_de(request)
+    if turno is None and hay_fila():
+        return None, a_la_sala(request, request.get_full_path())
+    if turno is not None and not consultar_turno(turno)['admitido']:
+        return None, a_la_sala(request, request.get_full_path(), turno)
+    cupo = tomar_cupo()
+    if cupo is None:
+        return None, a_la_sala(request, request.get_full_path(), turno)
+    return cupo, None
+
+def con_admision(vista):
+    """Decorador de las vistas del tarjetón (síncronas o async)"""
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura(request, *args, **kwargs):
+            if not cupos():
+                return await vista(request, *args, **kwargs)
+            cupo, espera = _admitir(request)
+            if espera is not None:
+                return espera
+            try:
+                respuesta = await vista(request, *args, **kwargs)
+            finally:
+                liberar_cupo(cupo)
+            return retirar_turno(respuesta) if COOKIE_TURNO in request.COOKIES else respuesta
+    else:
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if not cupos():
+                return vista(request, *args, **kwargs)
+            cupo, espera = _admitir(request)
+            if espera is not None:
+                return espera
+            try:
+                respuesta = vista(request, *args, **kwargs)
+            finally:
+                liberar_cupo(cupo)
+            return retirar_turno(respuesta) if COOKIE_TURNO in request.COOKIES else respuesta
+    return envoltura
+
+def espera_voto():
+    return getattr(settings, 'VOTACION_ADMISION_ESPERA_VOTO', 3)
+
+def voto_a_la_sala(request):
+    """El voto no consiguió cupo a tiempo: a la sala, de vuelta al tarjetón desde el que se envió"""
+    metricas.incrementar('admision.votos_a_la_sala')
+    messages.warning(
+        request,
+        'Hay alta demanda en este momento y su voto aún no se registró. '
+        'Cuando sea su turno, marque de nuevo el tarjetón y envíelo.'
+    )
+    return a_la_sala(request, request.META.get('HTTP_REFERER'), turno_de(request))
+
+def resumen():
+    """Estado actual para las métricas del staff"""
+    return {
+        'cupos': cupos(),
+        'cupos_libres': cupos_libres() if cupos() else 0,
+        'turnos_emitidos': _contador(_EMITIDOS),
+        'turnos_llamados': _contador(_LLAMADOS),
+        'votos_a_la_sala': metricas.leer(['admision.votos_a_la_sala'])['admision.votos_a_la_sala'],
+    }
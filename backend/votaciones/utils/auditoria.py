@@ -0,0 +1,121 @@
+"""Rastro de auditoría de los intentos bloqueados, escrito en lotes
+
+registrar() solo agrega el evento a una lista en memoria del proceso: la petición no
+escribe en la base. Un hilo por proceso inserta los pendientes con bulk_create cuando se
+juntan VOTACION_AUDITORIA_LOTE eventos o pasan VOTACION_AUDITORIA_INTERVALO ms desde el
+último vaciado, lo que ocurra primero. Al salir del proceso se vacía lo que quede.
+
+Si la base no acepta el lote, los eventos vuelven a la lista para el siguiente intento;
+por encima de VOTACION_AUDITORIA_MAXIMO pendientes se descartan los más viejos (y se
+cuentan en la métrica auditoria.descartados).
+"""
+import atexit
+import ipaddress
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import metricas
+
+logger = logging.getLogger('votaciones.auditoria')
+
+_pendientes = []
+_candado = threading.Lock()
+_hay_lote = threading.Event()
+_escritor = None
+_candado_escritor = threading.Lock()
+
+def _lote():
+    return getattr(settings, 'VOTACION_AUDITORIA_LOTE', 100)
+
+def _ip_valida(ip):
+    # X-Forwarded-For llega del cliente: un valor inválido haría fallar el lote completo
+    try:
+        return str(ipaddress.ip_address(ip.strip()))
+    except ValueError:
+        return None
+
+def registrar(tipo, ip=None, documento='', ruta='', detalle=''):
+    """Agrega un evento (un tipo de EventoAuditoria.TIPO_CHOICES) a los pendientes del proceso"""
+    from ..models import EventoAuditoria
+    valida = _ip_valida(ip) if ip else None
+    if ip and valida is None:
+        detalle = ' '.join(filter(None, [f'IP inválida {ip!r}.', detalle]))
+    evento = EventoAuditoria(
+        tipo=tipo, ip=valida, documento=(documento or '')[:20], ruta=ruta[:200], detalle=detalle[:255],
+        creado=timezone.now(),
+    )
+    with _candado:
+        _pendientes.append(evento)
+        lleno = len(_pendientes) >= _lote()
+    if lleno:
+        _hay_lote.set()
+    iniciar_escritor()
+
+def pendientes():
+    with _candado:
+        return len(_pendientes)
+
+def vaciar():
+    """Inserta los eventos pendientes en un solo bulk_create; retorna cuántos se guardaron"""
+    from ..models import EventoAuditoria
+    with _candado:
+        lote = _pendientes[:]
+        del _pendientes[:]
+    if not lote:
+        return 0
+    try:
+        EventoAuditoria.objects.bulk_create(lote, batch_size=500)
+    except Exception:
+        logger.exception('No se pudo guardar un lote de %s eventos de auditoría', len(lote))
+        _devolver(lote)
+        return 0
+    return len(lote)
+
+def _devolver(lote):
+    maximo = getattr(settings, 'VOTACION_AUDITORIA_MAXIMO', 10000)
+    with _candado:
+        _pendientes[:0] = lote
+        sobrantes = len(_pendientes) - maximo
+        if sobrantes > 0:
+            del _pendientes[:sobrantes]
+    if sobrantes > 0:
+        metricas.incrementar('auditoria.descartados', sobrantes)
+
+class Escritor(threading.Thread):
+    """Hilo que vacía los pendientes por tamaño de lote o por tiempo"""
+
+    def __init__(self):
+        super().__init__(name='escritor-auditoria', daemon=True)
+        self.intervalo = getattr(settings, 'VOTACION_AUDITORIA_INTERVALO', 500) / 1000
+
+    def run(self):
+        while True:
+            _hay_lote.wait(self.intervalo)
+            _hay_lote.clear()
+            if not pendientes():
+                continue
+            close_old_connections()
+            try:
+                vaciar()
+            finally:
+                close_old_connections()
+
+def iniciar_escritor():
+    """Arranca el hilo escritor (una vez por proceso)"""
+    global _escritor
+    if _escritor is not None and _escritor.is_alive():
+        return _escritor
+    with _candado_escritor:
+        if _escritor is None or not _escritor.is_alive():
+            _escritor = Escritor()
+            _escritor.start()
+    return _escritor
+
+@atexit.register
+def _vaciar_al_salir():
+    if pendientes():
+        vaciar()
@@ -0,0 +1,91 @@
+import re
+import statistics
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+# Extrae la tabla afectada por una sentencia de escritura
+_TABLA_ESCRITURA = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?([\w]+)"?', re.IGNORECASE)
+
+@contextmanager
+def base_de_datos_temporal(alias='default'):
+    """Crea una base de datos de pruebas desechable para los benchmarks y la destruye al salir"""
+    conexion = connections[alias]
+    nombre_original = conexion.settings_dict['NAME']
+    setup_test_environment()
+    conexion.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield conexion
+    finally:
+        conexion.creation.destroy_test_db(nombre_original, verbosity=0)
+        teardown_test_environment()
+
+class ContadorSQL:
+    """Wrapper de ejecución que cuenta sentencias totales y escrituras por tabla"""
+
+    def __init__(self):
+        self.total = 0
+        self.escrituras = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        coincidencia = _TABLA_ESCRITURA.match(sql)
+        if coincidencia:
+            self.escrituras[coincidencia.group(1)] += 1
+        return execute(sql, params, many, context)
+
+def crear_padron(cantidad, tipo_persona='estudiante', inicio=1):
+    """Crea `cantidad` votantes de prueba con documentos consecutivos"""
+    from ..models import Votante
+
+    votantes = [
+        Votante(
+            nombre=f'Votante {numero:07d}',
+            documento=str(1000000000 + numero),
+            tipo_persona=tipo_persona,
+            tipo_votante='virtual',
+        )
+        for numero in range(inicio, inicio + cantidad)
+    ]
+    return Votante.objects.bulk_create(votantes, batch_size=2000)
+
+def crear_tarjeton(tipo_persona='estudiante', consejos=2, planchas=3):
+    """Crea consejos activos con planchas para un tipo de persona; retorna {consejo: [planchas]}"""
+    from ..models import TipoConsejo, Plancha
+
+    tarjeton = {}
+    for numero_consejo in range(1, consejos + 1):
+        consejo, _ = TipoConsejo.objects.get_or_create(nombre=f'Consejo {numero_consejo}')
+        tarjeton[consejo] = [
+            Plancha.objects.get_or_create(
+                numero=numero,
+                tipo_consejo=consejo,
+                tipo_persona=tipo_persona,
+                defaults={'nombre': f'Plancha {numero}'},
+            )[0]
+            for numero in range(1, planchas + 1)
+        ]
+    return tarjeton
+
+def resumir_tiempos(tiempos):
+    """Resume una lista de duraciones (segundos) en milisegundos"""
+    ordenados = sorted(tiempos)
+    if not ordenados:
+        return {'n': 0, 'media_ms': 0, 'p50_ms': 0, 'p95_ms': 0, 'max_ms': 0}
+    p95 = ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))]
+    return {
+        'n': len(ordenados),
+        'media_ms': round(statistics.fmean(ordenados) * 1000, 3),
+        'p50_ms': round(statistics.median(ordenados) * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'max_ms': round(ordenados[-1] * 1000, 3),
+    }
+
+def cronometrar(funcion, *args, **kwargs):
+    """Ejecuta `funcion` y retorna (resultado, segundos)"""
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
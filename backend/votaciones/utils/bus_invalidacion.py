@@ -0,0 +1,135 @@
+"""Bus de invalidación de las cachés en memoria entre workers
+
+Los tarjetones, las opciones válidas del voto y el índice del padrón viven en la
+memoria de cada worker de gunicorn/uvicorn, pero el admin edita Plancha, TipoConsejo o
+Votante en uno solo. Cada tema tiene una fila en VersionCache:
+
+- publicar(tema) incrementa su versión dentro de la transacción del cambio y limpia
+  las cachés del tema en el proceso que lo publicó (también al confirmar);
+- revisar() lee la tabla completa (una consulta de pocas filas) como máximo cada
+  VOTACION_BUS_INTERVALO segundos; BusInvalidacionMiddleware la llama en cada
+  petición. Si la versión de un tema cambió, se ejecutan sus limpiezas registradas.
+
+Las cachés se suscriben con registrar(tema, limpiar) o, para una función memorizada
+por argumentos, con el decorador @cache_versionada(tema, ...).
+
+Los votos no pasan por el bus (serían una fila caliente): el padrón sigue los votos
+con su propia revisión por updated_at y los resultados usan version_resultados.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+logger = logging.getLogger('votaciones.bus')
+
+ALIAS = 'default'
+
+_versiones = {}
+_limpiezas = defaultdict(list)
+_proxima_revision = 0.0
+_revisado = False
+_candado = threading.Lock()
+
+def registrar(tema, limpiar):
+    """Suscribe `limpiar()` a los cambios de `tema` publicados por cualquier worker"""
+    _limpiezas[tema].append(limpiar)
+
+def _limpiar(tema):
+    for limpiar in _limpiezas.get(tema, ()):
+        try:
+            limpiar()
+        except Exception:
+            logger.exception('Falló la limpieza de una caché del tema "%s"', tema)
+
+def publicar(tema):
+    """Incrementa la versión del tema en la transacción en curso"""
+    from ..models import VersionCache
+
+    if not VersionCache.objects.using(ALIAS).filter(nombre=tema).update(version=F('version') + 1):
+        try:
+            with transaction.atomic(using=ALIAS):
+                VersionCache.objects.using(ALIAS).create(nombre=tema, version=1)
+        except IntegrityError:
+            # Otro proceso creó la fila entre el UPDATE y el INSERT
+            VersionCache.objects.using(ALIAS).filter(nombre=tema).update(version=F('version') + 1)
+    # Ya, para que este proceso vea su propio cambio, y otra vez al confirmar, por si otro
+    # hilo volvió a llenar la caché con los datos anteriores mientras tanto
+    _limpiar(tema)
+    transaction.on_commit(lambda: _limpiar(tema), using=ALIAS)
+
+def publicar_receptor(tema):
+    """Receptor de señales post_save/post_delete que publica `tema`"""
+    def receptor(raw=False, **kwargs):
+        if not raw:
+            publicar(tema)
+    return receptor
+
+def _intervalo():
+    return getattr(settings, 'VOTACION_BUS_INTERVALO', 1)
+
+def revision_pendiente():
+    return time.monotonic() >= _proxima_revision
+
+def revisar(forzar=False):
+    """Compara las versiones de la base con las conocidas y limpia los temas que cambiaron"""
+    from ..models import VersionCache
+    global _proxima_revision, _revisado
+
+    if not (forzar or revision_pendiente()):
+        return
+    # Un solo hilo revisa; los demás siguen con las cachés vigentes
+    if not _candado.acquire(blocking=forzar):
+        return
+    try:
+        actuales = dict(VersionCache.objects.using(ALIAS).values_list('nombre', 'version'))
+        for tema, version in actuales.items():
+            # La primera lectura del proceso es la base (las cachés se llenaron después);
+            # desde entonces, un tema sin fila tenía versión 0
+            conocida = _versiones.get(tema, 0 if _revisado else None)
+            _versiones[tema] = version
+            if conocida is not None and conocida != version:
+                _limpiar(tema)
+        _revisado = True
+        _proxima_revision = time.monotonic() + _intervalo()
+    finally:
+        _candado.release()
+
+def version(tema):
+    """Versión del tema según la última revisión de este proceso (0 si nunca se publicó)"""
+    return _versiones.get(tema, 0)
+
+def cache_versionada(*temas):
+    """Memoriza la función en el proceso, por argumentos, hasta que cambie alguno de los temas"""
+    def decorador(funcion):
+        valores = {}
+        generacion = [0]
+
+        def invalidar():
+            generacion[0] += 1
+            valores.clear()
+
+        @wraps(funcion)
+        def envoltura(*args):
+            revisar()
+            try:
+                return valores[args]
+            except KeyError:
+                pass
+            inicial = generacion[0]
+            valor = funcion(*args)
+            # Si se invalidó mientras se calculaba, el valor puede ser anterior al cambio
+            if generacion[0] == inicial:
+                valores[args] = valor
+            return valor
+
+        envoltura.invalidar = invalidar
+        for tema in temas:
+            registrar(tema, invalidar)
+        return envoltura
+    return decorador
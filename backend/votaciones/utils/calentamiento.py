@@ -0,0 +1,114 @@
+"""Calentamiento del worker antes de aceptar tráfico (wsgi.py / asgi.py)
+
+Cada tarea prepara algo que de otro modo pagaría la primera petición: plantillas en el
+cargador con caché, tarjetones en memoria, módulos pesados (reportlab) en los workers
+del staff. Un fallo en una tarea se registra y no impide arrancar.
+"""
+import logging
+import time
+from importlib import import_module
+
+from django.conf import settings
+
+logger = logging.getLogger('votaciones.arranque')
+
+PLANTILLAS_PUBLICAS = [
+    'votaciones/index.html',
+    'votaciones/tarjeton_estudiantes.html',
+    'votaciones/tarjeton_docentes.html',
+    'votaciones/tarjeton_graduados.html',
+    'votaciones/gracias.html',
+]
+
+PLANTILLAS_STAFF = [
+    'admin/dashboard_electoral.html',
+    'admin/vista_jurado.html',
+    'admin/confirmar_voto_fisico.html',
+]
+
+# Módulos que las vistas del staff importan dentro del request
+MODULOS_STAFF = [
+    'votaciones.utils.generar_reporte',
+    'reportlab.lib.styles',
+    'reportlab.platypus',
+    'reportlab.graphics.shapes',
+]
+
+def revisar_bus():
+    from . import bus_invalidacion
+    bus_invalidacion.revisar(forzar=True)
+
+def cargar_plantillas(nombres):
+    from django.template.loader import get_template
+    for nombre in nombres:
+        get_template(nombre)
+
+def cargar_tarjetones():
+    from ..models import Votante
+    from .tarjetones import planchas_por_consejo
+    for tipo_persona, _ in Votante.TIPO_PERSONA_CHOICES:
+        planchas_por_consejo(tipo_persona)
+
+def cargar_padron():
+    from . import padron
+    if padron.activo():
+        padron.construir()
+
+def cargar_horarios():
+    from .horarios import esta_en_horario_electoral, obtener_info_horarios
+    esta_en_horario_electoral()
+    obtener_info_horarios()
+
+def cargar_dashboard():
+    from .dashboard import contexto_dashboard
+    contexto_dashboard()
+
+def cargar_version_publica():
+    from .paginas_publicas import ultima_modificacion_plantillas, version_publica
+    version_publica()
+    ultima_modificacion_plantillas()
+
+def importar_modulos(nombres):
+    for nombre in nombres:
+        import_module(nombre)
+
+def tareas(perfil):
+    """Lista [(nombre, función)] de tareas de calentamiento para el perfil del worker"""
+    lista = [
+        # Primero: las versiones leídas deben ser anteriores a las cachés que se llenan después
+        ('bus de invalidación', revisar_bus),
+        ('plantillas públicas', lambda: cargar_plantillas(PLANTILLAS_PUBLICAS)),
+        ('validadores HTTP de páginas públicas', cargar_version_publica),
+        ('tarjetones', cargar_tarjetones),
+        ('índice del padrón', cargar_padron),
+        ('horarios', cargar_horarios),
+    ]
+    if perfil != 'publico':
+        lista += [
+            ('plantillas del staff', lambda: cargar_plantillas(PLANTILLAS_STAFF)),
+            ('módulos de reportes', lambda: importar_modulos(MODULOS_STAFF)),
+            ('estadísticas del dashboard', cargar_dashboard),
+        ]
+    return lista
+
+def calentar(perfil=None):
+    """Ejecuta las tareas de calentamiento; retorna [(nombre, milisegundos, error o None)]"""
+    from django.db import connections
+
+    perfil = perfil or getattr(settings, 'VOTACION_PERFIL_WORKER', 'completo')
+    resultados = []
+    for nombre, tarea in tareas(perfil):
+        inicio = time.perf_counter()
+        error = None
+        try:
+            tarea()
+        except Exception as e:
+            error = str(e)
+            logger.warning('Calentamiento "%s" falló: %s', nombre, error)
+        resultados.append((nombre, (time.perf_counter() - inicio) * 1000, error))
+
+    # La conexión abierta aquí pertenece al hilo de arranque, no a los de las peticiones
+    connections.close_all()
+    total = sum(duracion for _, duracion, _ in resultados)
+    logger.info('Worker (%s) calentado en %.0f ms', perfil, total)
+    return resultados
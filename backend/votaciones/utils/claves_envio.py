@@ -0,0 +1,97 @@
+"""Claves de envío de un solo uso para el formulario del tarjetón
+
+El tarjetón lleva en un campo oculto el nonce del token de voto (una clave por ingreso).
+procesar_voto la reserva en la caché antes de cualquier consulta:
+
+- clave nueva: se procesa el voto; si termina en la página de gracias la clave queda
+  marcada como completada durante la vida del token, si no se libera para reintentar.
+- clave completada (doble clic, reenvío tras un timeout): se responde de nuevo con la
+  redirección a gracias sin tocar Votante, Voto ni ResultadoVotacion.
+- clave en curso (el primer envío aún no termina): se espera su resultado unos
+  segundos. Si el primero falla, el reintento sigue y lo decide el UPDATE condicional.
+"""
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import redirect
+from django.urls import reverse
+
+from .token_voto import duracion_token_voto, retirar_token_voto
+
+CAMPO_CLAVE_ENVIO = 'clave_envio'
+
+EN_CURSO = 'en_curso'
+COMPLETADA = 'completada'
+
+_FORMATO_CLAVE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+def _cache():
+    return caches[getattr(settings, 'VOTACION_CLAVES_ENVIO_CACHE', 'default')]
+
+def _clave_cache(clave):
+    return f'votaciones:envio:{clave}'
+
+def clave_de(request, datos_votante=None):
+    """Clave de envío del formulario; None si falta, es inválida o no es la del token vigente"""
+    clave = request.POST.get(CAMPO_CLAVE_ENVIO, '')
+    if not _FORMATO_CLAVE.match(clave):
+        return None
+    if datos_votante is not None and datos_votante['nonce'] != clave:
+        return None
+    return clave
+
+def respuesta_completada():
+    """La respuesta original de un voto registrado"""
+    return retirar_token_voto(redirect('votaciones:gracias'))
+
+def estado(clave):
+    return _cache().get(_clave_cache(clave))
+
+def reservar(clave):
+    """Intenta reservar la clave; retorna None si se reservó o el estado que ya tenía"""
+    espera = getattr(settings, 'VOTACION_CLAVES_ENVIO_ESPERA', 5)
+    # add es atómico: de dos envíos simultáneos solo uno reserva la clave
+    if _cache().add(_clave_cache(clave), EN_CURSO, timeout=espera * 2):
+        return None
+    return estado(clave) or EN_CURSO
+
+def esperar(clave):
+    """Espera a que termine el envío en curso; retorna COMPLETADA, EN_CURSO (tiempo agotado) o None (liberada)"""
+    limite = time.monotonic() + getattr(settings, 'VOTACION_CLAVES_ENVIO_ESPERA', 5)
+    while time.monotonic() < limite:
+        actual = estado(clave)
+        if actual != EN_CURSO:
+            return actual
+        time.sleep(0.05)
+    return EN_CURSO
+
+def terminar(clave, respuesta):
+    """Marca la clave como completada si el voto llegó a gracias; si no, la libera"""
+    if respuesta.status_code == 302 and respuesta.url == reverse('votaciones:gracias'):
+        _cache().set(_clave_cache(clave), COMPLETADA, timeout=duracion_token_voto())
+    else:
+        _cache().delete(_clave_cache(clave))
+    return respuesta
+
+def procesar_con_clave(clave, procesar):
+    """Ejecuta procesar() protegido por la clave de envío (en la vista síncrona o vía sync_to_async)"""
+    previo = reservar(clave)
+    if previo == EN_CURSO:
+        previo = esperar(clave)
+        if previo is None:
+            # El primer envío falló y liberó la clave: este reintento la toma
+            previo = reservar(clave)
+    if previo == COMPLETADA:
+        return respuesta_completada()
+    if previo is not None:
+        # El otro envío sigue en proceso: el UPDATE condicional impide un segundo voto
+        return procesar()
+
+    try:
+        respuesta = procesar()
+    except BaseException:
+        _cache().delete(_clave_cache(clave))
+        raise
+    return terminar(clave, respuesta)
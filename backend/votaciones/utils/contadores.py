@@ -0,0 +1,86 @@
+"""Contadores de resultados con incremento atómico y fragmentación opcional
+
+Con VOTACION_FRAGMENTOS_CONTADOR = 1 cada voto hace UPDATE ... SET cantidad_votos =
+cantidad_votos + 1 sobre la fila de ResultadoVotacion. Con K > 1 el incremento va a uno
+de K FragmentoResultado elegido al azar: los votos simultáneos por la plancha
+puntera se reparten entre K bloqueos de fila en lugar de esperar uno solo.
+
+Las lecturas suman la fila del resultado y sus fragmentos en la misma consulta
+(con_fragmentos); compactar() los pliega periódicamente en ResultadoVotacion.
+"""
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+def cantidad_fragmentos():
+    return max(1, getattr(settings, 'VOTACION_FRAGMENTOS_CONTADOR', 1))
+
+def _sumar(modelo, clave, cantidad, **extra):
+    """UPDATE atómico de la fila `clave`; la crea si no existe (carrera resuelta con un savepoint)"""
+    if modelo.objects.filter(**clave).update(cantidad_votos=F('cantidad_votos') + cantidad, **extra):
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(cantidad_votos=cantidad, **clave)
+    except IntegrityError:
+        # Otro voto creó la fila entre el UPDATE y el INSERT
+        modelo.objects.filter(**clave).update(cantidad_votos=F('cantidad_votos') + cantidad, **extra)
+
+def incrementar(plancha_id, tipo_consejo_id, tipo_persona, cantidad=1):
+    """Suma `cantidad` votos al contador de (plancha, consejo, tipo de persona)"""
+    from ..models import ResultadoVotacion, FragmentoResultado
+
+    clave = {'plancha_id': plancha_id, 'tipo_consejo_id': tipo_consejo_id, 'tipo_persona': tipo_persona}
+    fragmentos = cantidad_fragmentos()
+    if fragmentos == 1:
+        _sumar(ResultadoVotacion, clave, cantidad, ultima_actualizacion=timezone.now())
+        return
+
+    # La fila del resultado debe existir para listarlo; get_or_create solo escribe la primera vez
+    ResultadoVotacion.objects.get_or_create(**clave)
+    _sumar(FragmentoResultado, {**clave, 'fragmento': random.randrange(fragmentos)}, cantidad)
+
+def con_fragmentos(queryset):
+    """Anota votos_fragmentos y votos_totales (cantidad_votos + fragmentos) en un queryset de ResultadoVotacion"""
+    from ..models import FragmentoResultado
+
+    suma = FragmentoResultado.objects.filter(
+        plancha_id=OuterRef('plancha_id'),
+        tipo_consejo_id=OuterRef('tipo_consejo_id'),
+        tipo_persona=OuterRef('tipo_persona'),
+    ).order_by().values('plancha_id').annotate(total=Sum('cantidad_votos')).values('total')
+    return queryset.annotate(
+        votos_fragmentos=Coalesce(Subquery(suma), Value(0)),
+    ).annotate(votos_totales=F('cantidad_votos') + F('votos_fragmentos'))
+
+def compactar():
+    """Pliega los fragmentos con votos en ResultadoVotacion; retorna (contadores, votos) compactados
+
+    Cada fragmento se descuenta por lo que se leyó (no se pone en cero), así un voto que
+    llega durante la compactación se conserva en el fragmento para la próxima pasada.
+    """
+    from ..models import ResultadoVotacion, FragmentoResultado
+
+    pendientes = FragmentoResultado.objects.filter(cantidad_votos__gt=0).values_list(
+        'id', 'plancha_id', 'tipo_consejo_id', 'tipo_persona', 'cantidad_votos'
+    )
+    por_contador = {}
+    for fragmento_id, plancha_id, consejo_id, tipo_persona, cantidad in pendientes:
+        por_contador.setdefault((plancha_id, consejo_id, tipo_persona), []).append((fragmento_id, cantidad))
+
+    votos = 0
+    ahora = timezone.now()
+    for (plancha_id, consejo_id, tipo_persona), fragmentos in por_contador.items():
+        total = sum(cantidad for _, cantidad in fragmentos)
+        clave = {'plancha_id': plancha_id, 'tipo_consejo_id': consejo_id, 'tipo_persona': tipo_persona}
+        # Una transacción por contador: la suma resultado + fragmentos nunca se ve a medias
+        with transaction.atomic():
+            for fragmento_id, cantidad in fragmentos:
+                FragmentoResultado.objects.filter(id=fragmento_id).update(cantidad_votos=F('cantidad_votos') - cantidad)
+            _sumar(ResultadoVotacion, clave, total, ultima_actualizacion=ahora)
+        votos += total
+    return len(por_contador), votos
@@ -0,0 +1,140 @@
+"""Contexto del dashboard electoral calculado en una sola pasada y cacheado por versión
+
+Todo el tablero sale de tres consultas: un aggregate condicional sobre Votante, la lista
+de consejos activos y las filas de ResultadoVotacion (una por plancha/consejo/tipo).
+Los totales por tipo, por consejo y el top de planchas se agregan en Python sobre esas
+mismas filas. El resultado se guarda bajo la versión de resultados vigente
+(utils/version_resultados.py): entre dos votos, cargar el dashboard no consulta la base.
+
+El mismo contexto trae el resumen que publica estadisticas_json (un solo esquema para
+la página y el sondeo) y su huella, que la vista usa como ETag.
+"""
+import hashlib
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import bus_invalidacion
+from .contadores import con_fragmentos
+from .version_resultados import version_resultados
+
+TIPOS_PERSONA = ['estudiante', 'docente', 'graduado']
+
+def calcular_estadisticas():
+    """Totales de votantes y votos por tipo en un solo aggregate (mismos campos que EstadisticaVotacion)"""
+    from ..models import Votante
+
+    totales = Votante.objects.aggregate(
+        total_votantes=Count('id'),
+        total_votos_emitidos=Count('id', filter=Q(ya_voto=True)),
+        **{
+            f'votos_{tipo}s': Count('id', filter=Q(ya_voto=True, tipo_persona=tipo))
+            for tipo in TIPOS_PERSONA
+        }
+    )
+    total = totales['total_votantes']
+    totales['porcentaje_participacion'] = round(totales['total_votos_emitidos'] / total * 100, 2) if total else 0
+    totales['ultima_actualizacion'] = timezone.now()
+    return totales
+
+def construir_contexto_dashboard():
+    """Arma el contexto completo del dashboard (sin caché)"""
+    from ..models import TipoConsejo, ResultadoVotacion
+
+    # Votos temporales aún sin contabilizar (normalmente ninguno: el voto se cuenta al registrarse)
+    ResultadoVotacion.contabilizar_votos_pendientes()
+
+    estadisticas = calcular_estadisticas()
+    consejos = list(TipoConsejo.objects.filter(activo=True).values_list('id', 'nombre'))
+    filas = con_fragmentos(ResultadoVotacion.objects.all()).order_by('-votos_totales', 'plancha__numero').values_list(
+        'tipo_persona', 'tipo_consejo_id', 'plancha__numero', 'plancha__nombre', 'votos_totales'
+    )
+
+    por_tipo_y_consejo = defaultdict(list)
+    votos_tipo = defaultdict(int)
+    votos_consejo = defaultdict(int)
+    votos_plancha = defaultdict(int)
+    for tipo_persona, consejo_id, numero, nombre, cantidad in filas:
+        por_tipo_y_consejo[(tipo_persona, consejo_id)].append((numero, nombre, cantidad))
+        votos_tipo[tipo_persona] += cantidad
+        votos_consejo[consejo_id] += cantidad
+        votos_plancha[(numero, nombre, tipo_persona)] += cantidad
+
+    def resultados_por_categoria(tipo_persona):
+        consejos_data = []
+        for consejo_id, nombre_consejo in consejos:
+            resultados = por_tipo_y_consejo.get((tipo_persona, consejo_id), [])
+            total_votos = sum(cantidad for _, _, cantidad in resultados)
+            consejos_data.append({
+                'nombre': nombre_consejo,
+                'total_votos': total_votos,
+                'planchas': [
+                    {
+                        'numero': numero,
+                        'nombre': nombre,
+                        'votos': cantidad,
+                        'porcentaje': round(cantidad / total_votos * 100, 1) if total_votos > 0 else 0,
+                    }
+                    for numero, nombre, cantidad in resultados
+                ],
+            })
+        return consejos_data
+
+    resumen = {
+        'total_votantes': estadisticas['total_votantes'],
+        'total_votos': estadisticas['total_votos_emitidos'],
+        'porcentaje_participacion': float(estadisticas['porcentaje_participacion']),
+        'votos_estudiantes': estadisticas['votos_estudiantes'],
+        'votos_docentes': estadisticas['votos_docentes'],
+        'votos_graduados': estadisticas['votos_graduados'],
+        'votos_por_tipo': [{'tipo_persona': tipo, 'total': votos_tipo[tipo]} for tipo in TIPOS_PERSONA],
+        'votos_por_consejo': [
+            {'tipo_consejo__nombre': nombre, 'total': votos_consejo[consejo_id]} for consejo_id, nombre in consejos
+        ],
+    }
+    # La huella no incluye la hora de cálculo: dos workers con las mismas cifras dan el mismo ETag
+    huella = hashlib.sha1(json.dumps(resumen, sort_keys=True).encode()).hexdigest()[:20]
+    resumen['ultima_actualizacion'] = estadisticas['ultima_actualizacion'].isoformat()
+
+    top_planchas = sorted(votos_plancha.items(), key=lambda item: item[1], reverse=True)[:10]
+
+    return {
+        'estadisticas': estadisticas,
+        'resultados_estudiantes': resultados_por_categoria('estudiante'),
+        'resultados_docentes': resultados_por_categoria('docente'),
+        'resultados_graduados': resultados_por_categoria('graduado'),
+        'votos_por_tipo': json.dumps(resumen['votos_por_tipo']),
+        'votos_por_consejo': json.dumps(resumen['votos_por_consejo']),
+        'votos_por_plancha': [
+            {
+                'plancha__numero': numero,
+                'plancha__nombre': nombre,
+                'plancha__tipo_persona': tipo_persona,
+                'tipo_persona': tipo_persona,
+                'total': total,
+            }
+            for (numero, nombre, tipo_persona), total in top_planchas
+        ],
+        'resumen': resumen,
+        'huella': huella,
+    }
+
+def contexto_dashboard():
+    """Contexto del dashboard para la versión de resultados actual (de la caché si existe)"""
+    # Los nombres de planchas y consejos cambian con el tema 'tarjetones' del bus
+    clave = f'votaciones:dashboard:{version_resultados()}:{bus_invalidacion.version("tarjetones")}'
+    cache = caches['estadisticas']
+    contexto = cache.get(clave)
+    if contexto is None:
+        contexto = construir_contexto_dashboard()
+        # El TTL acota el desfase cuando la caché es local al proceso y el voto ocurrió en otro worker
+        cache.set(clave, contexto, getattr(settings, 'VOTACION_DASHBOARD_TTL', 30))
+    return contexto
+
+def etag_estadisticas(request, *args, **kwargs):
+    """ETag de las estadísticas vigentes (función etag_func de django.views.decorators.http.condition)"""
+    return contexto_dashboard()['huella']
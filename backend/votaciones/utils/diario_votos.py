@@ -0,0 +1,397 @@
+"""Escritura diferida de votos (VOTACION_ESCRITURA_DIFERIDA)
+
+Con SQLite cada voto compite por el único candado de escritura. En este modo la vista
+solo valida el voto y lo anota en un diario local de solo-agregar (una línea JSON por
+voto, con fsync antes de responder); un único hilo confirmador por servidor lo aplica
+a Voto / ResultadoVotacion / Votante en lotes, una transacción por lote.
+
+El diario se consume desde un punto de control (desplazamiento en bytes, guardado
+tras cada lote) y se reproduce al arrancar, así que un corte de energía no pierde
+votos ya confirmados al votante. Aplicar es idempotente: un votante que ya figura
+con ya_voto se omite, de modo que reprocesar un lote (p. ej. si el proceso murió
+entre el commit y el punto de control) no duplica conteos.
+
+El recibo se entrega solo después de que anotar_voto revalida, con el diario bloqueado
+entre procesos, todo lo que aplicar_lote exige (votante sin voto, IP sin usar, planchas
+vigentes). Si aun así una entrada se rechaza al aplicarla (p. ej. un jurado marcó al
+votante como presencial mientras su voto esperaba en el diario), el rechazo queda como
+EventoAuditoria 'voto_diferido_rechazado' con el recibo, no solo en el log.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, transaction, IntegrityError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .contadores import incrementar
+from .libro_boletas import anotar_boletas
+from .version_resultados import resultados_cambiaron
+
+try:
+    import fcntl
+except ImportError:  # Windows: un solo proceso, siempre es el confirmador
+    fcntl = None
+
+logger = logging.getLogger('votaciones.diario')
+
+_candado_escritura = threading.Lock()
+_hay_entradas = threading.Event()
+_confirmador = None
+_candado_confirmador = threading.Lock()
+
+# Votantes e IPs anotados en el diario por cualquier proceso, leídos hasta el byte _leido_hasta
+_encolados = set()
+_ips_encoladas = set()
+_leido_hasta = 0
+
+class VotoRechazado(Exception):
+    """El voto no se anota en el diario; el mensaje es para el votante"""
+
+    def __init__(self, mensaje, ya_voto=False):
+        super().__init__(mensaje)
+        self.ya_voto = ya_voto
+
+def ruta_diario():
+    return str(getattr(settings, 'VOTACION_DIARIO_VOTOS', settings.BASE_DIR / 'diario' / 'votos.jsonl'))
+
+def ruta_punto_control():
+    return ruta_diario() + '.punto'
+
+def esta_encolado(votante_id):
+    """Indica si el votante ya tiene un voto en el diario (según lo leído por este proceso)"""
+    return votante_id in _encolados
+
+def ip_encolada(ip_votacion):
+    """Indica si ya hay un voto en el diario desde esta IP (según lo leído por este proceso)"""
+    return ip_votacion in _ips_encoladas
+
+def _ponerse_al_dia(descriptor):
+    """Agrega a los conjuntos las entradas que otros procesos escribieron desde la última lectura"""
+    global _leido_hasta
+    tamano = os.fstat(descriptor).st_size
+    if tamano < _leido_hasta:
+        _leido_hasta = 0  # el diario se compactó: todo lo anterior ya está en la base
+    if tamano == _leido_hasta:
+        return
+    os.lseek(descriptor, _leido_hasta, os.SEEK_SET)
+    datos = os.read(descriptor, tamano - _leido_hasta)
+    # Solo hasta el último salto de línea: todas las escrituras son bajo el candado, pero
+    # una caída pudo dejar una línea truncada al final
+    completo = datos.rfind(b'\n') + 1
+    for linea in datos[:completo].splitlines():
+        try:
+            entrada = json.loads(linea)
+        except ValueError:
+            continue
+        _encolados.add(entrada['votante'])
+        if entrada['ip']:
+            _ips_encoladas.add(entrada['ip'])
+    _leido_hasta += completo
+
+def _validar(votante, ip_votacion, votos):
+    """Las mismas reglas que aplica aplicar_lote, contra la base y el diario completo"""
+    from ..models import Votante, Plancha, TipoConsejo
+
+    if votante.id in _encolados or Votante.objects.filter(id=votante.id, ya_voto=True).exists():
+        raise VotoRechazado('Usted ya ha ejercido su derecho al voto.', ya_voto=True)
+    if ip_votacion and (ip_votacion in _ips_encoladas or Votante.verificar_ip_duplicada(ip_votacion)):
+        raise VotoRechazado(
+            'Ya se ha registrado un voto desde esta dirección IP. '
+            'Por seguridad, no se permite votar desde la misma IP múltiples veces.'
+        )
+    planchas = {plancha_id for _, plancha_id in votos}
+    consejos = {consejo_id for consejo_id, _ in votos}
+    vigentes = Plancha.objects.filter(id__in=planchas, tipo_persona=votante.tipo_persona).count()
+    if vigentes != len(planchas) or TipoConsejo.objects.filter(id__in=consejos).count() != len(consejos):
+        raise VotoRechazado('El tarjetón cambió mientras votaba. Recargue la página y vote de nuevo.')
+
+def anotar_voto(votante, ip_votacion, votos):
+    """Revalida el voto, lo agrega al diario y lo sincroniza a disco; retorna el id del recibo
+
+    votos es una lista de pares (consejo_id, plancha_id). La validación y la escritura
+    ocurren con el diario bloqueado (flock), así que dos procesos no pueden anotar el
+    mismo votante o la misma IP. Lanza VotoRechazado si el voto no debe aceptarse.
+    """
+    global _leido_hasta
+    votos = [[int(consejo_id), int(plancha_id)] for consejo_id, plancha_id in votos]
+    recibo = uuid.uuid4().hex
+    entrada = {
+        'id': recibo,
+        'votante': votante.id,
+        'ip': ip_votacion,
+        'votos': votos,
+        't': timezone.now().isoformat(),
+    }
+    # El salto de línea inicial cierra cualquier línea truncada por una caída previa
+    linea = ('\n' + json.dumps(entrada, separators=(',', ':')) + '\n').encode()
+
+    ruta = ruta_diario()
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with _candado_escritura:
+        descriptor = os.open(ruta, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o640)
+        try:
+            if fcntl is not None:
+                fcntl.flock(descriptor, fcntl.LOCK_EX)
+            _ponerse_al_dia(descriptor)
+            _validar(votante, ip_votacion, votos)
+            os.write(descriptor, linea)
+            os.fsync(descriptor)
+            _leido_hasta = os.fstat(descriptor).st_size
+        finally:
+            os.close(descriptor)  # libera el flock
+
+    _encolados.add(votante.id)
+    if ip_votacion:
+        _ips_encoladas.add(ip_votacion)
+    _hay_entradas.set()
+    iniciar_confirmador()
+    return recibo
+
+def leer_punto_control():
+    try:
+        with open(ruta_punto_control()) as archivo:
+            return int(archivo.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+def guardar_punto_control(desplazamiento):
+    """Guarda el desplazamiento consumido de forma atómica (archivo temporal + rename)"""
+    ruta = ruta_punto_control()
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    with open(temporal, 'w') as archivo:
+        archivo.write(str(desplazamiento))
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+
+def leer_entradas(desde, limite):
+    """Lee hasta `limite` entradas completas desde el desplazamiento; retorna (entradas, nuevo_desplazamiento)"""
+    entradas = []
+    try:
+        archivo = open(ruta_diario(), 'rb')
+    except FileNotFoundError:
+        return entradas, desde
+
+    with archivo:
+        archivo.seek(desde)
+        desplazamiento = desde
+        while len(entradas) < limite:
+            linea = archivo.readline()
+            if not linea.endswith(b'\n'):
+                break  # línea aún incompleta: se relee en la siguiente pasada
+            desplazamiento += len(linea)
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                entradas.append(json.loads(linea))
+            except ValueError:
+                logger.error('Entrada ilegible en el diario de votos antes del byte %s: %r', desplazamiento, linea[:200])
+    return entradas, desplazamiento
+
+def _rechazo(entrada, motivo, documento=''):
+    """EventoAuditoria visible de una entrada del diario que no se pudo aplicar"""
+    from ..models import EventoAuditoria
+    return EventoAuditoria(
+        tipo='voto_diferido_rechazado', ip=entrada['ip'] or None, documento=documento[:20],
+        ruta=f'diario/{entrada["id"]}', detalle=f'Votante {entrada["votante"]}: {motivo}'[:255],
+        creado=timezone.now(),
+    )
+
+def aplicar_lote(entradas):
+    """Aplica un lote de entradas del diario en una sola transacción; retorna (aplicadas, omitidas)
+
+    Las entradas rechazadas se guardan como EventoAuditoria (ruta diario/<recibo>) en la
+    misma transacción. Al reproducir el diario, una entrada ya aplicada (el votante figura
+    con su misma fecha de voto) o ya rechazada no genera otro evento.
+    """
+    from ..models import Votante, Voto, Plancha, EventoAuditoria
+
+    if not entradas:
+        return 0, 0
+
+    ahora = timezone.now()
+    aplicadas = omitidas = 0
+    with transaction.atomic():
+        votantes = Votante.objects.select_for_update().in_bulk({entrada['votante'] for entrada in entradas})
+        ips = {entrada['ip'] for entrada in entradas if entrada['ip']}
+        ips_usadas = set(
+            Votante.objects.filter(ya_voto=True, ip_votacion__in=ips).values_list('ip_votacion', flat=True)
+        )
+        planchas = Plancha.objects.only('id', 'tipo_persona').in_bulk(
+            {plancha_id for entrada in entradas for _, plancha_id in entrada['votos']}
+        )
+
+        votos = []
+        boletas = []
+        incrementos = Counter()
+        marcados = []
+        rechazos = []
+        for entrada in entradas:
+            votante = votantes.get(entrada['votante'])
+            ip = entrada['ip']
+            fecha = parse_datetime(entrada['t']) or ahora
+            if votante is None:
+                rechazos.append(_rechazo(entrada, 'el votante ya no existe'))
+                omitidas += 1
+                continue
+            if votante.ya_voto:
+                if votante.fecha_voto != fecha:
+                    rechazos.append(_rechazo(entrada, 'el votante ya figuraba con voto', votante.documento))
+                omitidas += 1
+                continue
+            if ip and ip in ips_usadas:
+                logger.warning(
+                    'Voto diferido %s rechazado: la IP %s ya registró un voto (votante %s)',
+                    entrada['id'], ip, votante.documento,
+                    extra={'ip': ip, 'documento': votante.documento, 'recibo': entrada['id']},
+                )
+                rechazos.append(_rechazo(entrada, 'la IP ya registró un voto', votante.documento))
+                omitidas += 1
+                continue
+
+            descartadas = []
+            for consejo_id, plancha_id in entrada['votos']:
+                plancha = planchas.get(plancha_id)
+                if plancha is None or plancha.tipo_persona != votante.tipo_persona:
+                    descartadas.append(str(plancha_id))
+                    continue
+                votos.append(Voto(
+                    votante_id=votante.id,
+                    plancha_id=plancha_id,
+                    tipo_consejo_id=consejo_id,
+                    ip_votacion=ip,
+                    contabilizado=True,
+                ))
+                incrementos[(plancha_id, consejo_id, votante.tipo_persona)] += 1
+                boletas.append((plancha_id, consejo_id, votante.tipo_persona))
+            if descartadas:
+                # El votante ya recibió su recibo: se marca igual, y las boletas sin plancha quedan registradas
+                rechazos.append(_rechazo(
+                    entrada, f'planchas inexistentes o de otro tipo de persona: {", ".join(descartadas)}',
+                    votante.documento,
+                ))
+
+            votante.ya_voto = True
+            votante.ip_votacion = ip
+            votante.fecha_voto = fecha
+            votante.tipo_votante = 'presencial' if ip is None else 'virtual'
+            votante.updated_at = ahora
+            marcados.append(votante)
+            if ip:
+                ips_usadas.add(ip)
+            aplicadas += 1
+
+        Voto.objects.bulk_create(votos, ignore_conflicts=True)
+        anotar_boletas(boletas)
+        for (plancha_id, consejo_id, tipo_persona), cantidad in incrementos.items():
+            incrementar(plancha_id, consejo_id, tipo_persona, cantidad)
+        Votante.objects.bulk_update(
+            marcados, ['ya_voto', 'ip_votacion', 'fecha_voto', 'tipo_votante', 'updated_at'], batch_size=500
+        )
+        ya_rechazadas = set(EventoAuditoria.objects.filter(
+            tipo='voto_diferido_rechazado', ruta__in=[rechazo.ruta for rechazo in rechazos]
+        ).values_list('ruta', flat=True))
+        EventoAuditoria.objects.bulk_create([rechazo for rechazo in rechazos if rechazo.ruta not in ya_rechazadas])
+        if marcados:
+            resultados_cambiaron()
+
+    return aplicadas, omitidas
+
+def drenar(limite_lote=None):
+    """Aplica todo lo pendiente del diario desde el punto de control; retorna (aplicadas, omitidas)"""
+    limite_lote = limite_lote or getattr(settings, 'VOTACION_DIARIO_LOTE', 500)
+    total_aplicadas = total_omitidas = 0
+    desplazamiento = leer_punto_control()
+    while True:
+        entradas, nuevo = leer_entradas(desplazamiento, limite_lote)
+        if nuevo == desplazamiento:
+            break
+        try:
+            aplicadas, omitidas = aplicar_lote(entradas)
+        except IntegrityError:
+            # Una entrada inválida (p. ej. un consejo borrado) no debe bloquear el diario:
+            # se aplica una por una y se descartan solo las que fallan
+            aplicadas = omitidas = 0
+            for entrada in entradas:
+                try:
+                    resultado = aplicar_lote([entrada])
+                except IntegrityError as e:
+                    logger.exception('Voto diferido %s descartado (votante %s)', entrada['id'], entrada['votante'])
+                    _rechazo(entrada, f'error de integridad: {e}').save()
+                    resultado = (0, 1)
+                aplicadas += resultado[0]
+                omitidas += resultado[1]
+        guardar_punto_control(nuevo)
+        desplazamiento = nuevo
+        total_aplicadas += aplicadas
+        total_omitidas += omitidas
+        _encolados.difference_update(entrada['votante'] for entrada in entradas)
+        _ips_encoladas.difference_update(entrada['ip'] for entrada in entradas)
+    return total_aplicadas, total_omitidas
+
+def pendientes():
+    """Bytes del diario aún no aplicados a la base de datos"""
+    try:
+        tamano = os.path.getsize(ruta_diario())
+    except FileNotFoundError:
+        return 0
+    return max(tamano - leer_punto_control(), 0)
+
+class Confirmador(threading.Thread):
+    """Hilo único que drena el diario; entre procesos se elige con un candado de archivo"""
+
+    def __init__(self):
+        super().__init__(name='confirmador-votos', daemon=True)
+        self.espera = getattr(settings, 'VOTACION_DIARIO_ESPERA', 0.2)
+        self.candado = None
+
+    def adquirir(self):
+        """Intenta ser el confirmador del servidor (no bloqueante)"""
+        if self.candado is not None:
+            return True
+        ruta = ruta_diario() + '.lock'
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        archivo = open(ruta, 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                archivo.close()
+                return False
+        self.candado = archivo
+        logger.info('Proceso %s es el confirmador del diario de votos', os.getpid())
+        return True
+
+    def run(self):
+        while True:
+            _hay_entradas.wait(self.espera)
+            _hay_entradas.clear()
+            if not self.adquirir():
+                continue
+            close_old_connections()
+            try:
+                aplicadas, omitidas = drenar()
+                if aplicadas or omitidas:
+                    logger.info('Diario de votos: %s votos aplicados, %s omitidos', aplicadas, omitidas)
+            except Exception:
+                # El punto de control no avanzó: el lote se reintenta en la siguiente pasada
+                logger.exception('Error aplicando el diario de votos')
+            finally:
+                close_old_connections()
+
+def iniciar_confirmador():
+    """Arranca el hilo confirmador (una vez por proceso); el primer ciclo reproduce el diario pendiente"""
+    global _confirmador
+    with _candado_confirmador:
+        if _confirmador is None or not _confirmador.is_alive():
+            _confirmador = Confirmador()
+            _confirmador.start()
+            _hay_entradas.set()
+    return _confirmador
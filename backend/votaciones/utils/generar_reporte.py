@@ -1,3 +1,6 @@
+from ..routers import lectura_en_replica
+
+@lectura_en_replica()
 def generar_reporte_pdf(request):
     """Genera reporte PDF oficial e institucional con logo de la universidad"""
     from django.http import HttpResponse
@@ -0,0 +1,139 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+# Anchos (px) de las variantes responsivas y formatos a generar, del más al menos eficiente
+ANCHOS_VARIANTES = getattr(settings, 'VOTACION_IMAGEN_ANCHOS', (320, 640, 960))
+FORMATOS_VARIANTES = getattr(settings, 'VOTACION_IMAGEN_FORMATOS', ('avif', 'webp'))
+
+CALIDAD_FORMATO = {'avif': 55, 'webp': 78}
+# Opciones extra del codificador (AVIF es lento con la velocidad por defecto)
+OPCIONES_FORMATO = {'avif': {'speed': 8}, 'webp': {'method': 4}}
+TIPO_MIME = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+EXTENSIONES_PROCESABLES = ('.png', '.jpg', '.jpeg')
+
+# Miniaturas de tamaño fijo (caja máxima en px) que usan las plantillas del tarjetón
+TAMANOS_MINIATURA = getattr(settings, 'VOTACION_MINIATURAS', {'miniatura': (160, 160), 'tarjeton': (480, 360)})
+
+def formatos_disponibles():
+    """Formatos de FORMATOS_VARIANTES que el Pillow instalado puede codificar"""
+    from PIL import features
+    return [formato for formato in FORMATOS_VARIANTES if features.check(formato)]
+
+def huella_contenido(contenido):
+    """Hash corto (SHA-256) del contenido de un archivo, usado en los nombres de las variantes"""
+    return hashlib.sha256(contenido).hexdigest()[:12]
+
+def nombre_variante(nombre, ancho, formato, huella=None):
+    """Nombre de una variante junto al original: foto.<huella>.<ancho>w.<formato>"""
+    raiz, _ = os.path.splitext(nombre)
+    if huella:
+        return f'{raiz}.{huella}.{ancho}w.{formato}'
+    return f'{raiz}.{ancho}w.{formato}'
+
+def redimensionar(contenido, ancho, formato):
+    """Reduce la imagen al ancho indicado (sin ampliarla) y la codifica en el formato pedido"""
+    from PIL import Image
+
+    with Image.open(BytesIO(contenido)) as imagen:
+        imagen.load()
+        if imagen.mode not in ('RGB', 'RGBA'):
+            imagen = imagen.convert('RGBA' if 'transparency' in imagen.info else 'RGB')
+        if imagen.width > ancho:
+            alto = round(imagen.height * ancho / imagen.width)
+            imagen = imagen.resize((ancho, alto), Image.LANCZOS)
+        salida = BytesIO()
+        imagen.save(
+            salida,
+            format=formato.upper(),
+            quality=CALIDAD_FORMATO.get(formato, 80),
+            **OPCIONES_FORMATO.get(formato, {})
+        )
+        return salida.getvalue(), imagen.width
+
+def miniatura(contenido, caja, formato):
+    """Reduce la imagen para que quepa en la caja (ancho, alto) sin deformarla ni ampliarla"""
+    from PIL import Image
+
+    with Image.open(BytesIO(contenido)) as imagen:
+        imagen.load()
+        if imagen.mode not in ('RGB', 'RGBA'):
+            imagen = imagen.convert('RGBA' if 'transparency' in imagen.info else 'RGB')
+        imagen.thumbnail(caja, Image.LANCZOS)
+        salida = BytesIO()
+        imagen.save(
+            salida,
+            format=formato.upper(),
+            quality=CALIDAD_FORMATO.get(formato, 80),
+            **OPCIONES_FORMATO.get(formato, {})
+        )
+        return salida.getvalue()
+
+def _archivos_del_descriptor(descriptor):
+    nombres = [variante['nombre'] for variante in descriptor.get('variantes', [])]
+    nombres.extend(descriptor.get('miniaturas', {}).values())
+    return nombres
+
+def generar_variantes(storage, nombre, descriptor=None):
+    """Genera las variantes responsivas y las miniaturas de un archivo subido (media)
+
+    Los nombres incluyen la huella del contenido: si la huella coincide con la del
+    descriptor actual y sus archivos existen, no se regenera nada. Así la operación es
+    idempotente y las variantes pueden servirse con caché de larga duración.
+    Retorna el descriptor que se guarda en el modelo.
+    """
+    from PIL import Image
+
+    with storage.open(nombre, 'rb') as archivo:
+        contenido = archivo.read()
+    huella = huella_contenido(contenido)
+
+    descriptor = descriptor or {}
+    if (
+        descriptor.get('huella') == huella
+        and descriptor.get('origen') == nombre
+        and set(descriptor.get('miniaturas', {})) == set(TAMANOS_MINIATURA)
+        and all(storage.exists(archivo) for archivo in _archivos_del_descriptor(descriptor))
+    ):
+        return descriptor
+
+    with Image.open(BytesIO(contenido)) as imagen:
+        ancho_original = imagen.width
+
+    # Nunca ampliar: anchos mayores al original se reducen a uno solo del tamaño original
+    anchos = sorted({min(ancho, ancho_original) for ancho in ANCHOS_VARIANTES})
+    formatos = formatos_disponibles()
+
+    variantes = []
+    for formato in formatos:
+        for ancho in anchos:
+            destino = nombre_variante(nombre, ancho, formato, huella)
+            if not storage.exists(destino):
+                datos, _ = redimensionar(contenido, ancho, formato)
+                destino = storage.save(destino, ContentFile(datos))
+            variantes.append({'nombre': destino, 'ancho': ancho, 'formato': formato})
+
+    # Las miniaturas usan el formato más compacto disponible (o PNG si Pillow no tiene WebP/AVIF)
+    formato_miniatura = 'webp' if 'webp' in formatos else (formatos[0] if formatos else 'png')
+    miniaturas = {}
+    for tamano, caja in TAMANOS_MINIATURA.items():
+        raiz, _ = os.path.splitext(nombre)
+        destino = f'{raiz}.{huella}.{tamano}.{formato_miniatura}'
+        if not storage.exists(destino):
+            destino = storage.save(destino, ContentFile(miniatura(contenido, caja, formato_miniatura)))
+        miniaturas[tamano] = destino
+
+    return {'origen': nombre, 'huella': huella, 'variantes': variantes, 'miniaturas': miniaturas}
+
+def srcset_por_formato(storage, descriptor):
+    """Agrupa las variantes de un descriptor en {formato: 'url 320w, url 640w'}"""
+    grupos = {}
+    for variante in (descriptor or {}).get('variantes', []):
+        grupos.setdefault(variante['formato'], []).append(
+            f"{storage.url(variante['nombre'])} {variante['ancho']}w"
+        )
+    return {formato: ', '.join(entradas) for formato, entradas in grupos.items()}
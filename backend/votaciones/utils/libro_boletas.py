@@ -0,0 +1,248 @@
+"""Libro de boletas encadenado: escritura en la transacción del voto, exportación y verificación
+
+Cada boleta se guarda sin votante ni IP: plancha, consejo, tipo de persona y la franja
+horaria. Su huella es SHA-256(huella_anterior + contenido), con el contenido en un formato
+binario fijo; alterar, borrar o reordenar una entrada rompe la cadena desde ese punto.
+
+La transacción del voto deja la boleta en BoletaPendiente. Cuando llega la primera
+boleta de una franja posterior, las de las franjas ya cerradas se barajan y se
+encadenan juntas: la secuencia no sigue el orden de confirmación de los votos, así que
+ordenar el libro y Votante.fecha_voto no empareja boletas con votantes.
+
+La exportación usa registros de tamaño fijo para que el verificador recorra el archivo
+mapeado en memoria (mmap) en una sola pasada, recalculando cadena y conteos a la vez.
+"""
+import hashlib
+import mmap
+import random
+import struct
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+GENESIS = bytes(32)
+MAGIA = b'FESCLIB1'
+
+# Contenido encadenado: secuencia, plancha, consejo, tipo de persona, franja (epoch)
+CONTENIDO = struct.Struct('<QIIBq')
+# Registro exportado: contenido + huella binaria
+REGISTRO = struct.Struct('<QIIBq32s')
+CABECERA = struct.Struct('<8sQ32s')  # magia, cantidad de registros, huella final
+
+def tipos_persona():
+    from ..models import Votante
+    return [codigo for codigo, _ in Votante.TIPO_PERSONA_CHOICES]
+
+def franja_de(momento):
+    """Trunca la hora a VOTACION_LIBRO_FRANJA segundos (epoch)"""
+    ancho = getattr(settings, 'VOTACION_LIBRO_FRANJA', 15 * 60)
+    epoch = int(momento.timestamp())
+    return epoch - epoch % ancho
+
+def calcular_huella(anterior, secuencia, plancha_id, consejo_id, codigo_tipo, franja):
+    return hashlib.sha256(anterior + CONTENIDO.pack(secuencia, plancha_id, consejo_id, codigo_tipo, franja)).digest()
+
+_azar = random.SystemRandom()
+
+def anotar_boletas(boletas, momento=None):
+    """Guarda las boletas [(plancha_id, consejo_id, tipo_persona), ...] hasta que cierre su franja
+
+    Debe ejecutarse dentro de la transacción del voto. Antes encadena las boletas de las
+    franjas ya cerradas (cerrar_franjas), con la cabeza del libro bloqueada solo en ese caso.
+    """
+    from ..models import BoletaPendiente
+
+    if not boletas:
+        return []
+
+    franja = datetime.fromtimestamp(franja_de(momento or timezone.now()), tz=dt_timezone.utc)
+    cerrar_franjas(franja)
+    return BoletaPendiente.objects.bulk_create([
+        BoletaPendiente(plancha_id=plancha_id, tipo_consejo_id=consejo_id, tipo_persona=tipo_persona, franja=franja)
+        for plancha_id, consejo_id, tipo_persona in boletas
+    ])
+
+def cerrar_franjas(antes_de=None):
+    """Encadena, barajadas, las boletas pendientes de las franjas anteriores a `antes_de`
+
+    Por omisión, todas las franjas terminadas. Bloquea la cabeza del libro, de modo que
+    las cadenas de dos transacciones concurrentes nunca se bifurcan; retorna los
+    registros agregados.
+    """
+    from ..models import RegistroBoleta, CabezaLibroBoletas, BoletaPendiente
+
+    if antes_de is None:
+        antes_de = datetime.fromtimestamp(franja_de(timezone.now()), tz=dt_timezone.utc)
+    pendientes = BoletaPendiente.objects.filter(franja__lt=antes_de)
+    if not pendientes.exists():
+        return []
+
+    with transaction.atomic():
+        cabeza = CabezaLibroBoletas.bloquear()
+        # Releídas con la cabeza tomada: otra transacción pudo cerrarlas mientras se esperaba
+        filas = list(pendientes.values_list('id', 'plancha_id', 'tipo_consejo_id', 'tipo_persona', 'franja'))
+        _azar.shuffle(filas)
+        filas.sort(key=lambda fila: fila[4])  # estable: barajadas dentro de cada franja
+
+        codigos = {tipo: indice for indice, tipo in enumerate(tipos_persona())}
+        anterior = bytes.fromhex(cabeza.huella)
+        secuencia = cabeza.secuencia
+        registros = []
+        for _, plancha_id, consejo_id, tipo_persona, franja in filas:
+            secuencia += 1
+            anterior = calcular_huella(
+                anterior, secuencia, plancha_id, consejo_id, codigos[tipo_persona], int(franja.timestamp())
+            )
+            registros.append(RegistroBoleta(
+                secuencia=secuencia,
+                plancha_id=plancha_id,
+                tipo_consejo_id=consejo_id,
+                tipo_persona=tipo_persona,
+                franja=franja,
+                huella=anterior.hex(),
+            ))
+
+        RegistroBoleta.objects.bulk_create(registros, batch_size=1000)
+        CabezaLibroBoletas.objects.filter(pk=cabeza.pk).update(secuencia=secuencia, huella=anterior.hex())
+        BoletaPendiente.objects.filter(id__in=[fila[0] for fila in filas]).delete()
+    return registros
+
+def conteos_pendientes():
+    """Counter((plancha, consejo, tipo)) de las boletas que aún esperan su franja"""
+    from ..models import BoletaPendiente
+
+    return Counter({
+        (plancha_id, consejo_id, tipo_persona): cantidad
+        for plancha_id, consejo_id, tipo_persona, cantidad in BoletaPendiente.objects.values_list(
+            'plancha_id', 'tipo_consejo_id', 'tipo_persona'
+        ).annotate(cantidad=Count('id')).order_by()
+    })
+
+@contextmanager
+def lectura_consistente():
+    """Transacción de solo lectura en la que la exportación, la cabeza y los contadores ven el mismo estado
+
+    En PostgreSQL se pide REPEATABLE READ (con READ COMMITTED cada consulta vería los votos
+    confirmados entre una y otra); SQLite y MySQL ya leen de una sola instantánea dentro
+    de la transacción.
+    """
+    repetible = connection.vendor == 'postgresql' and not connection.in_atomic_block
+    with transaction.atomic():
+        if repetible:
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        yield
+
+def exportar(ruta, tamano_lote=5000):
+    """Escribe el libro en formato binario de registros fijos; retorna la cantidad exportada"""
+    from ..models import RegistroBoleta
+
+    codigos = {tipo: indice for indice, tipo in enumerate(tipos_persona())}
+    filas = RegistroBoleta.objects.order_by('secuencia').values_list(
+        'secuencia', 'plancha_id', 'tipo_consejo_id', 'tipo_persona', 'franja', 'huella'
+    ).iterator(chunk_size=tamano_lote)
+
+    cantidad = 0
+    ultima = GENESIS
+    with open(ruta, 'wb') as archivo:
+        archivo.write(CABECERA.pack(MAGIA, 0, GENESIS))
+        bloque = []
+        for secuencia, plancha_id, consejo_id, tipo_persona, franja, huella in filas:
+            ultima = bytes.fromhex(huella)
+            bloque.append(REGISTRO.pack(
+                secuencia, plancha_id, consejo_id, codigos[tipo_persona], int(franja.timestamp()), ultima
+            ))
+            if len(bloque) >= tamano_lote:
+                archivo.write(b''.join(bloque))
+                cantidad += len(bloque)
+                bloque = []
+        archivo.write(b''.join(bloque))
+        cantidad += len(bloque)
+
+        archivo.seek(0)
+        archivo.write(CABECERA.pack(MAGIA, cantidad, ultima))
+    return cantidad
+
+def verificar_archivo(ruta, maximo_errores=20):
+    """Recorre la exportación mapeada en memoria: recalcula la cadena y cuenta votos
+
+    Retorna {'registros', 'huella_final', 'conteos': Counter((plancha, consejo, tipo)), 'errores': [...]}.
+    """
+    tipos = tipos_persona()
+    conteos = Counter()
+    errores = []
+    tamano_contenido = CONTENIDO.size
+    tamano_registro = REGISTRO.size
+
+    with open(ruta, 'rb') as archivo, mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+        magia, declarados, huella_declarada = CABECERA.unpack_from(mapa, 0)
+        if magia != MAGIA:
+            raise ValueError(f'{ruta} no es una exportación del libro de boletas')
+
+        vista = memoryview(mapa)[CABECERA.size:]
+        if len(vista) % tamano_registro:
+            errores.append(f'Tamaño inválido: sobran {len(vista) % tamano_registro} bytes al final')
+            vista = vista[:len(vista) - len(vista) % tamano_registro]
+
+        sha256 = hashlib.sha256
+        anterior = GENESIS
+        esperada = 1
+        desplazamiento = 0
+        registros = 0
+        try:
+            for secuencia, plancha_id, consejo_id, codigo_tipo, _, huella in REGISTRO.iter_unpack(vista):
+                calculo = sha256(anterior)
+                calculo.update(vista[desplazamiento:desplazamiento + tamano_contenido])
+                if calculo.digest() != huella and len(errores) < maximo_errores:
+                    errores.append(f'Secuencia {secuencia}: la huella no coincide con la cadena')
+                if secuencia != esperada and len(errores) < maximo_errores:
+                    errores.append(f'Secuencia {secuencia}: se esperaba {esperada} (registro faltante o reordenado)')
+                if codigo_tipo < len(tipos):
+                    conteos[(plancha_id, consejo_id, tipos[codigo_tipo])] += 1
+                elif len(errores) < maximo_errores:
+                    errores.append(f'Secuencia {secuencia}: código de tipo de persona desconocido ({codigo_tipo})')
+                # Continuar con la huella guardada para señalar cada alteración por separado
+                anterior = huella
+                esperada = secuencia + 1
+                desplazamiento += tamano_registro
+                registros += 1
+        finally:
+            vista.release()
+
+    if registros != declarados:
+        errores.append(f'La cabecera declara {declarados} registros y el archivo tiene {registros}')
+    if anterior != huella_declarada:
+        errores.append('La huella final no coincide con la de la cabecera')
+
+    return {'registros': registros, 'huella_final': anterior.hex(), 'conteos': conteos, 'errores': errores}
+
+def leer_contadores():
+    """{(plancha, consejo, tipo): votos} de ResultadoVotacion, con los fragmentos sumados"""
+    from ..models import ResultadoVotacion
+    from .contadores import con_fragmentos
+
+    return {
+        (plancha_id, consejo_id, tipo_persona): cantidad
+        for plancha_id, consejo_id, tipo_persona, cantidad in con_fragmentos(ResultadoVotacion.objects.all()).values_list(
+            'plancha_id', 'tipo_consejo_id', 'tipo_persona', 'votos_totales'
+        )
+    }
+
+def comparar_resultados(conteos, contadores=None):
+    """Diferencias entre los conteos del libro y ResultadoVotacion: [(plancha, consejo, tipo, libro, contador)]
+
+    contadores debe leerse en la misma lectura_consistente que la exportación; por
+    omisión se leen ahora.
+    """
+    if contadores is None:
+        contadores = leer_contadores()
+    diferencias = []
+    for clave in sorted(set(contadores) | set(conteos)):
+        if contadores.get(clave, 0) != conteos.get(clave, 0):
+            diferencias.append((*clave, conteos.get(clave, 0), contadores.get(clave, 0)))
+    return diferencias
@@ -0,0 +1,22 @@
+"""Contadores de operación guardados en la caché (reintentos, abandonos, ...)
+
+Con una caché compartida los contadores suman los de todos los workers; con la caché
+local de cada proceso reflejan solo el worker que atiende la consulta.
+"""
+from django.core.cache import cache
+
+PREFIJO = 'votaciones:metricas:'
+
+def incrementar(nombre, cantidad=1):
+    clave = PREFIJO + nombre
+    try:
+        cache.incr(clave, cantidad)
+    except ValueError:
+        # Primera vez: add evita pisar el valor si otro proceso la creó entretanto
+        if not cache.add(clave, cantidad, timeout=None):
+            cache.incr(clave, cantidad)
+
+def leer(nombres):
+    """{nombre: valor} para los contadores pedidos (0 si aún no existen)"""
+    valores = cache.get_many([PREFIJO + nombre for nombre in nombres])
+    return {nombre: valores.get(PREFIJO + nombre, 0) for nombre in nombres}
@@ -0,0 +1,70 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .imagenes import generar_variantes
+from .tarjetones import invalidar_tarjetones
+
+logger = logging.getLogger('votaciones.miniaturas')
+
+_pool = None
+_pool_lock = threading.Lock()
+_pendientes = set()
+
+def _obtener_pool():
+    """Crea el pool de hilos bajo demanda (uno por proceso)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'VOTACION_MINIATURAS_HILOS', 2),
+                thread_name_prefix='miniaturas',
+            )
+        return _pool
+
+def procesar_imagen(modelo, pk, campo_imagen, campo_variantes):
+    """Genera variantes y miniaturas de la imagen de una instancia y guarda el descriptor"""
+    instancia = modelo.objects.filter(pk=pk).only(campo_imagen, campo_variantes).first()
+    if instancia is None:
+        return None
+
+    imagen = getattr(instancia, campo_imagen)
+    if not imagen:
+        return None
+
+    actual = getattr(instancia, campo_variantes) or {}
+    nuevo = generar_variantes(imagen.storage, imagen.name, actual)
+
+    if nuevo != actual:
+        # Solo actualizar si la imagen no cambió mientras se procesaba
+        modelo.objects.filter(pk=pk, **{campo_imagen: imagen.name}).update(**{campo_variantes: nuevo})
+        # update() no emite post_save: los tarjetones en caché deben ver el nuevo descriptor
+        invalidar_tarjetones()
+    return nuevo
+
+def _trabajo_en_hilo(modelo, pk, campo_imagen, campo_variantes):
+    """Ejecuta procesar_imagen en un hilo del pool con su propia conexión a la base de datos"""
+    close_old_connections()
+    try:
+        return procesar_imagen(modelo, pk, campo_imagen, campo_variantes)
+    except Exception:
+        logger.exception('Error generando miniaturas de %s %s', modelo.__name__, pk)
+        raise
+    finally:
+        close_old_connections()
+
+def encolar_imagen(modelo, pk, campo_imagen, campo_variantes):
+    """Programa el procesamiento de la imagen en segundo plano cuando la transacción confirme"""
+    def enviar():
+        futuro = _obtener_pool().submit(_trabajo_en_hilo, modelo, pk, campo_imagen, campo_variantes)
+        _pendientes.add(futuro)
+        futuro.add_done_callback(_pendientes.discard)
+
+    transaction.on_commit(enviar)
+
+def esperar_pendientes(timeout=None):
+    """Bloquea hasta que terminen los trabajos encolados (útil en comandos y pruebas)"""
+    return wait(list(_pendientes), timeout=timeout)
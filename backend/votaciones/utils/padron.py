@@ -0,0 +1,237 @@
+"""Índice compacto del padrón en memoria del proceso para las verificaciones de elegibilidad
+
+El tarjetón solo necesita saber si el votante existe, su tipo de persona, su tipo de
+votante y si ya votó. En lugar de leer la fila de Votante en cada render, cada proceso
+guarda el padrón en arreglos empaquetados (unos 18 bytes por votante):
+
+- documentos numéricos ordenados en un array('Q') (búsqueda binaria) y un dict aparte
+  para los pocos documentos no numéricos o con ceros a la izquierda;
+- ids en un array('q') paralelo;
+- tipo de persona y tipo de votante como códigos de un byte;
+- ya_voto como mapa de bits.
+
+Sincronización:
+- cada VOTACION_PADRON_REVISION segundos se leen las filas con updated_at reciente (el
+  índice que ya usa el feed del jurado) y se corrigen en el lugar: todas las escrituras
+  de votos (UPDATE condicional, lotes del jurado, diario diferido) actualizan updated_at.
+  Un documento nuevo o un cambio de tipo de persona reconstruye el índice;
+- el voto confirmado en este proceso se marca al instante (marcar_votado);
+- los borrados publican el tema 'padron' en el bus de invalidación, y el índice se
+  reconstruye al ver una versión distinta.
+
+ya_voto=True es definitivo para rechazar; un False desactualizado solo deja ver el
+tarjetón, porque el registro del voto lo decide el UPDATE condicional en la base.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import bus_invalidacion
+
+TIPOS_PERSONA = (None, 'estudiante', 'docente', 'graduado')
+TIPOS_VOTANTE = (None, 'presencial', 'virtual', 'hibrido')
+_CODIGO_PERSONA = {tipo: codigo for codigo, tipo in enumerate(TIPOS_PERSONA)}
+_CODIGO_VOTANTE = {tipo: codigo for codigo, tipo in enumerate(TIPOS_VOTANTE)}
+
+# Máximo de dígitos que caben en un entero sin signo de 64 bits
+_DIGITOS_MAXIMOS = 19
+
+CAMPOS = ('documento', 'id', 'tipo_persona', 'tipo_votante', 'ya_voto')
+
+class Entrada(namedtuple('Entrada', 'votante_id tipo_persona tipo_votante ya_voto')):
+    """Datos de elegibilidad de un votante"""
+    __slots__ = ()
+
+    def debe_votar_presencial(self):
+        return self.tipo_votante == 'presencial'
+
+def _clave_numerica(documento):
+    """Entero del documento si se puede recuperar igual desde el número; si no, None"""
+    if documento.isdigit() and len(documento) <= _DIGITOS_MAXIMOS and (documento == '0' or documento[0] != '0'):
+        return int(documento)
+    return None
+
+class IndicePadron:
+    """Padrón empaquetado: documento -> (id, tipo de persona, tipo de votante, ya votó)"""
+
+    def __init__(self, filas):
+        numericas = []
+        otras = []
+        for fila in filas:
+            clave = _clave_numerica(fila[0])
+            if clave is None:
+                otras.append(fila)
+            else:
+                numericas.append((clave,) + tuple(fila[1:]))
+        numericas.sort()
+
+        self.documentos = array('Q', (fila[0] for fila in numericas))
+        self.otros = {fila[0]: len(numericas) + posicion for posicion, fila in enumerate(otras)}
+        ordenadas = numericas + otras
+        self.ids = array('q', (fila[1] for fila in ordenadas))
+        self.tipos_persona = bytearray(_CODIGO_PERSONA.get(fila[2], 0) for fila in ordenadas)
+        self.tipos_votante = bytearray(_CODIGO_VOTANTE.get(fila[3], 0) for fila in ordenadas)
+        self.votaron = bytearray((len(ordenadas) + 7) // 8)
+        for posicion, fila in enumerate(ordenadas):
+            if fila[4]:
+                self.votaron[posicion >> 3] |= 1 << (posicion & 7)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def posicion(self, documento):
+        clave = _clave_numerica(documento)
+        if clave is None:
+            return self.otros.get(documento)
+        posicion = bisect_left(self.documentos, clave)
+        if posicion < len(self.documentos) and self.documentos[posicion] == clave:
+            return posicion
+        return None
+
+    def consultar(self, documento):
+        """Entrada del votante o None si el documento no está en el padrón"""
+        posicion = self.posicion(documento)
+        if posicion is None:
+            return None
+        return Entrada(
+            self.ids[posicion],
+            TIPOS_PERSONA[self.tipos_persona[posicion]],
+            TIPOS_VOTANTE[self.tipos_votante[posicion]],
+            bool(self.votaron[posicion >> 3] & (1 << (posicion & 7))),
+        )
+
+    def actualizar(self, documento, votante_id, tipo_persona, tipo_votante, ya_voto):
+        """Corrige una fila en el lugar; retorna False si el cambio exige reconstruir"""
+        posicion = self.posicion(documento)
+        if (posicion is None or self.ids[posicion] != votante_id
+                or TIPOS_PERSONA[self.tipos_persona[posicion]] != tipo_persona):
+            return False
+        self.tipos_votante[posicion] = _CODIGO_VOTANTE.get(tipo_votante, 0)
+        if ya_voto:
+            self.votaron[posicion >> 3] |= 1 << (posicion & 7)
+        else:
+            self.votaron[posicion >> 3] &= ~(1 << (posicion & 7)) & 0xFF
+        return True
+
+    def bytes_usados(self):
+        """Bytes de los arreglos empaquetados (sin el dict de documentos no numéricos)"""
+        return (
+            self.documentos.itemsize * len(self.documentos)
+            + self.ids.itemsize * len(self.ids)
+            + len(self.tipos_persona) + len(self.tipos_votante) + len(self.votaron)
+        )
+
+_indice = None
+_marca = None  # Hora de la última lectura del padrón (base de la siguiente revisión)
+_version = None
+_proxima_revision = 0.0
+_candado = threading.Lock()
+
+def activo():
+    return getattr(settings, 'VOTACION_PADRON_INDICE', True)
+
+def version_padron():
+    return bus_invalidacion.version('padron')
+
+def _filas(consulta):
+    # Sin el orden por nombre del modelo: la revisión debe recorrer el índice de updated_at
+    return consulta.order_by().values_list(*CAMPOS).iterator(chunk_size=5000)
+
+def construir():
+    """Lee el padrón completo y reemplaza el índice del proceso"""
+    from ..models import Votante
+    global _indice, _marca, _version
+    version = version_padron()
+    marca = timezone.now()
+    _indice = IndicePadron(_filas(Votante.objects.all()))
+    _marca, _version = marca, version
+    return _indice
+
+def _revisar():
+    """Aplica los cambios desde la última lectura, o reconstruye si hace falta"""
+    from ..models import Votante
+    global _marca
+    bus_invalidacion.revisar()
+    if _indice is None or version_padron() != _version:
+        construir()
+        return
+    # Margen para transacciones que confirmaron después de la lectura anterior
+    margen = timedelta(seconds=getattr(settings, 'VOTACION_PADRON_MARGEN', 5))
+    marca = timezone.now()
+    for fila in _filas(Votante.objects.filter(updated_at__gte=_marca - margen)):
+        if not _indice.actualizar(*fila):
+            construir()
+            return
+    _marca = marca
+
+def _revision_pendiente():
+    return _indice is None or time.monotonic() >= _proxima_revision
+
+def _refrescar(forzar=False):
+    global _proxima_revision
+    # Sin índice todos esperan la primera construcción; después, los demás hilos siguen
+    # con el índice vigente mientras uno lo revisa
+    if not _candado.acquire(blocking=_indice is None or forzar):
+        return
+    try:
+        if forzar or _revision_pendiente():
+            _revisar()
+            _proxima_revision = time.monotonic() + getattr(settings, 'VOTACION_PADRON_REVISION', 1)
+    finally:
+        _candado.release()
+
+def _desde_base(documento):
+    from ..models import Votante
+    fila = Votante.objects.filter(documento=documento).values_list(*CAMPOS[1:]).first()
+    return Entrada(*fila) if fila else None
+
+def _desactualizado(entrada, votante_id):
+    """El token nombra a un votante que el índice no tiene (o tiene con otro id)"""
+    return votante_id is not None and (entrada is None or entrada.votante_id != votante_id)
+
+def consultar(documento, votante_id=None):
+    """Entrada de elegibilidad del votante (None si no está en el padrón)
+
+    Con `votante_id` (el del token), un documento ausente o con otro id fuerza una
+    revisión antes de responder: el índice puede ir hasta un intervalo atrasado
+    respecto de un votante recién creado.
+    """
+    if not activo():
+        return _desde_base(documento)
+    if _revision_pendiente():
+        _refrescar()
+    entrada = _indice.consultar(documento)
+    if _desactualizado(entrada, votante_id):
+        _refrescar(forzar=True)
+        entrada = _indice.consultar(documento)
+    return entrada
+
+async def aconsultar(documento, votante_id=None):
+    """Variante async: solo sale del event loop cuando toca revisar el índice"""
+    if not activo():
+        return await sync_to_async(_desde_base)(documento)
+    if _revision_pendiente():
+        await sync_to_async(_refrescar)()
+    entrada = _indice.consultar(documento)
+    if _desactualizado(entrada, votante_id):
+        await sync_to_async(_refrescar)(forzar=True)
+        entrada = _indice.consultar(documento)
+    return entrada
+
+def marcar_votado(documento):
+    """Marca el voto en el índice de este proceso al confirmar la transacción"""
+    def marcar():
+        indice = _indice
+        if indice is not None:
+            posicion = indice.posicion(documento)
+            if posicion is not None:
+                indice.votaron[posicion >> 3] |= 1 << (posicion & 7)
+    transaction.on_commit(marcar)
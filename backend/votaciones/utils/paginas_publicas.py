@@ -0,0 +1,74 @@
+"""Validación HTTP (ETag / Last-Modified) de las páginas públicas anónimas
+
+Las páginas de ingreso y de agradecimiento solo cambian con un despliegue: sus
+validadores se derivan de las plantillas de la app y del manifiesto de estáticos
+(cuyos nombres con hash aparecen en el HTML). Un visitante que recarga recibe 304
+sin que se renderice la plantilla.
+
+Se responde la página completa cuando hay mensajes pendientes (el HTML los
+incluye) y, en el formulario de ingreso, cuando el navegador aún no tiene cookie
+CSRF: el token del formulario depende de ella, por eso también entra en su ETag.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+DIRECTORIO_PLANTILLAS = Path(__file__).resolve().parent.parent / 'templates'
+
+def _plantillas():
+    return sorted(ruta for ruta in DIRECTORIO_PLANTILLAS.rglob('*.html') if ruta.is_file())
+
+@lru_cache(maxsize=None)
+def version_publica():
+    """Huella del despliegue: contenido de las plantillas y manifiesto de estáticos (una vez por proceso)"""
+    huella = hashlib.sha1()
+    for ruta in _plantillas():
+        huella.update(str(ruta.relative_to(DIRECTORIO_PLANTILLAS)).encode())
+        huella.update(ruta.read_bytes())
+    # Sin manifiesto (DEBUG sin collectstatic) los estáticos se sirven sin hash
+    huella.update(str(getattr(staticfiles_storage, 'manifest_hash', '')).encode())
+    return huella.hexdigest()[:20]
+
+@lru_cache(maxsize=None)
+def ultima_modificacion_plantillas():
+    """Fecha de la plantilla modificada más recientemente (UTC)"""
+    marcas = [ruta.stat().st_mtime for ruta in _plantillas()]
+    return datetime.fromtimestamp(max(marcas, default=0), tz=timezone.utc)
+
+def _respuesta_fija(request):
+    """Indica si la respuesta a esta petición es la misma para cualquier visitante"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # len() carga los mensajes sin marcarlos como leídos
+    return len(get_messages(request)) == 0
+
+def etag_pagina_estatica(request, *args, **kwargs):
+    return version_publica() if _respuesta_fija(request) else None
+
+def modificacion_pagina_estatica(request, *args, **kwargs):
+    return ultima_modificacion_plantillas() if _respuesta_fija(request) else None
+
+def etag_formulario_ingreso(request, *args, **kwargs):
+    cookie_csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+    if not cookie_csrf or not _respuesta_fija(request):
+        return None
+    return hashlib.sha1(f'{version_publica()}:{cookie_csrf}'.encode()).hexdigest()[:20]
+
+def _validada(**validadores):
+    # private + no-cache: el navegador guarda la página y la revalida en cada visita
+    revalidar = cache_control(private=True, no_cache=True)
+    validar = condition(**validadores)
+    return lambda vista: revalidar(validar(vista))
+
+# Página sin contenido por visitante (agradecimiento)
+pagina_estatica = _validada(etag_func=etag_pagina_estatica, last_modified_func=modificacion_pagina_estatica)
+
+# Formulario de ingreso: solo ETag, porque también varía con la cookie CSRF
+formulario_ingreso = _validada(etag_func=etag_formulario_ingreso)
@@ -0,0 +1,119 @@
+"""Registro de los loggers votaciones.* sin E/S en el hilo de la petición
+
+El logger solo encola el registro (ManejadorEnCola, un QueueHandler); un QueueListener
+en un hilo de fondo arma el mensaje con sus argumentos (los %s se evalúan recién ahí),
+lo serializa como una línea JSON y lo escribe en el archivo rotativo y en la consola.
+
+Los datos del evento van como argumentos y en `extra`, no interpolados en el texto:
+
+    logger.warning('Voto duplicado desde %s', ip, extra={'ip': ip, 'documento': documento})
+
+Cada campo de `extra` aparece como clave propia de la línea JSON.
+
+El hilo se inicia en el primer registro de cada proceso: con gunicorn --preload el
+worker hereda el manejador del proceso maestro, pero no su hilo.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+# Atributos propios de LogRecord: lo demás viene de `extra`
+_ATRIBUTOS_REGISTRO = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON por registro: hora, nivel, logger, mensaje, campos extra y excepción"""
+
+    def format(self, record):
+        linea = {
+            'hora': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+            'proceso': record.process,
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_REGISTRO and not clave.startswith('_'):
+                linea[clave] = valor
+        if record.exc_info:
+            linea['excepcion'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            linea['excepcion'] = record.exc_text
+        if record.stack_info:
+            linea['pila'] = self.formatStack(record.stack_info)
+        return json.dumps(linea, ensure_ascii=False, default=str)
+
+class ManejadorEnCola(QueueHandler):
+    """QueueHandler con su propio QueueListener hacia un archivo rotativo y la consola
+
+    Pensado para LOGGING (dictConfig): los argumentos del constructor son claves del
+    manejador en settings.
+    """
+
+    def __init__(self, archivo=None, max_bytes=10 * 1024 * 1024, copias=5, consola=True):
+        super().__init__(queue.SimpleQueue())
+        self.archivo = archivo
+        self.max_bytes = max_bytes
+        self.copias = copias
+        self.consola = consola
+        self.destinos = []
+        self._escucha = None
+        self._pid = None
+        self._candado_inicio = threading.Lock()
+
+    def _crear_destinos(self):
+        destinos = []
+        if self.archivo:
+            # {pid} en el nombre da un archivo por worker: RotatingFileHandler no coordina
+            # la rotación entre procesos que escriben el mismo archivo
+            archivo = Path(str(self.archivo).format(pid=os.getpid()))
+            archivo.parent.mkdir(parents=True, exist_ok=True)
+            destinos.append(RotatingFileHandler(
+                archivo, maxBytes=self.max_bytes, backupCount=self.copias, encoding='utf-8', delay=True
+            ))
+        if self.consola:
+            destinos.append(logging.StreamHandler(sys.stderr))
+        for destino in destinos:
+            destino.setFormatter(FormateadorJSON())
+        return destinos
+
+    def _iniciar(self):
+        with self._candado_inicio:
+            if self._pid == os.getpid():
+                return
+            # Tras un fork el hilo del padre no existe: se descarta su escucha sin detenerla
+            # y el worker abre sus propios destinos
+            self.destinos = self._crear_destinos()
+            self._escucha = QueueListener(self.queue, *self.destinos, respect_handler_level=True)
+            self._escucha.start()
+            self._pid = os.getpid()
+            atexit.register(self.detener)
+
+    def prepare(self, record):
+        # Sin formatear aquí (QueueHandler lo haría en el hilo de la petición): el
+        # registro viaja con sus argumentos y el hilo de fondo los evalúa
+        return record
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._iniciar()
+        super().emit(record)
+
+    def detener(self):
+        """Vacía la cola y detiene el hilo de fondo (al salir del proceso)"""
+        if self._escucha is not None and self._pid == os.getpid():
+            self._escucha.stop()
+            self._escucha = None
+            self._pid = None
+
+    def close(self):
+        self.detener()
+        for destino in self.destinos:
+            destino.close()
+        super().close()
@@ -0,0 +1,89 @@
+"""Reintento de transacciones de escritura ante conflictos de bloqueo o serialización
+
+Los votos y las marcas del jurado compiten por las mismas filas (y en SQLite por la base
+completa). Un conflicto transitorio, como "database is locked" en SQLite o
+serialization_failure/deadlock en PostgreSQL, se resuelve repitiendo la transacción
+completa tras una espera aleatoria acotada (backoff exponencial con jitter completo), en
+lugar de mostrarle el error al votante. Los reintentos y los abandonos se cuentan en
+utils/metricas.py.
+"""
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import connection, DatabaseError
+
+from . import metricas
+
+logger = logging.getLogger('votaciones.reintentos')
+
+OPERACIONES = ('voto', 'jurado', 'voto_fisico')
+
+# SQLSTATE de PostgreSQL: serialization_failure, deadlock_detected, lock_not_available
+CODIGOS_POSTGRESQL = {'40001', '40P01', '55P03'}
+# MySQL/MariaDB: lock wait timeout, deadlock
+CODIGOS_MYSQL = {1205, 1213}
+MENSAJES_SQLITE = ('database is locked', 'database table is locked', 'database is busy')
+
+class ConflictoPersistente(Exception):
+    """La transacción siguió en conflicto después de agotar los reintentos"""
+
+def es_conflicto_transitorio(error, vendor=None):
+    """Indica si el error de base de datos se resuelve repitiendo la transacción"""
+    if not isinstance(error, DatabaseError):
+        return False
+    vendor = vendor or connection.vendor
+    causa = error.__cause__
+    if vendor == 'postgresql':
+        # psycopg2 expone pgcode; psycopg 3, sqlstate
+        codigo = getattr(causa, 'pgcode', None) or getattr(causa, 'sqlstate', None)
+        return codigo in CODIGOS_POSTGRESQL
+    if vendor == 'mysql':
+        return bool(getattr(causa, 'args', None)) and causa.args[0] in CODIGOS_MYSQL
+    if vendor == 'sqlite':
+        return any(mensaje in str(error).lower() for mensaje in MENSAJES_SQLITE)
+    return False
+
+def espera(intento):
+    """Segundos a esperar antes del reintento `intento` (1, 2, ...): jitter completo sobre 2^n"""
+    base = getattr(settings, 'VOTACION_REINTENTOS_BASE', 0.02)
+    tope = getattr(settings, 'VOTACION_REINTENTOS_TOPE', 0.5)
+    return random.uniform(0, min(tope, base * 2 ** intento))
+
+def reintentar_transaccion(operacion, funcion, *args, **kwargs):
+    """Ejecuta `funcion` (que abre su propia transacción) repitiéndola ante conflictos transitorios
+
+    Lanza ConflictoPersistente si el conflicto no se resuelve en VOTACION_REINTENTOS_MAXIMO
+    intentos. Dentro de una transacción externa no se reintenta: repetir solo el bloque
+    interno no libera los bloqueos que esa transacción ya tiene.
+    """
+    maximo = getattr(settings, 'VOTACION_REINTENTOS_MAXIMO', 5)
+    intento = 1
+    while True:
+        try:
+            resultado = funcion(*args, **kwargs)
+        except DatabaseError as error:
+            if connection.in_atomic_block or not es_conflicto_transitorio(error):
+                raise
+            if intento >= maximo:
+                metricas.incrementar(f'reintentos.{operacion}.abandonos')
+                logger.error('Transacción "%s" abandonada tras %s intentos: %s', operacion, intento, error)
+                raise ConflictoPersistente(str(error)) from error
+            metricas.incrementar(f'reintentos.{operacion}.reintentos')
+            logger.warning('Conflicto en "%s" (intento %s de %s): %s', operacion, intento, maximo, error)
+            time.sleep(espera(intento))
+            intento += 1
+            continue
+        if intento > 1:
+            metricas.incrementar(f'reintentos.{operacion}.recuperadas')
+        return resultado
+
+def resumen():
+    """{operación: {'reintentos', 'recuperadas', 'abandonos'}} según las métricas acumuladas"""
+    eventos = ('reintentos', 'recuperadas', 'abandonos')
+    valores = metricas.leer([f'reintentos.{operacion}.{evento}' for operacion in OPERACIONES for evento in eventos])
+    return {
+        operacion: {evento: valores[f'reintentos.{operacion}.{evento}'] for evento in eventos}
+        for operacion in OPERACIONES
+    }
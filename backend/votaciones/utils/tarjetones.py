@@ -0,0 +1,76 @@
+"""Caché en memoria del proceso de los tarjetones (planchas activas agrupadas por consejo)
+
+El tarjetón es igual para todos los votantes de un tipo de persona y casi nunca cambia
+durante la jornada; se arma una vez por proceso y se reutiliza hasta VOTACION_TARJETON_TTL
+segundos o hasta que un cambio en planchas, candidatos o consejos, hecho en cualquier
+worker, lo invalide (tema 'tarjetones' del bus de invalidación).
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from . import bus_invalidacion
+
+_tarjetones = {}
+_candado = threading.Lock()
+
+def _ttl():
+    return getattr(settings, 'VOTACION_TARJETON_TTL', 60)
+
+def _consulta(tipo_persona):
+    from ..models import Plancha
+    return Plancha.objects.filter(
+        tipo_persona=tipo_persona,
+        activa=True
+    ).select_related('tipo_consejo').prefetch_related('candidatos')
+
+def _vigente(tipo_persona):
+    entrada = _tarjetones.get(tipo_persona)
+    if entrada is not None and entrada[0] > time.monotonic():
+        return entrada[1]
+    return None
+
+def _guardar(tipo_persona, planchas_por_consejo):
+    with _candado:
+        _tarjetones[tipo_persona] = (time.monotonic() + _ttl(), planchas_por_consejo)
+    return planchas_por_consejo
+
+def planchas_por_consejo(tipo_persona):
+    """{TipoConsejo: [Plancha, ...]} del tarjetón, con candidatos precargados"""
+    vigente = _vigente(tipo_persona)
+    if vigente is not None:
+        return vigente
+
+    agrupadas = defaultdict(list)
+    for plancha in _consulta(tipo_persona):
+        agrupadas[plancha.tipo_consejo].append(plancha)
+    return _guardar(tipo_persona, dict(agrupadas))
+
+async def aplanchas_por_consejo(tipo_persona):
+    """Variante async de planchas_por_consejo (un acierto de caché no sale del event loop)"""
+    vigente = _vigente(tipo_persona)
+    if vigente is not None:
+        return vigente
+
+    agrupadas = defaultdict(list)
+    async for plancha in _consulta(tipo_persona):
+        agrupadas[plancha.tipo_consejo].append(plancha)
+    return _guardar(tipo_persona, dict(agrupadas))
+
+def invalidar_tarjetones(**kwargs):
+    """Receptor de señales: descarta los tarjetones de este proceso"""
+    with _candado:
+        _tarjetones.clear()
+
+bus_invalidacion.registrar('tarjetones', invalidar_tarjetones)
+
+@bus_invalidacion.cache_versionada('tarjetones')
+def opciones_voto(tipo_persona):
+    """(ids de consejos, ids de planchas del tipo de persona) que acepta el formulario del voto"""
+    from ..models import Plancha, TipoConsejo
+    return (
+        frozenset(TipoConsejo.objects.values_list('id', flat=True)),
+        frozenset(Plancha.objects.filter(tipo_persona=tipo_persona).values_list('id', flat=True)),
+    )
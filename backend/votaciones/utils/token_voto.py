@@ -0,0 +1,96 @@
+import secrets
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+
+# Cookie que transporta el token firmado del votante entre el ingreso y el voto
+COOKIE_TOKEN_VOTO = 'voto_token'
+
+SALT_TOKEN_VOTO = 'votaciones.token_voto'
+
+def duracion_token_voto():
+    """Segundos de validez del token de votación"""
+    return getattr(settings, 'VOTACION_TOKEN_MAX_AGE', 15 * 60)
+
+def _cache():
+    return caches[getattr(settings, 'VOTACION_TOKEN_CACHE', 'default')]
+
+def _clave(nonce):
+    return f'token_voto:{nonce}'
+
+def emitir_token_voto(votante):
+    """Firma (HMAC) el id del votante con un nonce de un solo uso
+
+    La firma no cifra: el contenido de la cookie se lee en el cliente. Por eso el token
+    lleva solo el id y el nonce, y el nombre, el tipo de persona y el documento quedan en
+    el servidor (caché VOTACION_TOKEN_CACHE, bajo el nonce y por la vida del token).
+    """
+    nonce = secrets.token_urlsafe(8)
+    _cache().set(
+        _clave(nonce), (votante.id, votante.nombre, votante.tipo_persona, votante.documento),
+        timeout=duracion_token_voto(),
+    )
+    return signing.dumps({'v': votante.id, 'r': nonce}, salt=SALT_TOKEN_VOTO, compress=True)
+
+def leer_token_voto(request):
+    """Valida el token de la petición y retorna {'votante_id', 'nonce'} o None si no es válido"""
+    token = request.COOKIES.get(COOKIE_TOKEN_VOTO)
+    if not token:
+        return None
+
+    try:
+        payload = signing.loads(token, salt=SALT_TOKEN_VOTO, max_age=duracion_token_voto())
+    except signing.BadSignature:
+        # Incluye SignatureExpired
+        return None
+
+    return {'votante_id': payload['v'], 'nonce': payload['r']}
+
+def _desde_base(votante_id):
+    from ..models import Votante
+    return Votante.objects.filter(id=votante_id).values_list('id', 'nombre', 'tipo_persona', 'documento').first()
+
+def _completar(datos, fila):
+    if fila is None or fila[0] != datos['votante_id']:
+        return None
+    return {**datos, 'votante_nombre': fila[1], 'votante_tipo': fila[2], 'votante_documento': fila[3]}
+
+def leer_datos_votante(request):
+    """leer_token_voto más nombre, tipo de persona y documento del votante (None si no es válido)
+
+    Salen de la caché escrita al emitir el token; si la entrada no está (expiró, o la
+    caché es de otro worker) se leen de la fila del votante.
+    """
+    datos = leer_token_voto(request)
+    if datos is None:
+        return None
+    return _completar(datos, _cache().get(_clave(datos['nonce'])) or _desde_base(datos['votante_id']))
+
+async def aleer_datos_votante(request):
+    """Variante async: solo sale del event loop si hay que leer la base"""
+    datos = leer_token_voto(request)
+    if datos is None:
+        return None
+    fila = _cache().get(_clave(datos['nonce']))
+    if fila is None:
+        fila = await sync_to_async(_desde_base)(datos['votante_id'])
+    return _completar(datos, fila)
+
+def adjuntar_token_voto(response, token, request):
+    """Entrega el token al navegador en una cookie de corta duración"""
+    response.set_cookie(
+        COOKIE_TOKEN_VOTO,
+        token,
+        max_age=duracion_token_voto(),
+        httponly=True,
+        secure=request.is_secure(),
+        samesite='Lax',
+    )
+    return response
+
+def retirar_token_voto(response):
+    """Elimina el token del navegador (tras votar o ante un acceso inválido)"""
+    response.delete_cookie(COOKIE_TOKEN_VOTO, samesite='Lax')
+    return response
@@ -0,0 +1,34 @@
+"""Contador de versión de los resultados
+
+Cada voto (virtual, físico o del diario diferido) incrementa la versión al confirmar su
+transacción. Las vistas de resultados guardan su contexto en caché bajo la versión actual:
+mientras no haya votos nuevos, una carga del dashboard es un acierto de caché.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+CLAVE_VERSION = 'votaciones:resultados:version'
+
+def version_resultados():
+    """Versión actual de los resultados"""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        _inicializar()
+        version = cache.get(CLAVE_VERSION, 0)
+    return version
+
+def _inicializar():
+    # Si la caché perdió la clave, arrancar desde la hora actual para no reutilizar versiones viejas
+    cache.add(CLAVE_VERSION, time.time_ns() // 1000, timeout=None)
+
+def _incrementar():
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        _inicializar()
+
+def resultados_cambiaron():
+    """Programa el incremento de versión para cuando confirme la transacción en curso"""
+    transaction.on_commit(_incrementar)
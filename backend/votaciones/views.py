@@ -1,15 +1,21 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
 from django.db import transaction
-from django.template.loader import get_template
-from django.contrib.admin.views.decorators import staff_member_required
-from collections import defaultdict
-from datetime import datetime
-import json
 
 from .forms import ValidacionIngresoForm
-from .models import Votante, Plancha, TipoConsejo, Voto, EstadisticaVotacion, ResultadoVotacion
+from .models import Votante, Voto
+from .utils import admision, auditoria, claves_envio, diario_votos, padron, tarjetones
+from .utils.contadores import incrementar
+from .utils.libro_boletas import anotar_boletas
+from .utils.paginas_publicas import formulario_ingreso, pagina_estatica
+from .utils.reintentos import reintentar_transaccion
+from .utils.version_resultados import resultados_cambiaron
+from .utils.token_voto import (
+    emitir_token_voto, leer_datos_votante, leer_token_voto, adjuntar_token_voto, retirar_token_voto,
+)
 
 def get_client_ip(request):
     """Obtiene la IP real del cliente"""
@@ -20,6 +26,17 @@ def get_client_ip(request):
         ip = request.META.get('REMOTE_ADDR')
     return ip
 
+def auditar_ingreso_presencial(request, documento):
+    """Log de seguridad y evento de auditoría del ingreso virtual de un votante presencial"""
+    import logging
+    ip = get_client_ip(request)
+    logging.getLogger('votaciones.seguridad').warning(
+        'Intento de acceso virtual bloqueado. Votante presencial: %s, IP: %s', documento, ip,
+        extra={'evento': 'presencial_virtual', 'ip': ip, 'documento': documento},
+    )
+    auditoria.registrar('presencial_virtual', ip, documento, request.path, 'Ingreso')
+
+@formulario_ingreso
 def index(request):
     """Vista principal con formulario de validación de ingreso"""
     if request.method == 'POST':
@@ -38,53 +55,53 @@ def index(request):
                         'Consulte con el personal electoral sobre la ubicación de las urnas.'
                     )
                     
-                    # Log de intento de acceso virtual por votante presencial
-                    import logging
-                    logger = logging.getLogger('votaciones.seguridad')
-                    logger.warning(
-                        f'Intento de acceso virtual bloqueado. Votante presencial: {votante.nombre} '
-                        f'({votante.documento}), Tipo: {votante.tipo_votante}, IP: {get_client_ip(request)}'
-                    )
+                    # Log y auditoría del intento de acceso virtual por votante presencial
+                    auditar_ingreso_presencial(request, votante.documento)
                     
                     # Retornar al formulario con el error
                     return render(request, 'votaciones/index.html', {'form': form})
                 
                 # Si llegó aquí, es un votante virtual válido
-                # Guardar datos del votante en la sesión
-                request.session['votante_id'] = votante.id
-                request.session['votante_nombre'] = votante.nombre
-                request.session['votante_tipo'] = votante.tipo_persona
-                request.session['votante_documento'] = votante.documento
+                # Entregar un token firmado con los datos del votante (sin escribir en la sesión)
+                token = emitir_token_voto(votante)
                 
                 messages.success(request, f'¡Bienvenido/a {votante.nombre}! Puede proceder a votar virtualmente.')
                 
                 # Redirigir según el tipo de persona
                 if votante.tipo_persona == 'estudiante':
-                    return redirect('votaciones:tarjeton_estudiantes')
+                    response = redirect('votaciones:tarjeton_estudiantes')
                 elif votante.tipo_persona == 'docente':
-                    return redirect('votaciones:tarjeton_docentes')
+                    response = redirect('votaciones:tarjeton_docentes')
                 elif votante.tipo_persona == 'graduado':
-                    return redirect('votaciones:tarjeton_graduados')
+                    response = redirect('votaciones:tarjeton_graduados')
                 else:
-                    return redirect('votaciones:tarjetones')
+                    response = redirect('votaciones:tarjetones')
+                
+                return adjuntar_token_voto(response, token, request)
                 
             except Exception as e:
+                if getattr(e, 'code', None) == 'presencial':
+                    auditar_ingreso_presencial(request, form.cleaned_data['documento'])
                 messages.error(request, str(e))
     else:
         form = ValidacionIngresoForm()
     
     return render(request, 'votaciones/index.html', {'form': form})
 
+@admision.con_admision
 def tarjeton_estudiantes(request):
     """Vista de tarjetón para estudiantes"""
-    if 'votante_id' not in request.session or request.session.get('votante_tipo') != 'estudiante':
+    datos_votante = leer_datos_votante(request)
+    if datos_votante is None or datos_votante['votante_tipo'] != 'estudiante':
         messages.error(request, 'Acceso no autorizado.')
         return redirect('votaciones:index')
     
     # NUEVA VALIDACIÓN: Verificar que el votante en sesión pueda votar virtualmente
     try:
-        votante_id = request.session['votante_id']
-        votante = get_object_or_404(Votante, id=votante_id)
+        # Índice del padrón en memoria (utils/padron.py): sin consulta a la base
+        votante = padron.consultar(datos_votante['votante_documento'], datos_votante['votante_id'])
+        if votante is None or votante.votante_id != datos_votante['votante_id']:
+            raise Votante.DoesNotExist
         
         if votante.debe_votar_presencial():
             messages.error(
@@ -92,49 +109,43 @@ def tarjeton_estudiantes(request):
                 'Su perfil está configurado para votación presencial. '
                 'No puede acceder al sistema virtual de votación.'
             )
-            request.session.flush()  # Limpiar sesión
-            return redirect('votaciones:index')
+            return retirar_token_voto(redirect('votaciones:index'))
             
         if votante.ya_voto:
             messages.error(request, 'Usted ya ha ejercido su derecho al voto.')
-            request.session.flush()
-            return redirect('votaciones:index')
+            return retirar_token_voto(redirect('votaciones:index'))
             
     except Exception as e:
         messages.error(request, 'Error validando acceso. Intente nuevamente.')
-        request.session.flush()
-        return redirect('votaciones:index')
-    
-    # Obtener planchas para estudiantes agrupadas por consejo
-    planchas = Plancha.objects.filter(
-        tipo_persona='estudiante',
-        activa=True
-    ).select_related('tipo_consejo').prefetch_related('candidatos')
+        return retirar_token_voto(redirect('votaciones:index'))
     
-    # Agrupar por tipo de consejo
-    planchas_por_consejo = defaultdict(list)
-    for plancha in planchas:
-        planchas_por_consejo[plancha.tipo_consejo].append(plancha)
+    # Planchas agrupadas por consejo (caché del proceso, ver utils/tarjetones.py)
+    planchas_por_consejo = tarjetones.planchas_por_consejo('estudiante')
     
     context = {
-        'votante_nombre': request.session['votante_nombre'],
+        'votante_nombre': datos_votante['votante_nombre'],
         'votante_tipo': 'Estudiante',
         'tipo_tarjeton': 'estudiantes',
-        'planchas_por_consejo': dict(planchas_por_consejo)
+        'planchas_por_consejo': planchas_por_consejo,
+        'clave_envio': datos_votante['nonce'],
     }
     
     return render(request, 'votaciones/tarjeton_estudiantes.html', context)
 
+@admision.con_admision
 def tarjeton_docentes(request):
     """Vista de tarjetón para docentes"""
-    if 'votante_id' not in request.session or request.session.get('votante_tipo') != 'docente':
+    datos_votante = leer_datos_votante(request)
+    if datos_votante is None or datos_votante['votante_tipo'] != 'docente':
         messages.error(request, 'Acceso no autorizado.')
         return redirect('votaciones:index')
     
     # NUEVA VALIDACIÓN: Verificar que el votante en sesión pueda votar virtualmente
     try:
-        votante_id = request.session['votante_id']
-        votante = get_object_or_404(Votante, id=votante_id)
+        # Índice del padrón en memoria (utils/padron.py): sin consulta a la base
+        votante = padron.consultar(datos_votante['votante_documento'], datos_votante['votante_id'])
+        if votante is None or votante.votante_id != datos_votante['votante_id']:
+            raise Votante.DoesNotExist
         
         if votante.debe_votar_presencial():
             messages.error(
@@ -142,49 +153,43 @@ def tarjeton_docentes(request):
                 'Su perfil está configurado para votación presencial. '
                 'No puede acceder al sistema virtual de votación.'
             )
-            request.session.flush()  # Limpiar sesión
-            return redirect('votaciones:index')
+            return retirar_token_voto(redirect('votaciones:index'))
             
         if votante.ya_voto:
             messages.error(request, 'Usted ya ha ejercido su derecho al voto.')
-            request.session.flush()
-            return redirect('votaciones:index')
+            return retirar_token_voto(redirect('votaciones:index'))
             
     except Exception as e:
         messages.error(request, 'Error validando acceso. Intente nuevamente.')
-        request.session.flush()
-        return redirect('votaciones:index')
-    
-    # Obtener planchas para docentes agrupadas por consejo
-    planchas = Plancha.objects.filter(
-        tipo_persona='docente',
-        activa=True
-    ).select_related('tipo_consejo').prefetch_related('candidatos')
+        return retirar_token_voto(redirect('votaciones:index'))
     
-    # Agrupar por tipo de consejo
-    planchas_por_consejo = defaultdict(list)
-    for plancha in planchas:
-        planchas_por_consejo[plancha.tipo_consejo].append(plancha)
+    # Planchas agrupadas por consejo (caché del proceso, ver utils/tarjetones.py)
+    planchas_por_consejo = tarjetones.planchas_por_consejo('docente')
     
     context = {
-        'votante_nombre': request.session['votante_nombre'],
+        'votante_nombre': datos_votante['votante_nombre'],
         'votante_tipo': 'Docente',
         'tipo_tarjeton': 'docentes',
-        'planchas_por_consejo': dict(planchas_por_consejo)
+        'planchas_por_consejo': planchas_por_consejo,
+        'clave_envio': datos_votante['nonce'],
     }
     
     return render(request, 'votaciones/tarjeton_docentes.html', context)
 
+@admision.con_admision
 def tarjeton_graduados(request):
     """Vista de tarjetón para graduados"""
-    if 'votante_id' not in request.session or request.session.get('votante_tipo') != 'graduado':
+    datos_votante = leer_datos_votante(request)
+    if datos_votante is None or datos_votante['votante_tipo'] != 'graduado':
         messages.error(request, 'Acceso no autorizado.')
         return redirect('votaciones:index')
     
     # NUEVA VALIDACIÓN: Verificar que el votante en sesión pueda votar virtualmente
     try:
-        votante_id = request.session['votante_id']
-        votante = get_object_or_404(Votante, id=votante_id)
+        # Índice del padrón en memoria (utils/padron.py): sin consulta a la base
+        votante = padron.consultar(datos_votante['votante_documento'], datos_votante['votante_id'])
+        if votante is None or votante.votante_id != datos_votante['votante_id']:
+            raise Votante.DoesNotExist
         
         if votante.debe_votar_presencial():
             messages.error(
@@ -192,428 +197,302 @@ def tarjeton_graduados(request):
                 'Su perfil está configurado para votación presencial. '
                 'No puede acceder al sistema virtual de votación.'
             )
-            request.session.flush()  # Limpiar sesión
-            return redirect('votaciones:index')
+            return retirar_token_voto(redirect('votaciones:index'))
             
         if votante.ya_voto:
             messages.error(request, 'Usted ya ha ejercido su derecho al voto.')
-            request.session.flush()
-            return redirect('votaciones:index')
+            return retirar_token_voto(redirect('votaciones:index'))
             
     except Exception as e:
         messages.error(request, 'Error validando acceso. Intente nuevamente.')
-        request.session.flush()
-        return redirect('votaciones:index')
+        return retirar_token_voto(redirect('votaciones:index'))
     
-    # Obtener planchas para graduados agrupadas por consejo
-    planchas = Plancha.objects.filter(
-        tipo_persona='graduado',
-        activa=True
-    ).select_related('tipo_consejo').prefetch_related('candidatos')
-    
-    # Agrupar por tipo de consejo
-    planchas_por_consejo = defaultdict(list)
-    for plancha in planchas:
-        planchas_por_consejo[plancha.tipo_consejo].append(plancha)
+    # Planchas agrupadas por consejo (caché del proceso, ver utils/tarjetones.py)
+    planchas_por_consejo = tarjetones.planchas_por_consejo('graduado')
     
     context = {
-        'votante_nombre': request.session['votante_nombre'],
+        'votante_nombre': datos_votante['votante_nombre'],
         'votante_tipo': 'Graduado',
         'tipo_tarjeton': 'graduados',
-        'planchas_por_consejo': dict(planchas_por_consejo)
+        'planchas_por_consejo': planchas_por_consejo,
+        'clave_envio': datos_votante['nonce'],
     }
     
     return render(request, 'votaciones/tarjeton_graduados.html', context)
 
 def procesar_voto(request):
     """Procesa el voto y marca al votante como votado"""
-    if 'votante_id' not in request.session:
+    datos_votante = leer_token_voto(request)
+    clave = claves_envio.clave_de(request, datos_votante) if request.method == 'POST' else None
+    # Reenvío de un voto ya registrado (aunque el token ya se haya retirado): misma respuesta, sin consultas
+    if clave and claves_envio.estado(clave) == claves_envio.COMPLETADA:
+        return claves_envio.respuesta_completada()
+    
+    if datos_votante is None:
         messages.error(request, 'Sesión expirada. Debe validar su ingreso nuevamente.')
-        return redirect('votaciones:index')
+        return retirar_token_voto(redirect('votaciones:index'))
     
     if request.method == 'POST':
-        votante_id = request.session['votante_id']
-        
+        cupo = None
+        if admision.cupos():
+            # Quien ya tiene el tarjetón no hace fila: espera un cupo unos segundos
+            cupo = admision.esperar_cupo(admision.espera_voto())
+            if cupo is None:
+                return admision.voto_a_la_sala(request)
         try:
-            with transaction.atomic():
-                votante = get_object_or_404(Votante, id=votante_id)
-                
-                if votante.ya_voto:
-                    messages.error(request, 'Usted ya ha ejercido su derecho al voto.')
-                    return redirect('votaciones:index')
-                
-                # Obtener IP del cliente
-                ip_cliente = get_client_ip(request)
-                
-                # NUEVA VALIDACIÓN: Verificar si es un votante presencial intentando votar virtualmente
-                if votante.debe_votar_presencial() and ip_cliente:
-                    messages.error(
-                        request, 
-                        'Su perfil está configurado para votación presencial. '
-                        'Debe dirigirse a las urnas físicas para ejercer su derecho al voto. '
-                        'No puede votar a través del sistema virtual.'
-                    )
-                    
-                    # Log de seguridad
-                    import logging
-                    logger = logging.getLogger('votaciones.seguridad')
-                    logger.warning(
-                        f'Intento de voto virtual por votante presencial. '
-                        f'Votante: {votante.nombre} ({votante.documento}), '
-                        f'Tipo configurado: {votante.tipo_votante}, IP: {ip_cliente}'
-                    )
-                    
-                    return redirect('votaciones:index')
-                
-                # Verificar si ya existe un voto desde esta IP (solo para votos virtuales)
-                if ip_cliente and Votante.verificar_ip_duplicada(ip_cliente):
-                    # Obtener información de los votantes previos desde esta IP
-                    votantes_previos = Votante.obtener_votantes_por_ip(ip_cliente)
-                    nombres_previos = [v.nombre for v in votantes_previos[:3]]  # Máximo 3 nombres
-                    
-                    if len(nombres_previos) == 1:
-                        mensaje_error = f'Ya se ha registrado un voto desde esta dirección IP por parte de: {nombres_previos[0]}. Por seguridad, no se permite votar desde la misma IP múltiples veces.'
-                    else:
-                        nombres_texto = ', '.join(nombres_previos[:-1]) + f' y {nombres_previos[-1]}'
-                        if len(votantes_previos) > 3:
-                            nombres_texto += f' (y {len(votantes_previos) - 3} más)'
-                        mensaje_error = f'Ya se han registrado votos desde esta dirección IP por parte de: {nombres_texto}. Por seguridad, no se permite votar desde la misma IP múltiples veces.'
-                    
-                    messages.error(request, mensaje_error)
-                    
-                    # Log de seguridad
-                    import logging
-                    logger = logging.getLogger('votaciones.seguridad')
-                    logger.warning(f'Intento de voto duplicado desde IP {ip_cliente}. Votante: {votante.nombre} ({votante.documento}). Votos previos: {len(votantes_previos)}')
-                    
-                    return redirect('votaciones:index')
-                
-                # Procesar votos por cada consejo
-                votos_procesados = 0
-                
-                for key, value in request.POST.items():
-                    if key.startswith('voto_'):
-                        consejo_id = key.split('_')[1]
-                        plancha_id = value
-                        
-                        try:
-                            consejo = get_object_or_404(TipoConsejo, id=consejo_id)
-                            plancha = get_object_or_404(Plancha, id=plancha_id, tipo_persona=votante.tipo_persona)
-                            
-                            # Verificar que no haya votado ya en este consejo
-                            if not Voto.objects.filter(votante=votante, tipo_consejo=consejo).exists():
-                                # Crear voto temporal
-                                voto = Voto.objects.create(
-                                    votante=votante,
-                                    plancha=plancha,
-                                    tipo_consejo=consejo,
-                                    ip_votacion=ip_cliente
-                                )
-                                
-                                # Registrar inmediatamente en ResultadoVotacion
-                                ResultadoVotacion.registrar_voto(
-                                    plancha=plancha,
-                                    tipo_consejo=consejo,
-                                    tipo_persona=votante.tipo_persona
-                                )
-                                
-                                # Marcar como contabilizado
-                                voto.contabilizado = True
-                                voto.save()
-                                
-                                votos_procesados += 1
-                        except Exception as e:
-                            messages.error(request, f'Error procesando voto para {consejo.nombre}: {str(e)}')
-                            return redirect('votaciones:index')
-                
-                if votos_procesados > 0:
-                    # Marcar votante como votado
-                    votante.marcar_como_votado(ip_cliente)
-                    
-                    # Limpiar sesión
-                    request.session.flush()
-                    
-                    # Log de voto exitoso
-                    import logging
-                    logger = logging.getLogger('votaciones.exito')
-                    tipo_voto = 'presencial' if ip_cliente is None else 'virtual'
-                    logger.info(f'Voto registrado exitosamente. Votante: {votante.nombre} ({votante.documento}), Tipo: {tipo_voto}, IP: {ip_cliente or "N/A"}, Votos procesados: {votos_procesados}')
-                    
-                    messages.success(request, f'¡Su voto ha sido registrado exitosamente! Se procesaron {votos_procesados} votos.')
-                    return redirect('votaciones:gracias')
-                else:
-                    messages.error(request, 'No se procesó ningún voto. Verifique su selección.')
-                    return redirect('votaciones:index')
-                    
-        except Exception as e:
-            # Log de error
-            import logging
-            logger = logging.getLogger('votaciones.error')
-            logger.error(f'Error procesando votación. Votante ID: {votante_id}, IP: {get_client_ip(request)}, Error: {str(e)}')
-            
-            messages.error(request, f'Error procesando la votación: {str(e)}')
-            return redirect('votaciones:index')
+            if clave:
+                return claves_envio.procesar_con_clave(clave, lambda: registrar_voto(request, datos_votante['votante_id']))
+            return registrar_voto(request, datos_votante['votante_id'])
+        finally:
+            if cupo:
+                admision.liberar_cupo(cupo)
     
     return redirect('votaciones:index')
 
-def gracias(request):
-    """Página de agradecimiento post-voto"""
-    return render(request, 'votaciones/gracias.html')
+def rechazar_voto(request, votante, ip_cliente):
+    """Validaciones previas al registro (perfil presencial, IP duplicada); retorna la respuesta de rechazo o None"""
+    # NUEVA VALIDACIÓN: Verificar si es un votante presencial intentando votar virtualmente
+    if votante.debe_votar_presencial() and ip_cliente:
+        messages.error(
+            request, 
+            'Su perfil está configurado para votación presencial. '
+            'Debe dirigirse a las urnas físicas para ejercer su derecho al voto. '
+            'No puede votar a través del sistema virtual.'
+        )
+
+        # Log de seguridad
+        import logging
+        logger = logging.getLogger('votaciones.seguridad')
+        logger.warning(
+            'Intento de voto virtual por votante presencial. Votante: %s (%s), Tipo configurado: %s, IP: %s',
+            votante.nombre, votante.documento, votante.tipo_votante, ip_cliente,
+            extra={'evento': 'presencial_virtual', 'ip': ip_cliente, 'documento': votante.documento},
+        )
+        auditoria.registrar('presencial_virtual', ip_cliente, votante.documento, request.path, 'Envío del voto')
+
+        return redirect('votaciones:index')
+
+    # Verificar si ya existe un voto desde esta IP (solo para votos virtuales)
+    if ip_cliente and Votante.verificar_ip_duplicada(ip_cliente):
+        # Obtener información de los votantes previos desde esta IP
+        votantes_previos = Votante.obtener_votantes_por_ip(ip_cliente)
+        nombres_previos = [v.nombre for v in votantes_previos[:3]]  # Máximo 3 nombres
+
+        if len(nombres_previos) == 1:
+            mensaje_error = f'Ya se ha registrado un voto desde esta dirección IP por parte de: {nombres_previos[0]}. Por seguridad, no se permite votar desde la misma IP múltiples veces.'
+        else:
+            nombres_texto = ', '.join(nombres_previos[:-1]) + f' y {nombres_previos[-1]}'
+            if len(votantes_previos) > 3:
+                nombres_texto += f' (y {len(votantes_previos) - 3} más)'
+            mensaje_error = f'Ya se han registrado votos desde esta dirección IP por parte de: {nombres_texto}. Por seguridad, no se permite votar desde la misma IP múltiples veces.'
+
+        messages.error(request, mensaje_error)
+
+        # Log de seguridad
+        import logging
+        logger = logging.getLogger('votaciones.seguridad')
+        logger.warning(
+            'Intento de voto duplicado desde IP %s. Votante: %s (%s). Votos previos: %s',
+            ip_cliente, votante.nombre, votante.documento, len(votantes_previos),
+            extra={'evento': 'ip_duplicada', 'ip': ip_cliente, 'documento': votante.documento},
+        )
+        auditoria.registrar(
+            'ip_duplicada', ip_cliente, votante.documento, request.path,
+            f'Votos previos desde la IP: {len(votantes_previos)}'
+        )
 
-def dashboard_electoral(request):
-    """Dashboard principal con métricas detalladas usando ResultadoVotacion"""
-    from django.db.models import Sum
+        return redirect('votaciones:index')
     
-    # Actualizar estadísticas
-    estadisticas = EstadisticaVotacion.actualizar_estadisticas()
+    return None
+
+def votos_seleccionados(request, votante):
+    """Votos válidos del formulario como [(consejo_id, plancha_id)] (solo lecturas)
+    
+    Se descartan los consejos inexistentes y las planchas de otro tipo de persona.
+    """
+    seleccion = {}
+    for key, value in request.POST.items():
+        if key.startswith('voto_'):
+            seleccion[key.split('_')[1]] = value
+    
+    # Consejos y planchas válidos en memoria del proceso, al día vía el bus de invalidación
+    consejos, planchas = tarjetones.opciones_voto(votante.tipo_persona)
+    try:
+        return [
+            (int(consejo_id), int(plancha_id)) for consejo_id, plancha_id in seleccion.items()
+            if int(consejo_id) in consejos and int(plancha_id) in planchas
+        ]
+    except ValueError:
+        return []
+
+def registrar_voto_diferido(request, votante_id):
+    """Valida el voto y lo anota en el diario de escritura diferida; el confirmador lo aplica después"""
+    votante = get_object_or_404(Votante, id=votante_id)
+    
+    if votante.ya_voto or diario_votos.esta_encolado(votante.id):
+        messages.error(request, 'Usted ya ha ejercido su derecho al voto.')
+        return retirar_token_voto(redirect('votaciones:index'))
+    
+    ip_cliente = get_client_ip(request)
+    rechazo = rechazar_voto(request, votante, ip_cliente)
+    if rechazo is not None:
+        return rechazo
+    if ip_cliente and diario_votos.ip_encolada(ip_cliente):
+        messages.error(
+            request,
+            'Ya se ha registrado un voto desde esta dirección IP. '
+            'Por seguridad, no se permite votar desde la misma IP múltiples veces.'
+        )
+        return redirect('votaciones:index')
     
-    # Obtener resultados detallados por categoría usando ResultadoVotacion
-    def obtener_resultados_por_categoria(tipo_persona):
-        consejos_data = []
-        consejos = TipoConsejo.objects.filter(activo=True)
-        
-        for consejo in consejos:
-            # Obtener resultados para este consejo y tipo de persona
-            resultados = ResultadoVotacion.obtener_resultados_por_consejo(consejo, tipo_persona)
-            
-            # Calcular total de votos para este consejo
-            total_votos = sum(r.cantidad_votos for r in resultados)
-            
-            # Preparar datos de planchas con porcentajes
-            planchas_data = []
-            for resultado in resultados:
-                porcentaje = (resultado.cantidad_votos / total_votos * 100) if total_votos > 0 else 0
-                planchas_data.append({
-                    'numero': resultado.plancha.numero,
-                    'nombre': resultado.plancha.nombre,
-                    'votos': resultado.cantidad_votos,
-                    'porcentaje': round(porcentaje, 1)
-                })
-            
-            consejos_data.append({
-                'nombre': consejo.nombre,
-                'total_votos': total_votos,
-                'planchas': planchas_data
-            })
-        
-        return consejos_data
-    
-    # Obtener datos por categoría
-    resultados_estudiantes = obtener_resultados_por_categoria('estudiante')
-    resultados_docentes = obtener_resultados_por_categoria('docente')
-    resultados_graduados = obtener_resultados_por_categoria('graduado')
-    
-    # Datos para gráficos usando ResultadoVotacion
-    votos_por_tipo = []
-    for tipo in ['estudiante', 'docente', 'graduado']:
-        total = ResultadoVotacion.objects.filter(tipo_persona=tipo).aggregate(
-            total=Sum('cantidad_votos')
-        )['total'] or 0
-        votos_por_tipo.append({
-            'votante__tipo_persona': tipo,
-            'total': total
-        })
-    
-    votos_por_consejo = []
-    consejos = TipoConsejo.objects.filter(activo=True)
-    for consejo in consejos:
-        total = ResultadoVotacion.objects.filter(tipo_consejo=consejo).aggregate(
-            total=Sum('cantidad_votos')
-        )['total'] or 0
-        votos_por_consejo.append({
-            'tipo_consejo__nombre': consejo.nombre,
-            'total': total
-        })
-    
-    votos_por_plancha = ResultadoVotacion.objects.select_related('plancha').values(
-        'plancha__numero', 'plancha__nombre', 'tipo_persona'
-    ).annotate(total=Sum('cantidad_votos')).order_by('-total')[:10]
+    votos = votos_seleccionados(request, votante)
+    if not votos:
+        messages.error(request, 'No se procesó ningún voto. Verifique su selección.')
+        return redirect('votaciones:index')
     
-    context = {
-        'estadisticas': estadisticas,
-        'resultados_estudiantes': resultados_estudiantes,
-        'resultados_docentes': resultados_docentes,
-        'resultados_graduados': resultados_graduados,
-        'votos_por_tipo': json.dumps(votos_por_tipo),
-        'votos_por_consejo': json.dumps(votos_por_consejo),
-        'votos_por_plancha': votos_por_plancha,
-    }
+    try:
+        recibo = diario_votos.anotar_voto(votante, ip_cliente, votos)
+    except diario_votos.VotoRechazado as e:
+        # Otro proceso anotó antes al votante o a la IP, o el tarjetón cambió: sin recibo
+        messages.error(request, str(e))
+        respuesta = redirect('votaciones:index')
+        return retirar_token_voto(respuesta) if e.ya_voto else respuesta
+    except OSError as e:
+        import logging
+        logging.getLogger('votaciones.error').error(
+            'No se pudo anotar el voto en el diario. Votante ID: %s, IP: %s, Error: %s', votante_id, ip_cliente, e,
+            extra={'ip': ip_cliente, 'votante_id': votante_id},
+        )
+        messages.error(request, 'Error procesando la votación. Intente nuevamente.')
+        return redirect('votaciones:index')
     
-    return render(request, 'admin/dashboard_electoral.html', context)
-
-@staff_member_required
-def generar_reporte_pdf(request):
-    """Genera reporte PDF usando ResultadoVotacion"""
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.lib import colors
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-    from django.conf import settings
-    from django.db.models import Count, Q
-    import os
-    
-    # Crear respuesta HTTP para PDF
-    response = HttpResponse(content_type='application/pdf')
-    fecha_actual = datetime.now().strftime("%Y%m%d_%H%M")
-    response['Content-Disposition'] = f'attachment; filename="reporte_electoral_fesc_{fecha_actual}.pdf"'
-    
-    # Crear documento PDF
-    doc = SimpleDocTemplate(response, pagesize=A4,
-                          rightMargin=72, leftMargin=72,
-                          topMargin=72, bottomMargin=18)
-    
-    # Contenedor para elementos del PDF
-    story = []
-    
-    # Estilos
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#b71c1c')
+    import logging
+    logging.getLogger('votaciones.exito').info(
+        'Voto anotado en el diario. Votante: %s (%s), IP: %s, Votos: %s, Recibo: %s',
+        votante.nombre, votante.documento, ip_cliente or 'N/A', len(votos), recibo,
+        extra={'ip': ip_cliente, 'documento': votante.documento},
     )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceAfter=12,
-        textColor=colors.HexColor('#b71c1c')
+    messages.success(
+        request,
+        f'¡Su voto ha sido registrado exitosamente! Se procesaron {len(votos)} votos. Recibo: {recibo[:12].upper()}'
     )
+    return retirar_token_voto(redirect('votaciones:gracias'))
+
+def confirmar_voto(votante, ip_cliente, votos):
+    """Transacción del voto; retorna False si otro envío ya había reclamado al votante"""
+    with transaction.atomic():
+        # Primera escritura: si otro envío ya reclamó al votante, no se escribe nada más
+        if not Votante.reclamar_voto(votante.id, ip_cliente):
+            return False
+        Voto.objects.bulk_create([
+            Voto(
+                votante_id=votante.id,
+                plancha_id=plancha_id,
+                tipo_consejo_id=consejo_id,
+                ip_votacion=ip_cliente,
+                contabilizado=True,
+            )
+            for consejo_id, plancha_id in votos
+        ])
+        boletas = [(plancha_id, consejo_id, votante.tipo_persona) for consejo_id, plancha_id in votos]
+        for plancha_id, consejo_id, tipo_persona in boletas:
+            incrementar(plancha_id, consejo_id, tipo_persona)
+        # Libro de boletas encadenado, en la misma transacción que los conteos
+        anotar_boletas(boletas)
+        resultados_cambiaron()
+        padron.marcar_votado(votante.documento)
+    return True
+
+def registrar_voto(request, votante_id):
+    """Valida y registra los votos del formulario (compartida con la vista async)
+    
+    Todas las validaciones son lecturas fuera de la transacción. La transacción empieza
+    reclamando al votante con un UPDATE condicional (ya_voto=false -> true): de dos
+    envíos simultáneos solo uno lo logra, y el otro no llega a escribir nada. Un conflicto
+    de bloqueo repite la transacción (utils/reintentos.py) en lugar de llegar al votante.
+    """
+    if settings.VOTACION_ESCRITURA_DIFERIDA:
+        return registrar_voto_diferido(request, votante_id)
+    
+    votante = get_object_or_404(Votante, id=votante_id)
+    if votante.ya_voto:
+        messages.error(request, 'Usted ya ha ejercido su derecho al voto.')
+        return retirar_token_voto(redirect('votaciones:index'))
+    
+    # Obtener IP del cliente
+    ip_cliente = get_client_ip(request)
+    
+    rechazo = rechazar_voto(request, votante, ip_cliente)
+    if rechazo is not None:
+        return rechazo
+    
+    votos = votos_seleccionados(request, votante)
+    if not votos:
+        messages.error(request, 'No se procesó ningún voto. Verifique su selección.')
+        return redirect('votaciones:index')
     
-    # Logo de la universidad (si existe)
-    logo_path = os.path.join(settings.STATIC_ROOT or settings.BASE_DIR / 'static', 'admin', 'logo.png')
-    if os.path.exists(logo_path):
-        try:
-            logo = Image(logo_path, width=2*inch, height=1*inch)
-            logo.hAlign = 'CENTER'
-            story.append(logo)
-            story.append(Spacer(1, 20))
-        except:
-            pass
-    
-    # Encabezado del reporte
-    story.append(Paragraph("FUNDACIÓN DE ESTUDIOS SUPERIORES COMFANORTE", title_style))
-    story.append(Paragraph("REPORTE ELECTORAL OFICIAL", title_style))
-    story.append(Spacer(1, 20))
-    
-    # Información general
-    estadisticas = EstadisticaVotacion.actualizar_estadisticas()
-    fecha_reporte = datetime.now().strftime("%d de %B de %Y a las %H:%M")
-    
-    info_data = [
-        ['Fecha del reporte:', fecha_reporte],
-        ['Total votantes registrados:', str(estadisticas.total_votantes)],
-        ['Total votos emitidos:', str(estadisticas.total_votos_emitidos)],
-        ['Porcentaje de participación:', f"{estadisticas.porcentaje_participacion:.1f}%"],
-    ]
-    
-    info_table = Table(info_data, colWidths=[3*inch, 2*inch])
-    info_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    story.append(info_table)
-    story.append(Spacer(1, 30))
-    
-    # Función para agregar resultados por categoría usando ResultadoVotacion
-    def agregar_categoria_al_reporte(titulo, tipo_persona, icono=""):
-        story.append(Paragraph(f"{icono} {titulo.upper()}", heading_style))
-        
-        consejos = TipoConsejo.objects.filter(activo=True)
-        
-        for consejo in consejos:
-            story.append(Paragraph(f"<b>{consejo.nombre}</b>", styles['Heading3']))
-            
-            # Obtener resultados para este consejo
-            resultados = ResultadoVotacion.obtener_resultados_por_consejo(consejo, tipo_persona)
-            
-            if resultados:
-                total_votos = sum(r.cantidad_votos for r in resultados)
-                
-                # Crear tabla con resultados
-                plancha_data = [['Plancha', 'Nombre', 'Votos', 'Porcentaje']]
-                
-                for i, resultado in enumerate(resultados):
-                    porcentaje = (resultado.cantidad_votos / total_votos * 100) if total_votos > 0 else 0
-                    ganador = " 👑" if i == 0 and resultado.cantidad_votos > 0 else ""
-                    plancha_data.append([
-                        f"#{resultado.plancha.numero}{ganador}",
-                        resultado.plancha.nombre,
-                        str(resultado.cantidad_votos),
-                        f"{porcentaje:.1f}%"
-                    ])
-                
-                plancha_table = Table(plancha_data, colWidths=[1*inch, 2.5*inch, 0.8*inch, 0.8*inch])
-                plancha_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#b71c1c')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 9),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                story.append(plancha_table)
-                story.append(Paragraph(f"<i>Total votos: {total_votos}</i>", styles['Normal']))
-            else:
-                story.append(Paragraph("Sin votos registrados", styles['Normal']))
-            
-            story.append(Spacer(1, 15))
+    try:
+        reclamado = reintentar_transaccion('voto', confirmar_voto, votante, ip_cliente, votos)
+    except Exception as e:
+        # Log de error (el detalle técnico no se muestra al votante)
+        import logging
+        logger = logging.getLogger('votaciones.error')
+        logger.error(
+            'Error procesando votación. Votante ID: %s, IP: %s, Error: %s', votante_id, ip_cliente, e,
+            extra={'ip': ip_cliente, 'votante_id': votante_id},
+        )
         
-        story.append(Spacer(1, 20))
-    
-    # Agregar secciones por categoría
-    agregar_categoria_al_reporte("Resultados Estudiantes", "estudiante", "🎓")
-    agregar_categoria_al_reporte("Resultados Docentes", "docente", "👨‍🏫")
-    agregar_categoria_al_reporte("Resultados Graduados", "graduado", "👨‍🎓")
-    
-    # Pie de página
-    story.append(Spacer(1, 30))
-    story.append(Paragraph(
-        "Este reporte fue generado automáticamente por el Sistema Electoral FESC",
-        ParagraphStyle('Footer', parent=styles['Normal'], alignment=TA_CENTER, fontSize=8, textColor=colors.grey)
-    ))
-    
-    # Construir PDF
-    doc.build(story)
-    return response
+        messages.error(request, 'Error procesando la votación. Intente nuevamente en unos segundos.')
+        return redirect('votaciones:index')
+    
+    if not reclamado:
+        messages.error(request, 'Usted ya ha ejercido su derecho al voto.')
+        return retirar_token_voto(redirect('votaciones:index'))
+    
+    # Log de voto exitoso
+    import logging
+    logger = logging.getLogger('votaciones.exito')
+    tipo_voto = 'presencial' if ip_cliente is None else 'virtual'
+    logger.info(
+        'Voto registrado exitosamente. Votante: %s (%s), Tipo: %s, IP: %s, Votos procesados: %s',
+        votante.nombre, votante.documento, tipo_voto, ip_cliente or 'N/A', len(votos),
+        extra={'ip': ip_cliente, 'documento': votante.documento},
+    )
+    
+    messages.success(request, f'¡Su voto ha sido registrado exitosamente! Se procesaron {len(votos)} votos.')
+    
+    # Retirar el token: un reenvío posterior ya no pasa la validación de ya_voto
+    return retirar_token_voto(redirect('votaciones:gracias'))
 
-@staff_member_required
-def estadisticas_json(request):
-    """API endpoint para actualización de estadísticas en tiempo real"""
-    from django.db.models import Sum
-    
-    estadisticas = EstadisticaVotacion.actualizar_estadisticas()
-    
-    # Datos para gráficos actualizados usando ResultadoVotacion
-    votos_por_tipo = []
-    for tipo in ['estudiante', 'docente', 'graduado']:
-        total = ResultadoVotacion.objects.filter(tipo_persona=tipo).aggregate(
-            total=Sum('cantidad_votos')
-        )['total'] or 0
-        votos_por_tipo.append({
-            'votante__tipo_persona': tipo,
-            'total': total
-        })
-    
-    data = {
-        'total_votantes': estadisticas.total_votantes,
-        'total_votos': estadisticas.total_votos_emitidos,
-        'porcentaje_participacion': float(estadisticas.porcentaje_participacion),
-        'votos_estudiantes': estadisticas.votos_estudiantes,
-        'votos_docentes': estadisticas.votos_docentes,
-        'votos_graduados': estadisticas.votos_graduados,
-        'ultima_actualizacion': estadisticas.ultima_actualizacion.isoformat(),
-        'votos_por_tipo': votos_por_tipo,
-    }
+@pagina_estatica
+def gracias(request):
+    """Página de agradecimiento post-voto"""
+    return render(request, 'votaciones/gracias.html')
+
+@never_cache
+def sala_espera(request):
+    """Sala de espera virtual: muestra la posición en la fila hasta que llega el turno"""
+    siguiente = admision.destino(request, request.GET.get('siguiente'))
+    turno = admision.turno_de(request)
+    if turno is None:
+        return redirect(siguiente)
+    
+    estado = admision.consultar_turno(turno)
+    if estado['admitido']:
+        return redirect(siguiente)
     
-    return JsonResponse(data)
+    context = {
+        'posicion': estado['posicion'],
+        'siguiente': siguiente,
+        'sondeo_ms': int(settings.VOTACION_ADMISION_SONDEO * 1000),
+    }
+    return render(request, 'votaciones/sala_espera.html', context)
+
+@never_cache
+def turno(request):
+    """Estado del turno para el sondeo de la sala de espera (solo caché, sin base de datos)"""
+    numero = admision.turno_de(request)
+    if numero is None:
+        # Sin turno vigente el tarjetón decide de nuevo al volver
+        return JsonResponse({'admitido': True, 'posicion': 0})
+    return JsonResponse(admision.consultar_turno(numero))
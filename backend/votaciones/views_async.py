@@ -0,0 +1,151 @@
+"""Variantes asíncronas del flujo de votación para el despliegue ASGI (VOTACION_MODO_ASGI)
+
+Las lecturas usan el ORM async; el registro del voto reutiliza views.registrar_voto
+dentro de sync_to_async porque necesita transaction.atomic().
+"""
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.shortcuts import render, redirect
+
+from .forms import ValidacionIngresoForm
+from .models import Votante
+from .utils import admision, claves_envio, padron, tarjetones
+from .utils.paginas_publicas import formulario_ingreso, pagina_estatica
+from .utils.token_voto import (
+    emitir_token_voto, aleer_datos_votante, leer_token_voto, adjuntar_token_voto, retirar_token_voto,
+)
+from .views import auditar_ingreso_presencial, registrar_voto
+
+# tipo_persona -> (etiqueta, tipo_tarjeton, plantilla, nombre de la URL)
+TARJETONES = {
+    'estudiante': ('Estudiante', 'estudiantes', 'votaciones/tarjeton_estudiantes.html', 'votaciones:tarjeton_estudiantes'),
+    'docente': ('Docente', 'docentes', 'votaciones/tarjeton_docentes.html', 'votaciones:tarjeton_docentes'),
+    'graduado': ('Graduado', 'graduados', 'votaciones/tarjeton_graduados.html', 'votaciones:tarjeton_graduados'),
+}
+
+@formulario_ingreso
+async def index(request):
+    """Vista principal con formulario de validación de ingreso (async)"""
+    if request.method == 'POST':
+        form = ValidacionIngresoForm(request.POST)
+        if form.is_valid():
+            try:
+                votante = await form.avalidar_votante()
+
+                if votante.debe_votar_presencial():
+                    messages.error(
+                        request,
+                        f'Estimado/a {votante.nombre}, su perfil está configurado para votación PRESENCIAL. '
+                        'Debe dirigirse a las urnas físicas habilitadas en la institución para ejercer su derecho al voto. '
+                        'NO puede votar a través de este sistema virtual. '
+                        'Consulte con el personal electoral sobre la ubicación de las urnas.'
+                    )
+                    auditar_ingreso_presencial(request, votante.documento)
+                    return render(request, 'votaciones/index.html', {'form': form})
+
+                token = emitir_token_voto(votante)
+                messages.success(request, f'¡Bienvenido/a {votante.nombre}! Puede proceder a votar virtualmente.')
+
+                if votante.tipo_persona in TARJETONES:
+                    response = redirect(TARJETONES[votante.tipo_persona][3])
+                else:
+                    response = redirect('votaciones:tarjetones')
+
+                return adjuntar_token_voto(response, token, request)
+
+            except Exception as e:
+                if getattr(e, 'code', None) == 'presencial':
+                    auditar_ingreso_presencial(request, form.cleaned_data['documento'])
+                messages.error(request, str(e))
+    else:
+        form = ValidacionIngresoForm()
+
+    return render(request, 'votaciones/index.html', {'form': form})
+
+@admision.con_admision
+async def tarjeton(request, tipo_persona):
+    """Vista de tarjetón para cualquier tipo de persona (async)"""
+    etiqueta, tipo_tarjeton, plantilla, _ = TARJETONES[tipo_persona]
+
+    datos_votante = await aleer_datos_votante(request)
+    if datos_votante is None or datos_votante['votante_tipo'] != tipo_persona:
+        messages.error(request, 'Acceso no autorizado.')
+        return redirect('votaciones:index')
+
+    try:
+        votante = await padron.aconsultar(datos_votante['votante_documento'], datos_votante['votante_id'])
+        if votante is None or votante.votante_id != datos_votante['votante_id']:
+            raise Votante.DoesNotExist
+
+        if votante.debe_votar_presencial():
+            messages.error(
+                request,
+                'Su perfil está configurado para votación presencial. '
+                'No puede acceder al sistema virtual de votación.'
+            )
+            return retirar_token_voto(redirect('votaciones:index'))
+
+        if votante.ya_voto:
+            messages.error(request, 'Usted ya ha ejercido su derecho al voto.')
+            return retirar_token_voto(redirect('votaciones:index'))
+
+    except Exception:
+        messages.error(request, 'Error validando acceso. Intente nuevamente.')
+        return retirar_token_voto(redirect('votaciones:index'))
+
+    # Ya evaluado (con sus prefetch) antes de renderizar: la plantilla es síncrona
+    planchas_por_consejo = await tarjetones.aplanchas_por_consejo(tipo_persona)
+
+    context = {
+        'votante_nombre': datos_votante['votante_nombre'],
+        'votante_tipo': etiqueta,
+        'tipo_tarjeton': tipo_tarjeton,
+        'planchas_por_consejo': planchas_por_consejo,
+        'clave_envio': datos_votante['nonce'],
+    }
+
+    return render(request, plantilla, context)
+
+async def tarjeton_estudiantes(request):
+    return await tarjeton(request, 'estudiante')
+
+async def tarjeton_docentes(request):
+    return await tarjeton(request, 'docente')
+
+async def tarjeton_graduados(request):
+    return await tarjeton(request, 'graduado')
+
+async def procesar_voto(request):
+    """Procesa el voto (async); la transacción corre en el hilo de BD vía sync_to_async"""
+    datos_votante = leer_token_voto(request)
+    clave = claves_envio.clave_de(request, datos_votante) if request.method == 'POST' else None
+    if clave and claves_envio.estado(clave) == claves_envio.COMPLETADA:
+        return claves_envio.respuesta_completada()
+
+    if datos_votante is None:
+        messages.error(request, 'Sesión expirada. Debe validar su ingreso nuevamente.')
+        return retirar_token_voto(redirect('votaciones:index'))
+
+    if request.method == 'POST':
+        cupo = None
+        if admision.cupos():
+            # La espera del cupo ocurre aquí y no en el hilo de BD de sync_to_async
+            cupo = await admision.aesperar_cupo(admision.espera_voto())
+            if cupo is None:
+                return admision.voto_a_la_sala(request)
+        try:
+            if clave:
+                return await sync_to_async(claves_envio.procesar_con_clave)(
+                    clave, lambda: registrar_voto(request, datos_votante['votante_id'])
+                )
+            return await sync_to_async(registrar_voto)(request, datos_votante['votante_id'])
+        finally:
+            if cupo:
+                admision.liberar_cupo(cupo)
+
+    return redirect('votaciones:index')
+
+@pagina_estatica
+async def gracias(request):
+    """Página de agradecimiento post-voto (async)"""
+    return render(request, 'votaciones/gracias.html')
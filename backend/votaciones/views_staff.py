@@ -0,0 +1,255 @@
+"""Vistas del staff: dashboard electoral, reporte PDF y estadísticas en JSON
+
+Separadas de views.py para que los workers públicos (VOTACION_PERFIL_WORKER=publico)
+no importen el admin ni los reportes.
+"""
+from django.shortcuts import render
+from django.http import HttpResponse, JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from django.db.models import Count, Max
+from django.utils import timezone
+from datetime import datetime, timedelta
+
+from .models import TipoConsejo, EstadisticaVotacion, ResultadoVotacion, EventoAuditoria
+from . import cache as cache_instrumentada
+from .routers import lectura_en_replica
+from .utils import admision, auditoria, metricas, reintentos
+from .utils.dashboard import contexto_dashboard, etag_estadisticas
+
+@staff_member_required
+@lectura_en_replica()
+def dashboard_electoral(request):
+    """Dashboard principal con métricas detalladas usando ResultadoVotacion"""
+    # Contexto de una sola pasada, cacheado mientras no cambie la versión de resultados
+    context = {
+        **contexto_dashboard(),
+        # Fuera del contexto cacheado: los contadores cambian con cada consulta
+        'estadisticas_cache': cache_instrumentada.estadisticas(),
+        'title': 'Dashboard Electoral FESC',
+        'opts': {'app_label': 'votaciones'},
+        'has_permission': True,
+    }
+    return render(request, 'admin/dashboard_electoral.html', context)
+
+@staff_member_required
+@lectura_en_replica()
+def generar_reporte_pdf(request):
+    """Genera reporte PDF usando ResultadoVotacion"""
+    from reportlab.lib.pagesizes import letter, A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+    from django.conf import settings
+    from django.db.models import Count, Q
+    import os
+    
+    # Crear respuesta HTTP para PDF
+    response = HttpResponse(content_type='application/pdf')
+    fecha_actual = datetime.now().strftime("%Y%m%d_%H%M")
+    response['Content-Disposition'] = f'attachment; filename="reporte_electoral_fesc_{fecha_actual}.pdf"'
+    
+    # Crear documento PDF
+    doc = SimpleDocTemplate(response, pagesize=A4,
+                          rightMargin=72, leftMargin=72,
+                          topMargin=72, bottomMargin=18)
+    
+    # Contenedor para elementos del PDF
+    story = []
+    
+    # Estilos
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#b71c1c')
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12,
+        textColor=colors.HexColor('#b71c1c')
+    )
+    
+    # Logo de la universidad (si existe)
+    logo_path = os.path.join(settings.STATIC_ROOT or settings.BASE_DIR / 'static', 'admin', 'logo.png')
+    if os.path.exists(logo_path):
+        try:
+            logo = Image(logo_path, width=2*inch, height=1*inch)
+            logo.hAlign = 'CENTER'
+            story.append(logo)
+            story.append(Spacer(1, 20))
+        except:
+            pass
+    
+    # Encabezado del reporte
+    story.append(Paragraph("FUNDACIÓN DE ESTUDIOS SUPERIORES COMFANORTE", title_style))
+    story.append(Paragraph("REPORTE ELECTORAL OFICIAL", title_style))
+    story.append(Spacer(1, 20))
+    
+    # Información general
+    estadisticas = EstadisticaVotacion.actualizar_estadisticas()
+    fecha_reporte = datetime.now().strftime("%d de %B de %Y a las %H:%M")
+    
+    info_data = [
+        ['Fecha del reporte:', fecha_reporte],
+        ['Total votantes registrados:', str(estadisticas.total_votantes)],
+        ['Total votos emitidos:', str(estadisticas.total_votos_emitidos)],
+        ['Porcentaje de participación:', f"{estadisticas.porcentaje_participacion:.1f}%"],
+    ]
+    
+    info_table = Table(info_data, colWidths=[3*inch, 2*inch])
+    info_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ]))
+    story.append(info_table)
+    story.append(Spacer(1, 30))
+    
+    # Función para agregar resultados por categoría usando ResultadoVotacion
+    def agregar_categoria_al_reporte(titulo, tipo_persona, icono=""):
+        story.append(Paragraph(f"{icono} {titulo.upper()}", heading_style))
+        
+        consejos = TipoConsejo.objects.filter(activo=True)
+        
+        for consejo in consejos:
+            story.append(Paragraph(f"<b>{consejo.nombre}</b>", styles['Heading3']))
+            
+            # Obtener resultados para este consejo
+            resultados = ResultadoVotacion.obtener_resultados_por_consejo(consejo, tipo_persona)
+            
+            if resultados:
+                total_votos = sum(r.cantidad_votos for r in resultados)
+                
+                # Crear tabla con resultados
+                plancha_data = [['Plancha', 'Nombre', 'Votos', 'Porcentaje']]
+                
+                for i, resultado in enumerate(resultados):
+                    porcentaje = (resultado.cantidad_votos / total_votos * 100) if total_votos > 0 else 0
+                    ganador = " 👑" if i == 0 and resultado.cantidad_votos > 0 else ""
+                    plancha_data.append([
+                        f"#{resultado.plancha.numero}{ganador}",
+                        resultado.plancha.nombre,
+                        str(resultado.cantidad_votos),
+                        f"{porcentaje:.1f}%"
+                    ])
+                
+                plancha_table = Table(plancha_data, colWidths=[1*inch, 2.5*inch, 0.8*inch, 0.8*inch])
+                plancha_table.setStyle(TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#b71c1c')),
+                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                    ('FONTSIZE', (0, 0), (-1, -1), 9),
+                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+                ]))
+                story.append(plancha_table)
+                story.append(Paragraph(f"<i>Total votos: {total_votos}</i>", styles['Normal']))
+            else:
+                story.append(Paragraph("Sin votos registrados", styles['Normal']))
+            
+            story.append(Spacer(1, 15))
+        
+        story.append(Spacer(1, 20))
+    
+    # Agregar secciones por categoría
+    agregar_categoria_al_reporte("Resultados Estudiantes", "estudiante", "🎓")
+    agregar_categoria_al_reporte("Resultados Docentes", "docente", "👨‍🏫")
+    agregar_categoria_al_reporte("Resultados Graduados", "graduado", "👨‍🎓")
+    
+    # Pie de página
+    story.append(Spacer(1, 30))
+    story.append(Paragraph(
+        "Este reporte fue generado automáticamente por el Sistema Electoral FESC",
+        ParagraphStyle('Footer', parent=styles['Normal'], alignment=TA_CENTER, fontSize=8, textColor=colors.grey)
+    ))
+    
+    # Construir PDF
+    doc.build(story)
+    return response
+
+@staff_member_required
+@lectura_en_replica()
+@condition(etag_func=etag_estadisticas)
+def estadisticas_json(request):
+    """API endpoint para actualización de estadísticas en tiempo real
+    
+    Mismo resumen que el dashboard. Un sondeo con If-None-Match igual a la huella vigente
+    recibe 304 sin consultar la base (el contexto sale de la caché de la versión actual).
+    """
+    response = JsonResponse(contexto_dashboard()['resumen'])
+    # El navegador puede guardar la respuesta pero debe revalidarla en cada sondeo
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@staff_member_required
+def metricas_json(request):
+    """Contadores de operación: reintentos de escritura, control de admisión y cachés"""
+    return JsonResponse({
+        'reintentos': reintentos.resumen(),
+        'admision': admision.resumen(),
+        'caches': cache_instrumentada.estadisticas(),
+    })
+
+def _entero(valor, defecto, minimo, maximo):
+    try:
+        return min(max(int(valor), minimo), maximo)
+    except (TypeError, ValueError):
+        return defecto
+
+@staff_member_required
+@lectura_en_replica()
+def auditoria_resumen(request):
+    """Intentos bloqueados de las últimas `horas`, agregados por tipo, IP y documento
+
+    Cada agregado filtra por la ventana de tiempo (y el tipo, si se pide) y agrupa por
+    una columna con índice compuesto (columna, creado).
+    """
+    horas = _entero(request.GET.get('horas'), 24, 1, 24 * 30)
+    limite = _entero(request.GET.get('limite'), 50, 1, 500)
+    tipos = dict(EventoAuditoria.TIPO_CHOICES)
+    tipo = request.GET.get('tipo') if request.GET.get('tipo') in tipos else ''
+
+    eventos = EventoAuditoria.objects.filter(creado__gte=timezone.now() - timedelta(hours=horas))
+    if tipo:
+        eventos = eventos.filter(tipo=tipo)
+    por_tipo = [
+        {**fila, 'nombre': tipos[fila['tipo']]}
+        for fila in eventos.values('tipo').annotate(
+            total=Count('id'), ips=Count('ip', distinct=True), ultimo=Max('creado')
+        ).order_by('-total')
+    ]
+    por_ip = eventos.exclude(ip=None).values('ip').annotate(
+        total=Count('id'), documentos=Count('documento', distinct=True), ultimo=Max('creado')
+    ).order_by('-total')[:limite]
+    por_documento = eventos.exclude(documento='').values('documento').annotate(
+        total=Count('id'), ips=Count('ip', distinct=True), ultimo=Max('creado')
+    ).order_by('-total')[:limite]
+
+    context = {
+        'title': 'Auditoría de intentos bloqueados',
+        'opts': EventoAuditoria._meta,
+        'has_permission': True,
+        'horas': horas,
+        'tipo': tipo,
+        'tipos': EventoAuditoria.TIPO_CHOICES,
+        'por_tipo': por_tipo,
+        'por_ip': por_ip,
+        'por_documento': por_documento,
+        # Aún en memoria de este worker (se guardan en el próximo lote)
+        'pendientes': auditoria.pendientes(),
+        'descartados': metricas.leer(['auditoria.descartados'])['auditoria.descartados'],
+    }
+    return render(request, 'admin/auditoria_resumen.html', context)